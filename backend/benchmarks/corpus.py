@@ -0,0 +1,132 @@
+"""
+Synthetic corpus for the end-to-end benchmarks: N users x M chunks with
+random embeddings, written to Neo4j through pdf-graphrag-service's own
+ChunkWriter, so nodes, relationships, chunk versions, EMBEDDING_STORAGE and
+the ANN / lexical sidecar indexes look exactly like real uploads.
+
+Users are user0@bench.local ... user{N-1}@bench.local; each gets M chunks
+spread over documents of CHUNKS_PER_DOC chunks. Text is drawn from a small
+vocabulary with a Zipf-like distribution so BM25 has something to rank.
+Embeddings are clustered (like real topics) and FAKE_EMBED_DIM wide.
+
+From backend/, with NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD set:
+
+    python -m benchmarks.corpus --users 10 --chunks 2000
+    python -m benchmarks.corpus --delete
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_SERVICE_DIR = os.path.join(BACKEND_DIR, "pdf-graphrag-service")
+USER_DOMAIN = "bench.local"
+CHUNKS_PER_DOC = 200
+PAGES_PER_DOC = 20
+DIM = int(os.getenv("FAKE_EMBED_DIM", "1536"))
+
+WORDS = (
+    "graph node edge vector index query retrieval embedding chunk document page "
+    "model token latency cache neo4j cypher database schema cluster shard replica "
+    "network protocol server client request response stream batch queue worker "
+    "memory disk storage file upload parser text paragraph section heading table "
+    "figure citation source answer question context prompt budget score rank "
+    "fusion lexical dense sparse hybrid semantic keyword search filter user"
+).split()
+
+
+def user_email(i: int) -> str:
+    return f"user{i}@{USER_DOMAIN}"
+
+
+def _graph_store():
+    # pdf-graphrag-service's package is also called `app`
+    if PDF_SERVICE_DIR not in sys.path:
+        sys.path.insert(0, PDF_SERVICE_DIR)
+    from app import graph_store
+
+    return graph_store
+
+
+def make_chunks(rng, n: int, centers: np.ndarray) -> tuple[list[str], np.ndarray]:
+    weights = 1.0 / np.arange(1, len(WORDS) + 1)
+    weights /= weights.sum()
+    texts = [
+        " ".join(rng.choice(WORDS, size=int(rng.integers(60, 200)), p=weights))
+        for _ in range(n)
+    ]
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors = vectors + 0.6 * rng.standard_normal((n, DIM)).astype(np.float32)
+    return texts, vectors
+
+
+def seed(users: int, chunks: int, random_seed: int = 0) -> None:
+    """
+    Write the corpus; users that already have chunks are skipped, so
+    re-running with a larger --users only adds the new ones.
+    """
+    graph_store = _graph_store()
+    graph_store.ensure_indexes()
+    rng = np.random.default_rng(random_seed)
+    centers = rng.standard_normal((64, DIM)).astype(np.float32)
+    existing = set(graph_store.list_user_emails())
+
+    for i in range(users):
+        email = user_email(i)
+        if email in existing:
+            continue
+        start = time.perf_counter()
+        for doc_start in range(0, chunks, CHUNKS_PER_DOC):
+            n = min(CHUNKS_PER_DOC, chunks - doc_start)
+            texts, vectors = make_chunks(rng, n, centers)
+            pages = [1 + k * PAGES_PER_DOC // n for k in range(n)]
+            doc = doc_start // CHUNKS_PER_DOC
+            with graph_store.ChunkWriter(email, f"bench-{i}-{doc}", f"bench-{doc}.pdf") as writer:
+                writer.write(texts, vectors.tolist(), pages)
+        print(f" {email}: {chunks} chunks ({time.perf_counter() - start:.1f}s)")
+
+
+def delete() -> None:
+    """
+    Remove every benchmark user with their chunks and conversations
+    (sidecar index files are left to `python -m app.index_rebuild`).
+    """
+    graph_store = _graph_store()
+    with graph_store._driver.session() as session:
+        session.run(
+            """
+            MATCH (u:User)-[:UPLOADED]->(c:Chunk) WHERE u.email ENDS WITH $domain
+            CALL { WITH c DETACH DELETE c } IN TRANSACTIONS OF 10000 ROWS
+            """,
+            {"domain": "@" + USER_DOMAIN},
+        ).consume()
+        session.run(
+            """
+            MATCH (n) WHERE (n:User OR n:Conversation) AND
+                  coalesce(n.email, n.user_email) ENDS WITH $domain
+            OPTIONAL MATCH (n)-[:HAS_TURN]->(t:Turn)
+            DETACH DELETE t, n
+            """,
+            {"domain": "@" + USER_DOMAIN},
+        ).consume()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--delete", action="store_true", help="remove the benchmark users")
+    args = parser.parse_args()
+    if args.delete:
+        delete()
+    else:
+        seed(args.users, args.chunks, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Local stand-ins for everything the two Python services call over HTTP
+besides Neo4j: the OpenAI embeddings and chat completions APIs (plain and
+streamed) and user-management's /profile.
+
+    FAKE_EMBED_LATENCY_MS    delay per embeddings request (default 50)
+    FAKE_CHAT_LATENCY_MS     delay before the first completion token (default 300)
+    FAKE_TOKEN_INTERVAL_MS   delay between streamed tokens (default 20)
+    FAKE_ANSWER_TOKENS       tokens per answer (default 50)
+    FAKE_PROFILE_LATENCY_MS  delay per /profile request (default 5)
+    FAKE_RATE_LIMIT_EVERY    answer every Nth embeddings request with a 429 (default 0 = never)
+    FAKE_EMBED_DIM           vector size (default 1536)
+
+Vectors are derived from a hash of the input text, so the same text always
+gets the same vector and callers can check output order; `stats` counts
+embeddings requests, inputs and 429s.
+
+/profile treats the bearer token as the user's email, so a load driver can
+act as any seeded user with "Authorization: Bearer user3@bench.local".
+Page-chunking prompts from pdf-graphrag-service get a JSON array of the
+page's paragraphs, so CHUNKING_MODE=llm works end to end.
+
+benchmarks/run.py and the per-service benchmarks start this in-process (the
+latter put backend/ on sys.path; benchmarks/ has no __init__.py, so it
+merges with the service's own benchmarks/). To run it alone, from backend/:
+
+    uvicorn benchmarks.fake_services:app --port 9300
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBED_LATENCY_MS = float(os.getenv("FAKE_EMBED_LATENCY_MS", "50"))
+CHAT_LATENCY_MS = float(os.getenv("FAKE_CHAT_LATENCY_MS", "300"))
+TOKEN_INTERVAL_MS = float(os.getenv("FAKE_TOKEN_INTERVAL_MS", "20"))
+ANSWER_TOKENS = int(os.getenv("FAKE_ANSWER_TOKENS", "50"))
+PROFILE_LATENCY_MS = float(os.getenv("FAKE_PROFILE_LATENCY_MS", "5"))
+RATE_LIMIT_EVERY = int(os.getenv("FAKE_RATE_LIMIT_EVERY", "0"))
+DIM = int(os.getenv("FAKE_EMBED_DIM", "1536"))
+
+app = FastAPI(title="Fake OpenAI + user-management")
+_requests = itertools.count(1)
+stats = {"requests": 0, "inputs": 0, "rate_limited": 0}
+
+
+def fake_vector(text: str, dim: int = DIM) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32).tolist()
+
+
+@app.get("/profile")
+async def profile(authorization: str = Header(...)):
+    email = authorization.removeprefix("Bearer ").strip()
+    if "@" not in email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    await asyncio.sleep(PROFILE_LATENCY_MS / 1000)
+    return {"email": email, "username": email.split("@")[0]}
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    n = next(_requests)
+    stats["requests"] += 1
+    if RATE_LIMIT_EVERY and n % RATE_LIMIT_EVERY == 0:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "0.05"},
+            content={"error": {"message": "Rate limit reached", "type": "requests"}},
+        )
+
+    inputs = body["input"]
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    stats["inputs"] += len(inputs)
+    await asyncio.sleep(EMBED_LATENCY_MS / 1000)
+    return {
+        "object": "list",
+        "model": body.get("model"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_vector(text)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _page_chunks(prompt: str) -> str | None:
+    """
+    The answer to pdf_ingest.chunk_page's prompt: the page's paragraphs.
+    """
+    if "PAGE_TEXT:" not in prompt:
+        return None
+    page_text = prompt.split("PAGE_TEXT:", 1)[1]
+    return json.dumps([p.strip() for p in page_text.split("\n\n") if p.strip()])
+
+
+def _chunk(model: str, delta: dict, finish_reason=None) -> str:
+    payload = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model")
+    tokens = [f"tok{i} " for i in range(ANSWER_TOKENS)]
+
+    if not body.get("stream"):
+        await asyncio.sleep((CHAT_LATENCY_MS + TOKEN_INTERVAL_MS * ANSWER_TOKENS) / 1000)
+        prompt = "\n".join(m.get("content") or "" for m in body.get("messages", []))
+        content = _page_chunks(prompt) or "".join(tokens)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    async def events():
+        await asyncio.sleep(CHAT_LATENCY_MS / 1000)
+        yield _chunk(model, {"role": "assistant", "content": ""})
+        for token in tokens:
+            yield _chunk(model, {"content": token})
+            await asyncio.sleep(TOKEN_INTERVAL_MS / 1000)
+        yield _chunk(model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
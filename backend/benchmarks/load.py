@@ -0,0 +1,257 @@
+"""
+Load drivers for the running services and the latency report.
+
+Each scenario sends `requests` requests with at most `concurrency` in
+flight, as random seeded users (see benchmarks/corpus.py), and records per
+request:
+
+  chat    POST /chat/                 latency of the whole JSON answer
+  stream  GET  /chat/stream           time to the first SSE token and to "end"
+  upload  POST /upload-pdf, then      latency until the ingest job is done
+          GET /jobs/{id}              (the 202 itself is reported as "accept")
+
+While a scenario runs, the resident memory of the given service processes
+is sampled from /proc (Linux). Used by benchmarks/run.py; see there.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+import fitz
+import httpx
+import numpy as np
+
+from benchmarks.corpus import WORDS, user_email
+
+QUESTIONS = [
+    "How does the retrieval pipeline rank chunks?",
+    "What is the latency budget of a query?",
+    "Summarize the section about cache and memory.",
+    "Which index is used for vector search?",
+    "Explain how uploads are parsed into paragraphs.",
+    "What does the document say about cluster replicas?",
+]
+JOB_POLL_SECONDS = 0.1
+
+
+class Result:
+    def __init__(
+        self,
+        latency: float,
+        ok: bool,
+        first_token: float | None = None,
+        accept: float | None = None,
+    ):
+        self.latency = latency
+        self.ok = ok
+        self.first_token = first_token
+        self.accept = accept
+
+
+class MemorySampler:
+    """
+    Peak and last RSS (MiB) of some processes, sampled in a thread.
+    """
+
+    def __init__(self, pids: dict[str, int], interval: float = 0.1):
+        self.pids = pids
+        self.interval = interval
+        self.peak = {name: 0.0 for name in pids}
+        self.last = {name: 0.0 for name in pids}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def rss_mib(pid: int) -> float:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return 0.0
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for name, pid in self.pids.items():
+                rss = self.rss_mib(pid)
+                self.last[name] = rss
+                self.peak[name] = max(self.peak[name], rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "MemorySampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _auth(email: str) -> dict:
+    # the fake /profile resolves the token to this email
+    return {"Authorization": f"Bearer {email}"}
+
+
+async def chat_once(client: httpx.AsyncClient, base: str, email: str) -> Result:
+    start = time.perf_counter()
+    response = await client.post(
+        f"{base}/chat/", json={"question": random.choice(QUESTIONS)}, headers=_auth(email)
+    )
+    return Result(time.perf_counter() - start, response.status_code == 200)
+
+
+async def stream_once(client: httpx.AsyncClient, base: str, email: str) -> Result:
+    start = time.perf_counter()
+    first_token = None
+    ok = False
+    params = {"question": random.choice(QUESTIONS), "token": email}
+    async with client.stream("GET", f"{base}/chat/stream", params=params) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+            elif line.startswith("data:") and event == "end":
+                ok = response.status_code == 200 and first_token is not None
+                break
+    return Result(time.perf_counter() - start, ok, first_token=first_token)
+
+
+def make_pdf(pages: int, seed: int) -> bytes:
+    """
+    A small text PDF; the seed makes its hash unique, so it is never a duplicate.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        paragraphs = [
+            " ".join(rng.choices(WORDS, k=rng.randint(40, 90))) for _ in range(4)
+        ]
+        page.insert_textbox(
+            page.rect + (36, 36, -36, -36), "\n\n".join(paragraphs), fontsize=9
+        )
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def upload_once(
+    client: httpx.AsyncClient, base: str, email: str, pdf: bytes, name: str
+) -> Result:
+    start = time.perf_counter()
+    response = await client.post(
+        f"{base}/upload-pdf",
+        files={"file": (name, pdf, "application/pdf")},
+        headers=_auth(email),
+    )
+    accept = time.perf_counter() - start
+    if response.status_code != 202:
+        return Result(accept, False, accept=accept)
+    job_url = f"{base}/jobs/{response.json()['job_id']}"
+    while True:
+        await asyncio.sleep(JOB_POLL_SECONDS)
+        job = (await client.get(job_url, headers=_auth(email))).json()
+        if job.get("status") in ("done", "failed"):
+            return Result(time.perf_counter() - start, job["status"] == "done", accept=accept)
+
+
+async def drive(
+    scenario: str,
+    base: str,
+    users: int,
+    concurrency: int,
+    requests: int,
+    pdf_pages: int = 5,
+) -> tuple[list[Result], float]:
+    """
+    Run one scenario; returns the per-request results and the wall time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    # PDFs are built before the clock starts
+    pdfs = (
+        [make_pdf(pdf_pages, seed=time.time_ns() + i) for i in range(requests)]
+        if scenario == "upload"
+        else []
+    )
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(600.0)) as client:
+
+        async def one(i: int) -> Result:
+            email = user_email(random.randrange(users))
+            async with semaphore:
+                try:
+                    if scenario == "chat":
+                        return await chat_once(client, base, email)
+                    if scenario == "stream":
+                        return await stream_once(client, base, email)
+                    return await upload_once(client, base, email, pdfs[i], f"load-{i}.pdf")
+                except httpx.HTTPError:
+                    return Result(0.0, False)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(requests)))
+        return results, time.perf_counter() - start
+
+
+def percentiles(values: list[float]) -> tuple[float, float, float]:
+    """
+    p50 / p95 / p99 in milliseconds (nan when empty).
+    """
+    if not values:
+        return float("nan"), float("nan"), float("nan")
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return float(p50), float(p95), float(p99)
+
+
+def summarize(
+    scenario: str,
+    concurrency: int,
+    results: list[Result],
+    wall: float,
+    memory: MemorySampler | None,
+) -> dict:
+    ok = [r for r in results if r.ok]
+    row = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "throughput_rps": len(ok) / wall if wall else 0.0,
+        "latency_ms": percentiles([r.latency for r in ok]),
+    }
+    if scenario == "stream":
+        row["first_token_ms"] = percentiles([r.first_token for r in ok])
+    if scenario == "upload":
+        row["accept_ms"] = percentiles([r.accept for r in ok])
+    if memory is not None:
+        row["rss_peak_mib"] = {k: round(v, 1) for k, v in memory.peak.items()}
+        row["rss_end_mib"] = {k: round(v, 1) for k, v in memory.last.items()}
+    return row
+
+
+def format_row(row: dict) -> str:
+    def ms(values) -> str:
+        return "/".join(f"{v:.0f}" for v in values)
+
+    extra = ""
+    if "first_token_ms" in row:
+        extra = f"  ttft {ms(row['first_token_ms'])}"
+    if "accept_ms" in row:
+        extra = f"  accept {ms(row['accept_ms'])}"
+    memory = ""
+    if "rss_peak_mib" in row:
+        peaks = row["rss_peak_mib"].items()
+        memory = "  rss peak " + " ".join(f"{k}={v:.0f}MiB" for k, v in peaks)
+    return (
+        f"{row['scenario']:>7} c={row['concurrency']:<4} n={row['requests']:<5} "
+        f"err={row['errors']:<4} {row['throughput_rps']:>7.1f} req/s  "
+        f"p50/95/99 {ms(row['latency_ms'])} ms{extra}{memory}"
+    )
+
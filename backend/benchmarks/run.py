@@ -0,0 +1,156 @@
+"""
+End-to-end load and latency benchmark of chat-service and pdf-graphrag-service,
+without network access: OpenAI and user-management are replaced by
+benchmarks/fake_services.py, Neo4j is a local throwaway instance, e.g.
+
+    docker run --rm -p 7687:7687 -e NEO4J_AUTH=neo4j/benchpass neo4j:5
+
+From backend/:
+
+    NEO4J_URI=bolt://localhost:7687 NEO4J_USER=neo4j NEO4J_PASSWORD=benchpass \\
+        python -m benchmarks.run --users 10 --chunks 2000 --concurrency 1,8,32
+
+Steps: start the fakes in-process, seed the synthetic corpus (skipped for
+users that already exist), start both services with uvicorn as child
+processes pointed at the fakes, then run every scenario (chat, stream,
+upload) at every concurrency level and print p50/p95/p99 latency, time to
+first token, accepted-upload latency, throughput and peak RSS per service.
+Service settings (RETRIEVAL_MODE, RERANK_BACKEND, EMBEDDING_STORAGE, ...)
+are taken from the environment, so runs with different settings compare
+directly. --json writes the rows for later diffing; each service's
+/metrics is saved next to it for the per-stage breakdown.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks import corpus
+from benchmarks.fake_services import app as fake_app
+from benchmarks.load import MemorySampler, drive, format_row, summarize
+
+FAKE_PORT = int(os.getenv("BENCH_FAKE_PORT", "9300"))
+CHAT_PORT = int(os.getenv("BENCH_CHAT_PORT", "9301"))
+PDF_PORT = int(os.getenv("BENCH_PDF_PORT", "9302"))
+SERVICE_DIRS = {
+    "chat": os.path.join(corpus.BACKEND_DIR, "chat-service"),
+    "pdf": corpus.PDF_SERVICE_DIR,
+}
+
+
+def start_fake_server() -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(fake_app, host="127.0.0.1", port=FAKE_PORT, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def service_env() -> dict:
+    env = dict(os.environ)
+    env.update(
+        OPENAI_API_KEY="fake",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{FAKE_PORT}/v1",
+        USER_MGMT_URL=f"http://127.0.0.1:{FAKE_PORT}",
+        # verify through the fake /profile, not a local secret
+        JWT_SECRET="",
+    )
+    return env
+
+
+def start_service(name: str, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=SERVICE_DIRS[name],
+        env=service_env(),
+    )
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with {process.returncode}")
+        try:
+            if httpx.get(f"{url}/openapi.json", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks per user")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="per chat/stream run")
+    parser.add_argument("--uploads", type=int, default=20, help="per upload run")
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--scenarios", default="chat,stream,upload")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--json", help="write the result rows to this file")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    scenarios = args.scenarios.split(",")
+
+    start_fake_server()
+    os.environ.update(service_env())
+    if not args.skip_seed:
+        corpus.seed(args.users, args.chunks)
+
+    processes = {
+        "chat": start_service("chat", CHAT_PORT),
+        "pdf": start_service("pdf", PDF_PORT),
+    }
+    bases = {"chat": f"http://127.0.0.1:{CHAT_PORT}", "pdf": f"http://127.0.0.1:{PDF_PORT}"}
+    rows = []
+    try:
+        for name, process in processes.items():
+            wait_ready(bases[name], process)
+        pids = {name: process.pid for name, process in processes.items()}
+
+        for scenario in scenarios:
+            base = bases["pdf" if scenario == "upload" else "chat"]
+            requests = args.uploads if scenario == "upload" else args.requests
+            for concurrency in levels:
+                with MemorySampler(pids) as memory:
+                    results, wall = asyncio.run(
+                        drive(scenario, base, args.users, concurrency, requests, args.pdf_pages)
+                    )
+                row = summarize(scenario, concurrency, results, wall, memory)
+                rows.append(row)
+                print(format_row(row), flush=True)
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(rows, f, indent=2)
+            for name, base in bases.items():
+                response = httpx.get(f"{base}/metrics", timeout=5.0)
+                if response.status_code == 200:
+                    with open(f"{args.json}.{name}.metrics.txt", "w") as f:
+                        f.write(response.text)
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
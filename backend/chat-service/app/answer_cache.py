@@ -0,0 +1,205 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import settings
+
+# Semantic cache of final answers. Per user it holds the embeddings of recently
+# answered standalone questions (unit float16 rows, ~3 KB each at 1536 dims)
+# next to their answers, all tagged with the User.chunks_version they were
+# answered against. A question whose embedding has cosine >= threshold with a
+# cached one, asked with the same answer parameters, gets that answer back.
+# pdf-graphrag-service bumps chunks_version on every upload, so the first
+# lookup after new chunks drops the user's whole entry.
+#
+# Embeddings barely move when only a year, an amount or a name changes
+# ("revenue in 2021" vs "revenue in 2022"), so on top of the threshold an
+# entry is only served when the question's anchors (numbers, capitalized or
+# mixed-case names, quoted phrases) are exactly the cached question's.
+
+_NUMBER = re.compile(r"\d+(?:[.,:/-]\d+)*")
+_QUOTED = re.compile(r'"([^"]+)"|“([^”]+)”')
+# words (keeping "U.S.", "AT&T", "GPT-4" whole) and sentence ends
+_TOKEN = re.compile(r"\w[\w&.-]*\w|\w|[.!?;:\n]")
+# capitalized only because they start a sentence, not names
+_LEADING_WORDS = frozenset(
+    """
+    a an and any are can compare could describe did do does explain find give
+    how i in is list me of on please show summarize tell the what when where
+    which who whom whose why with would
+    """.split()
+)
+
+
+def question_anchors(question: str) -> frozenset[str]:
+    """
+    Numbers, names and quoted phrases of a question, lowercased; two questions
+    must have the same anchors to share an answer.
+    """
+    text = unicodedata.normalize("NFKC", question or "")
+    anchors = {m.group() for m in _NUMBER.finditer(text)}
+    for m in _QUOTED.finditer(text):
+        phrase = m.group(1) or m.group(2)
+        anchors.add('"' + " ".join(phrase.lower().split()))
+    sentence_start = True
+    for m in _TOKEN.finditer(text):
+        word = m.group()
+        if word in ".!?;:\n":
+            sentence_start = True
+            continue
+        lower = word.lower()
+        leading = sentence_start and lower in _LEADING_WORDS and word[1:].islower()
+        if word != lower and not leading:
+            anchors.add(lower)
+        sentence_start = False
+    return frozenset(anchors)
+
+
+class _UserAnswers:
+    __slots__ = ("version", "vectors", "entries")
+
+    def __init__(self, version, dim: int):
+        self.version = version
+        self.vectors = np.zeros((0, dim), dtype=np.float16)
+        # aligned with vectors:
+        # [params, anchors, answer, expires_at, last_used, cost_seconds]
+        self.entries: list[list] = []
+
+    def keep(self, rows: np.ndarray) -> None:
+        self.vectors = self.vectors[rows]
+        self.entries = [self.entries[i] for i in rows]
+
+
+class AnswerCache:
+    """
+    Per-user LRU of answers with a TTL per answer and an LRU over users.
+    Not thread-safe; meant for the single event loop of a worker process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_users: int,
+        max_per_user: int,
+        ttl_seconds: float,
+        threshold: float,
+    ):
+        self.name = name
+        self.max_users = max_users
+        self.max_per_user = max_per_user
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._users: OrderedDict[str, _UserAnswers] = OrderedDict()
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray | None:
+        q = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        return q / norm if norm > 0 else None
+
+    def get(
+        self, user_email: str, version, question: str, embedding, params: tuple
+    ) -> str | dict | None:
+        """
+        Cached answer for a question this close to one already answered on the
+        same corpus version, with the same params and anchors, else None.
+        """
+        user = self._users.get(user_email)
+        q = self._unit(embedding)
+        if user is None or q is None or user.vectors.shape[1] != q.shape[0]:
+            self.misses += 1
+            return None
+        if user.version != version:
+            del self._users[user_email]
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        live = [i for i, e in enumerate(user.entries) if e[3] > now]
+        if len(live) < len(user.entries):
+            user.keep(np.array(live, dtype=np.int64))
+
+        anchors = question_anchors(question)
+        same = np.array(
+            [e[0] == params and e[1] == anchors for e in user.entries], dtype=bool
+        )
+        if same.any():
+            sims = user.vectors.astype(np.float32) @ q
+            sims[~same] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] >= self.threshold:
+                entry = user.entries[best]
+                entry[4] = now
+                self._users.move_to_end(user_email)
+                self.hits += 1
+                self.saved_seconds += entry[5]
+                return entry[2]
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        user_email: str,
+        version,
+        question: str,
+        embedding,
+        params: tuple,
+        answer: str | dict,
+        cost_seconds: float = 0.0,
+    ) -> None:
+        """
+        Remember answer (kept as given; chat.py stores the text with its
+        sources) for the question; empty answers are not cached.
+        """
+        q = self._unit(embedding)
+        if self.max_per_user <= 0 or self.max_users <= 0 or q is None or not answer:
+            return
+        user = self._users.get(user_email)
+        if user is None or user.version != version or user.vectors.shape[1] != q.shape[0]:
+            user = self._users[user_email] = _UserAnswers(version, q.shape[0])
+        self._users.move_to_end(user_email)
+
+        if len(user.entries) >= self.max_per_user:
+            oldest = min(range(len(user.entries)), key=lambda i: user.entries[i][4])
+            user.keep(np.delete(np.arange(len(user.entries)), oldest))
+        now = time.monotonic()
+        user.vectors = np.vstack([user.vectors, q.astype(np.float16)[None, :]])
+        user.entries.append(
+            [
+                params,
+                question_anchors(question),
+                answer,
+                now + self.ttl_seconds,
+                now,
+                cost_seconds,
+            ]
+        )
+
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "entries": sum(len(u.entries) for u in self._users.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+answer_cache = AnswerCache(
+    "answer",
+    max_users=settings.ANSWER_CACHE_MAX_USERS,
+    max_per_user=settings.ANSWER_CACHE_MAX_PER_USER,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    threshold=settings.ANSWER_CACHE_THRESHOLD,
+)
@@ -1,10 +1,17 @@
+import hashlib
 import os
+import time
 import httpx
 from fastapi import HTTPException, Header, Request
 from starlette.status import HTTP_401_UNAUTHORIZED
 
 from dotenv import load_dotenv
 
+from app.config import settings
+from app.jwt_verify import secret_key, unverified_expiry, verify_jwt
+from app.metrics import span
+from app.ttl_cache import TTLCache
+
 load_dotenv()
 
 USER_MANAGEMENT_URL = os.getenv("USER_MGMT_URL")
@@ -13,21 +20,54 @@ if not USER_MANAGEMENT_URL:
 
 PROFILE_ENDPOINT = f"{USER_MANAGEMENT_URL}/profile"
 
+# verified profiles by sha256(token); never stores the raw token
+token_cache = TTLCache(
+    "auth_token",
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+_jwt_key = (
+    secret_key(settings.JWT_SECRET, settings.JWT_SECRET_BASE64)
+    if settings.JWT_SECRET
+    else None
+)
+_http: httpx.AsyncClient | None = None
 
-async def get_current_user(authorization: str = Header(...)):
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(
-            status_code=HTTP_401_UNAUTHORIZED,
-            detail="Invalid Authorization header format",
-        )
 
-    token = authorization[7:]
+def _new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=5,
+        limits=httpx.Limits(
+            max_connections=settings.AUTH_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AUTH_HTTP_MAX_CONNECTIONS,
+        ),
+    )
 
+
+async def start_http_client() -> None:
+    """
+    Create the pooled keep-alive client to user-management (app startup).
+    """
+    global _http
+    if _http is None:
+        _http = _new_http_client()
+
+
+async def close_http_client() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+async def _fetch_profile(token: str) -> dict:
+    if _http is None:
+        await start_http_client()
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            response = await client.get(
-                PROFILE_ENDPOINT, headers={"Authorization": f"Bearer {token}"}
-            )
+        response = await _http.get(
+            PROFILE_ENDPOINT, headers={"Authorization": f"Bearer {token}"}
+        )
     except httpx.RequestError:
         raise HTTPException(
             status_code=HTTP_401_UNAUTHORIZED, detail="User service unreachable"
@@ -45,9 +85,49 @@ async def get_current_user(authorization: str = Header(...)):
             status_code=HTTP_401_UNAUTHORIZED,
             detail="Invalid response from user service",
         )
-    
+
+
+async def get_current_user(authorization: str = Header(...)):
+    """
+    Resolve the bearer token to the user's profile.
+
+    Order: verified-token cache, then local HS512 verification when JWT_SECRET
+    is set (no network hop; the user is {"email": sub}), then the /profile
+    endpoint of user-management over the pooled client.
+    """
+    with span("auth"):
+        if not authorization or not authorization.startswith("Bearer "):
+            raise HTTPException(
+                status_code=HTTP_401_UNAUTHORIZED,
+                detail="Invalid Authorization header format",
+            )
+
+        token = authorization[7:]
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        user = token_cache.get(key)
+        if user is not TTLCache.MISSING:
+            return user
+
+        if _jwt_key is not None:
+            claims = verify_jwt(token, _jwt_key)
+            sub = claims.get("sub") if claims is not None else None
+            if not isinstance(sub, str) or not sub:
+                raise HTTPException(
+                    status_code=HTTP_401_UNAUTHORIZED, detail="Invalid or expired token"
+                )
+            return {"email": sub}
+
+        start = time.perf_counter()
+        user = await _fetch_profile(token)
+        # don't let a cached profile outlive its token
+        exp = unverified_expiry(token)
+        if exp is None or exp > time.time() + settings.AUTH_CACHE_TTL_SECONDS:
+            token_cache.put(key, user, time.perf_counter() - start)
+        return user
+
+
 async def get_current_user_for_sse(request: Request, token: str | None):
     authorization: str | None = request.headers.get("Authorization")
     if not authorization and token:
         authorization = f"Bearer {token}"
-    return await get_current_user(authorization)
\ No newline at end of file
+    return await get_current_user(authorization)
@@ -1,38 +1,76 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sse_starlette.sse import EventSourceResponse
-from typing import Optional
+from typing import AsyncIterator, Optional
 from pydantic import BaseModel
 from app.auth import get_current_user, get_current_user_for_sse
-from app.neo4j_driver import get_driver
 from app.embedding import (
     embed_text,
-    cosine_similarity,
-    rank_chunks,
     min_max_normalize,
-    mmr_select,
 )
-from app.conversation_store import ensure_conversation, load_history, append_turns
+from app.scoring import ChunkMatrix, mmr_indices, top_k_indices
+from app.rerank import rerank
+from app.retrieval import (
+    fetch_bm25_hits,
+    fetch_chunks_version,
+    list_user_files,
+    load_candidates,
+    with_text,
+)
+from app.answer_cache import answer_cache
+from app.chunk_cache import load_user_chunks
+from app.context_packer import citations, pack_context
+from app.conversation_store import open_conversation, append_turns
+from app.metrics import count, observe, span
 from fastapi.responses import JSONResponse
 import openai
 import uuid
-from openai import OpenAI
+from openai import AsyncOpenAI
+import httpx
 import os
 import json
+import re
+import time
+import asyncio
+import hashlib
 import numpy as np
+from app.config import settings
+from app.ttl_cache import TTLCache
 
 router = APIRouter()
 openai.api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI()
+client = AsyncOpenAI(
+    timeout=httpx.Timeout(
+        settings.OPENAI_TIMEOUT_SECONDS, connect=settings.OPENAI_CONNECT_TIMEOUT_SECONDS
+    )
+)
+
+ANSWER_SYSTEM_PROMPT = "Follow instructions strictly. Use only the provided context."
+
+
+condense_cache = TTLCache(
+    "condense",
+    max_entries=settings.CONDENSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CONDENSE_CACHE_TTL_SECONDS,
+)
 
 
-def condense_question(history: list[dict], follow_up: str) -> str:
+async def condense_question(history: list[dict], follow_up: str) -> str:
     """
     Use last ~10 turns to rewrite a follow-up into a standalone question.
     If no history, just return the original question.
+    Rewrites are cached by a hash of (history window, follow-up).
     """
     if not history:
         return (follow_up or "").strip()
 
+    key = hashlib.sha256(
+        json.dumps([history[-10:], follow_up], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    cached = condense_cache.get(key)
+    if cached is not TTLCache.MISSING:
+        return cached
+
+    start = time.perf_counter()
     prompt = (
         "Rewrite the follow-up question into a standalone question that includes any "
         "necessary context from the conversation history.\n\n"
@@ -40,12 +78,14 @@ def condense_question(history: list[dict], follow_up: str) -> str:
         f"Follow-up: {follow_up}\n\n"
         "Standalone:"
     )
-    resp = client.chat.completions.create(
+    resp = await client.chat.completions.create(
         model="gpt-3.5-turbo",
         temperature=0,
         messages=[{"role": "system", "content": prompt}],
     )
-    return (resp.choices[0].message.content or "").strip()
+    standalone = (resp.choices[0].message.content or "").strip()
+    condense_cache.put(key, standalone, time.perf_counter() - start)
+    return standalone
 
 
 def is_broad_question(q: str) -> bool:
@@ -65,6 +105,190 @@ def dynamic_top_k(question: str, base_k: int) -> int:
     return 10 if is_broad_question(question) else base_k
 
 
+def context_candidates(question: str, base_k: int) -> int:
+    """
+    How many ranked chunks to offer pack_context; it keeps what fits the budget.
+    """
+    return max(dynamic_top_k(question, base_k), settings.CONTEXT_MAX_CHUNKS)
+
+
+def select_chunks(
+    matrix: ChunkMatrix, fused: np.ndarray, k: int, use_mmr: bool
+) -> list[dict]:
+    """
+    The k best chunks by fused score, or in MMR pick order, best first.
+    """
+    if not use_mmr:
+        return [matrix.chunks[i] for i in top_k_indices(fused, k)]
+    picked = mmr_indices(
+        matrix.embeddings, fused, k, lambda_=0.7, pool_size=settings.MMR_POOL_SIZE
+    )
+    return [matrix.chunks[i] for i in picked]
+
+
+class Retrieval:
+    """
+    Everything the answer step needs from the retrieval stage graph. When
+    cached_answer ({"answer", "sources"}) is set the stages after the
+    embedding did not run (bm25_hits and matrix are left empty).
+    """
+
+    def __init__(self):
+        self.conv_id: str | None = None
+        self.standalone_q: str = ""
+        self.query_embedding: list[float] = []
+        self.bm25_hits: list[dict] = []
+        self.matrix: ChunkMatrix | None = None
+        self.corpus_version = None
+        self.cached_answer: dict | None = None
+
+
+async def _timed(stage: str, awaitable):
+    """
+    Await awaitable, timing it into the stage latency histogram.
+    """
+    with span(stage):
+        return await awaitable
+
+
+async def retrieve(
+    user_email: str,
+    question: str,
+    conversation_id: str | None,
+    use_history: bool,
+    answer_params: tuple | None = None,
+) -> Retrieval:
+    """
+    Retrieval as a stage graph instead of a strict sequence:
+
+        conversation+history -> condense -> embed ----\
+        version -> bm25(raw question, redone if condensing changed it) --> candidates
+        version -> chunk fetch (scan mode, independent of the question) -/
+
+    Independent Neo4j and OpenAI calls run concurrently. Without history the
+    standalone question is the raw one, so embedding starts immediately too.
+    The user's chunks_version is read once and shared by the chunk cache, the
+    local lexical and ANN indexes and the answer cache.
+
+    With answer_params the answer cache is consulted once the embedding is
+    in; on a hit the remaining stages are cancelled and r.cached_answer is set.
+    """
+    r = Retrieval()
+    raw_q = (question or "").strip()
+    tasks: list[asyncio.Task] = []
+
+    def start(stage: str, awaitable) -> asyncio.Task:
+        task = asyncio.create_task(_timed(stage, awaitable))
+        tasks.append(task)
+        return task
+
+    async def chunks():
+        return await load_user_chunks(user_email, await version_task)
+
+    async def bm25(query: str):
+        return await fetch_bm25_hits(query, user_email, await version_task)
+
+    t0 = time.perf_counter()
+    try:
+        version_task = start("version", fetch_chunks_version(user_email))
+        chunks_task = (
+            start("chunks", chunks())
+            if settings.RETRIEVAL_MODE not in ("vector", "ann")
+            else None
+        )
+        bm25_task = start("bm25", bm25(raw_q))
+
+        embed_task = None
+        r.standalone_q = raw_q
+        if use_history:
+            r.conv_id, history = await _timed(
+                "history", open_conversation(conversation_id, user_email, limit=10)
+            )
+            if history:
+                try:
+                    r.standalone_q = await _timed(
+                        "condense", condense_question(history, question)
+                    )
+                except Exception as e:
+                    print("WARN: condense failed, using raw question:", e)
+                    r.standalone_q = raw_q
+                if r.standalone_q != raw_q:
+                    bm25_task.cancel()
+                    bm25_task = start("bm25", bm25(r.standalone_q))
+        embed_task = start("embed", embed_text(r.standalone_q))
+
+        r.query_embedding = await embed_task
+        r.corpus_version = await version_task
+        if answer_params is not None and settings.ANSWER_CACHE_MAX_PER_USER > 0:
+            r.cached_answer = answer_cache.get(
+                user_email,
+                r.corpus_version,
+                r.standalone_q,
+                r.query_embedding,
+                answer_params,
+            )
+            if r.cached_answer is not None:
+                return r
+        r.bm25_hits = await bm25_task
+        if chunks_task is not None:
+            r.matrix = await chunks_task
+        else:
+            r.matrix = await _timed(
+                "candidates",
+                load_candidates(
+                    user_email,
+                    r.query_embedding,
+                    [row["id"] for row in r.bm25_hits if row.get("id")],
+                    r.corpus_version,
+                ),
+            )
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        observe("retrieval_total", time.perf_counter() - t0)
+    return r
+
+
+def answer_params(top_k: int, alpha: float, use_mmr: bool) -> tuple:
+    """
+    The request parameters besides the question that shape an answer; cached
+    answers are only reused for equal ones.
+    """
+    return (int(top_k), round(float(alpha), 3), bool(use_mmr))
+
+
+def answer_messages(prompt: str) -> list[dict]:
+    return [
+        {"role": "system", "content": ANSWER_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+async def stream_completion(prompt: str) -> AsyncIterator[str]:
+    """
+    Stream the answer's content deltas with the async client, so other
+    requests keep running on the event loop between tokens.
+    """
+    async with client.chat.completions.stream(
+        model="gpt-3.5-turbo",
+        temperature=0,
+        messages=answer_messages(prompt),
+    ) as stream:
+        async for event in stream:
+            if getattr(event, "type", None) in (
+                "content.delta",
+                "message.delta",
+            ) and getattr(event, "delta", None):
+                yield event.delta
+            elif getattr(event, "type", None) in (
+                "message.stop",
+                "response.completed",
+                "message.complete",
+            ):
+                break
+
+
 class ChatRequest(BaseModel):
     conversation_id: str | None = None
     question: str
@@ -75,65 +299,17 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     answer: str
+    # files and pages of the chunks packed into the prompt
+    sources: list[dict] = []
 
 
 @router.post("/", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest, user: dict = Depends(get_current_user)):
     user_email = user.get("email")
-    print("EMAIL from token:", user_email)
-    print("DEBUG: question =", repr(request.question))
     if not user_email:
         raise HTTPException(status_code=400, detail="Missing user email")
-
-    conv_id = await ensure_conversation(request.conversation_id, user_email)
-
-    # load the last turns (up to 10)
-    history = await load_history(conv_id, user_email, limit=10)
-
-    # Condense follow-up standalone
-    standalone_q = condense_question(history, request.question)
-    print("DEBUG: standalone question =", repr(standalone_q))
-
-    query_embedding = embed_text(standalone_q)
-
-    try:
-        print("DEBUG: query_embedding_dim =", len(query_embedding))
-    except Exception as e:
-        print("DEBUG: query_embedding type =", type(query_embedding), "err:", e)
-
-    driver = get_driver()
-    async with driver.session() as session:
-        # fetch all chunks for this user (id, text, embedding, file_name, pdf_id)
-        result = await session.run(
-            """
-            MATCH (u:User {email: $email})-[:UPLOADED]->(c:Chunk)
-            RETURN
-              c.id        AS id,
-              c.text      AS text,
-              c.embedding AS embedding,
-              c.file_name AS file_name,
-              c.pdf_id    AS pdf_id,
-              c.page      AS page
-            """,
-            {"email": user_email},
-        )
-        chunks = await result.data()
-
-        # BM25 for the same user
-        bm25_res = await session.run(
-            """
-            CALL db.index.fulltext.queryNodes('chunkText', $q) YIELD node, score
-            WHERE node.user_email = $email
-            RETURN node.id AS id, score
-            ORDER BY score DESC
-            LIMIT 100
-            """,
-            {"q": standalone_q, "email": user_email},
-        )
-        bm25_hits = await bm25_res.data()
-
-    print("DEBUG: total user chunks =", len(chunks))
-    print("DEBUG: bm25 hits =", len(bm25_hits))
+    count("chat_request")
+    request_start = time.perf_counter()
 
     ql = request.question.strip().lower()
     is_list_docs = (
@@ -142,9 +318,7 @@ async def chat_endpoint(request: ChatRequest, user: dict = Depends(get_current_u
         and ("upload" in ql or "uploaded" in ql)
     ) or ("list" in ql and ("document" in ql or "pdf" in ql))
     if is_list_docs:
-        files = sorted(
-            {c.get("file_name") for c in (chunks or []) if c.get("file_name")}
-        )
+        files = await list_user_files(user_email)
         answer = (
             "You uploaded: " + ", ".join(files)
             if files
@@ -152,19 +326,30 @@ async def chat_endpoint(request: ChatRequest, user: dict = Depends(get_current_u
         )
         return ChatResponse(answer=answer)
 
+    # conversation, condense, embedding, BM25 and chunk fetch (concurrently where possible)
+    params = answer_params(request.top_k, request.alpha, request.use_mmr)
+    r = await retrieve(
+        user_email,
+        request.question,
+        request.conversation_id,
+        use_history=True,
+        answer_params=params,
+    )
+    conv_id, standalone_q = r.conv_id, r.standalone_q
+    if r.cached_answer is not None:
+        count("answer_cache_hit")
+        await append_turns(
+            conv_id, user_email, request.question, r.cached_answer["answer"]
+        )
+        observe("chat_total", time.perf_counter() - request_start)
+        return ChatResponse(**r.cached_answer)
+    query_embedding, bm25_hits, matrix = r.query_embedding, r.bm25_hits, r.matrix
+    chunks = matrix.chunks
+
     if not chunks:
+        count("no_chunks")
         raise HTTPException(status_code=404, detail="No chunks found for user")
 
-    chunk_by_id = {c["id"]: c for c in chunks if c.get("id")}
-
-    # cosine similarity for every chunk
-    cosine_by_id = {}
-    for c in chunks:
-        emb = c.get("embedding")
-        cid = c.get("id")
-        if emb and cid:
-            cosine_by_id[cid] = float(cosine_similarity(query_embedding, emb))
-
     # normalize BM25 scores
     bm25_by_id_raw = {
         row["id"]: float(row["score"]) for row in bm25_hits if row.get("id")
@@ -175,42 +360,29 @@ async def chat_endpoint(request: ChatRequest, user: dict = Depends(get_current_u
     alpha = float(getattr(request, "alpha", 0.7))
     top_k = int(getattr(request, "top_k", 5))
 
-    candidates = []
-    for cid, c in chunk_by_id.items():
-        cos = cosine_by_id.get(cid, 0.0)
-        bm = bm25_by_id.get(cid, 0.0)
-        final = alpha * cos + (1.0 - alpha) * bm
-        candidates.append((final, c.get("embedding"), c))
+    # cosine for every chunk in one mat-vec, then blend with BM25
+    with span("fusion"):
+        fused = matrix.fuse(query_embedding, bm25_by_id, alpha)
 
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    print(
-        "DEBUG: sample fused scores (top 5):", [round(x[0], 4) for x in candidates[:5]]
-    )
+    # optional rerank of the top fused candidates (falls back to fused)
+    with span("rerank"):
+        fused, pool_texts = await rerank(
+            user_email, standalone_q, matrix, fused, query_embedding, bm25_by_id
+        )
 
-    # Dynamic top_k + MMR selection
-    dyn_k = dynamic_top_k(request.question, top_k)
+    # Ranked candidates (MMR order), at least the dynamic top_k of them
+    n_candidates = context_candidates(request.question, top_k)
 
     use_mmr = bool(getattr(request, "use_mmr", True))
-    if use_mmr:
-        selected_chunks = mmr_select(candidates, k=dyn_k, lambda_=0.7)
-    else:
-        selected_chunks = [c[2] for c in candidates[:dyn_k]]
+    with span("mmr"):
+        picked = select_chunks(matrix, fused, n_candidates, use_mmr)
+    with span("hydrate"):
+        candidates = await with_text(user_email, picked, known=pool_texts)
 
-    print(
-        f"DEBUG: dynamic_k used = {dyn_k}, selected_chunks = {len(selected_chunks)} (use_mmr={use_mmr})"
-    )
-
-    # Group all selected chunks under one file tag
-    file_name = selected_chunks[0].get("file_name", "unknown")
-
-    # Collect unique pages (sorted)
-    pages = sorted({ch.get("page", "?") for ch in selected_chunks})
-
-    # Build context with source tags for citations
-    context = (
-        f"[file:{file_name} pages:{','.join(map(str, pages))}]\n"
-        + "\n\n---\n\n".join(ch.get("text", "") for ch in selected_chunks)
-    )
+    # Fill the token budget best-first, one [file:... page:...] tag per passage
+    with span("pack"):
+        context, used = pack_context(candidates)
+    sources = citations(used)
 
     prompt = (
         "You are a RAG assistant. Answer ONLY with the context below.\n"
@@ -220,30 +392,29 @@ async def chat_endpoint(request: ChatRequest, user: dict = Depends(get_current_u
         "Answer:"
     )
 
-    print("DEBUG: prompt first 400 chars =", repr(prompt[:400]))
-
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        temperature=0,
-        messages=[
-            {
-                "role": "system",
-                "content": "Follow instructions strictly. Use only the provided context.",
-            },
-            {"role": "user", "content": prompt},
-        ],
-    )
+    with span("completion"):
+        response = await client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            temperature=0,
+            messages=answer_messages(prompt),
+        )
 
-    await append_turns(
-        conv_id,
-        user_email,
-        request.question,
-        response.model_dump()["choices"][0]["message"]["content"],
-    )
+    answer = response.model_dump()["choices"][0]["message"]["content"]
+    await append_turns(conv_id, user_email, request.question, answer)
+    elapsed = time.perf_counter() - request_start
+    if answer:
+        answer_cache.put(
+            user_email,
+            r.corpus_version,
+            standalone_q,
+            query_embedding,
+            params,
+            {"answer": answer, "sources": sources},
+            elapsed,
+        )
+    observe("chat_total", elapsed)
 
-    return ChatResponse(
-        answer=response.model_dump()["choices"][0]["message"]["content"]
-    )
+    return ChatResponse(answer=answer, sources=sources)
 
 
 @router.get("/stream")
@@ -265,110 +436,87 @@ async def chat_stream_endpoint(
       - authenticates the user (Authorization header OR ?token=)
       - optionally condenses follow-up questions (if conversation_id provided)
       - runs retrieval (embedding + BM25 + fusion + MMR)
-      - builds the RAG prompt (single file header + pages list)
+      - packs the ranked chunks into the RAG prompt's token budget and sends
+        their files and pages as a 'sources' event (JSON list)
       - streams the LLM response tokens as SSE 'token' events
+    A question close enough to one already answered on the same corpus is
+    replayed from the answer cache as 'token' events, without retrieval or LLM.
     """
     user = await get_current_user_for_sse(request, token)
     user_email = user.get("email")
     if not user_email:
         raise HTTPException(status_code=400, detail="Missing user email")
-    standalone_q = question
-    conv_id = conversation_id
-    if conversation_id is not None:
-        conv_id = await ensure_conversation(conversation_id, user_email)
-        history = await load_history(conv_id, user_email, limit=10)
-        try:
-            standalone_q = condense_question(history, question)
-        except Exception:
-            standalone_q = question
-    query_embedding = embed_text(standalone_q)
-    driver = get_driver()
-    async with driver.session() as session:
-        # fetch all chunks
-        result = await session.run(
-            """
-            MATCH (u:User {email: $email})-[:UPLOADED]->(c:Chunk)
-            RETURN
-              c.id        AS id,
-              c.text      AS text,
-              c.embedding AS embedding,
-              c.file_name AS file_name,
-              c.pdf_id    AS pdf_id,
-              c.page      AS page
-            """,
-            {"email": user_email},
-        )
-        chunks = await result.data()
-        bm25_res = await session.run(
-            """
-            CALL db.index.fulltext.queryNodes('chunkText', $q) YIELD node, score
-            WHERE node.user_email = $email
-            RETURN node.id AS id, score
-            ORDER BY score DESC
-            LIMIT 100
-            """,
-            {"q": standalone_q, "email": user_email},
-        )
-        bm25_hits = await bm25_res.data()
+    count("stream_request")
+    request_start = time.perf_counter()
+    params = answer_params(top_k, alpha, use_mmr)
+    r = await retrieve(
+        user_email,
+        question,
+        conversation_id,
+        use_history=conversation_id is not None,
+        answer_params=params,
+    )
+    conv_id, standalone_q = r.conv_id, r.standalone_q
+
+    if r.cached_answer is not None:
+        count("answer_cache_hit")
+        cached_answer = r.cached_answer["answer"]
+        cached_sources = r.cached_answer["sources"]
+
+        async def cached_gen():
+            yield {"event": "start", "data": "ok"}
+            yield {"event": "sources", "data": json.dumps(cached_sources)}
+            observe("first_token", time.perf_counter() - request_start)
+            # word-sized tokens, so clients render it like a live answer
+            for token_text in re.findall(r"\S+\s*|\s+", cached_answer):
+                yield {"event": "token", "data": token_text}
+            yield {"event": "end", "data": cached_answer}
+            observe("stream_total", time.perf_counter() - request_start)
+            if conv_id is not None:
+                try:
+                    await append_turns(conv_id, user_email, question, cached_answer)
+                except Exception as e:
+                    print("WARN: failed to append_turns:", e)
+
+        return EventSourceResponse(cached_gen(), media_type="text/event-stream")
 
-    print("DEBUG: total user chunks =", len(chunks))
-    print("DEBUG: bm25 hits =", len(bm25_hits))
+    query_embedding, bm25_hits, matrix = r.query_embedding, r.bm25_hits, r.matrix
+    chunks = matrix.chunks
 
     if not chunks:
+        count("no_chunks")
 
         async def empty_gen():
             yield {"event": "error", "data": "No chunks found for user"}
             yield {"event": "end", "data": "DONE"}
 
         return EventSourceResponse(empty_gen())
-    chunk_by_id = {c["id"]: c for c in chunks if c.get("id")}
-    cosine_by_id = {}
-    for c in chunks:
-        emb = c.get("embedding")
-        cid = c.get("id")
-        if emb and cid:
-            cosine_by_id[cid] = float(cosine_similarity(query_embedding, emb))
-
     bm25_by_id_raw = {
         row["id"]: float(row["score"]) for row in bm25_hits if row.get("id")
     }
     bm25_by_id = min_max_normalize(bm25_by_id_raw)
-    candidates = []
-    for cid, c in chunk_by_id.items():
-        cos = cosine_by_id.get(cid, 0.0)
-        bm = bm25_by_id.get(cid, 0.0)
-        final = float(alpha) * cos + (1.0 - float(alpha)) * bm
-        candidates.append((final, c.get("embedding"), c))
-
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    print(
-        "DEBUG: sample fused scores (top 5):", [round(x[0], 4) for x in candidates[:5]]
-    )
-    dyn_k = dynamic_top_k(standalone_q, top_k)
-    if use_mmr:
-        selected_chunks = mmr_select(candidates, k=dyn_k, lambda_=0.7)
-    else:
-        selected_chunks = [c[2] for c in candidates[:dyn_k]]
-
-    print(
-        f"DEBUG: dynamic_k used = {dyn_k}, selected_chunks = {len(selected_chunks)} (use_mmr={use_mmr})"
-    )
+    with span("fusion"):
+        fused = matrix.fuse(query_embedding, bm25_by_id, alpha)
+    with span("rerank"):
+        fused, pool_texts = await rerank(
+            user_email, standalone_q, matrix, fused, query_embedding, bm25_by_id
+        )
+    n_candidates = context_candidates(standalone_q, top_k)
+    with span("mmr"):
+        picked = select_chunks(matrix, fused, n_candidates, use_mmr)
+    with span("hydrate"):
+        candidates = await with_text(user_email, picked, known=pool_texts)
 
-    if not selected_chunks:
+    if not candidates:
 
         async def empty_gen2():
             yield {"event": "error", "data": "No candidate chunks selected"}
             yield {"event": "end", "data": "DONE"}
 
         return EventSourceResponse(empty_gen2())
-    file_name = selected_chunks[0].get("file_name", "unknown")
-    page_values = sorted(
-        {p for p in (ch.get("page") for ch in selected_chunks) if p is not None}
-    )
-    pages_str = ",".join(str(p) for p in page_values) if page_values else "?"
-    context = f"[file:{file_name} pages:{pages_str}]\n" + "\n\n---\n\n".join(
-        ch.get("text", "") for ch in selected_chunks
-    )
+    with span("pack"):
+        context, used = pack_context(candidates)
+    sources = citations(used)
 
     prompt = (
         "You are a RAG assistant. Answer ONLY with the context below.\n"
@@ -378,63 +526,43 @@ async def chat_stream_endpoint(
         "Answer:"
     )
 
-    print("DEBUG: prompt first 400 chars =", repr(prompt[:400]))
-
     async def event_generator():
         yield {"event": "start", "data": "ok"}
+        yield {"event": "sources", "data": json.dumps(sources)}
 
         full_parts: list[str] = []
 
         try:
-            with client.chat.completions.stream(
-                model="gpt-3.5-turbo",
-                temperature=0,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Follow instructions strictly. Use only the provided context.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-            ) as stream:
-                for event in stream:
-                    if getattr(event, "type", None) in (
-                        "content.delta",
-                        "message.delta",
-                    ) and getattr(event, "delta", None):
-                        token_text = event.delta
-                        full_parts.append(token_text)
-                        yield {"event": "token", "data": token_text}
-                    elif getattr(event, "type", None) in (
-                        "message.stop",
-                        "response.completed",
-                        "message.complete",
-                    ):
-                        break
-
-                try:
-                    final = stream.get_final_response()
-                    final_text = ""
-                    if final is not None:
-                        try:
-                            final_text = final.model_dump().get("choices", [])[0].get("message", {}).get("content", "")  # type: ignore
-                        except Exception:
-                            final_text = "".join(full_parts)
-                    else:
-                        final_text = "".join(full_parts)
-                except Exception:
-                    final_text = "".join(full_parts)
+            async for token_text in stream_completion(prompt):
+                if not full_parts:
+                    observe("first_token", time.perf_counter() - request_start)
+                full_parts.append(token_text)
+                yield {"event": "token", "data": token_text}
 
         except Exception as e:
+            count("llm_stream_error")
             yield {"event": "error", "data": f"LLM stream error: {str(e)}"}
             yield {"event": "end", "data": "DONE"}
             return
 
-        yield {"event": "end", "data": "".join(full_parts)}
+        answer = "".join(full_parts)
+        yield {"event": "end", "data": answer}
+        elapsed = time.perf_counter() - request_start
+        observe("stream_total", elapsed)
+        if answer:
+            answer_cache.put(
+                user_email,
+                r.corpus_version,
+                standalone_q,
+                query_embedding,
+                params,
+                {"answer": answer, "sources": sources},
+                elapsed,
+            )
 
         if conv_id is not None:
             try:
-                await append_turns(conv_id, user_email, question, "".join(full_parts))
+                await append_turns(conv_id, user_email, question, answer)
             except Exception as e:
                 print("WARN: failed to append_turns:", e)
 
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+from app.config import settings
+from app.neo4j_driver import get_driver
+from app.scoring import ChunkMatrix
+
+
+class ChunkCache:
+    """
+    In-process LRU of decoded per-user chunk matrices.
+
+    Each entry is tagged with the User node's `chunks_version`, which the
+    pdf-graphrag-service bumps whenever it writes new chunks for that user.
+    A version mismatch means the entry is stale and gets reloaded.
+    Entries are evicted least-recently-used first once either the user count
+    or the memory budget is exceeded.
+    """
+
+    def __init__(self, max_bytes: int, max_users: int):
+        self.max_bytes = max_bytes
+        self.max_users = max_users
+        self._entries: OrderedDict[str, tuple[object, ChunkMatrix]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_email: str, version) -> ChunkMatrix | None:
+        entry = self._entries.get(user_email)
+        if entry is None:
+            self.misses += 1
+            return None
+        cached_version, matrix = entry
+        if cached_version != version:
+            self.invalidate(user_email)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_email)
+        self.hits += 1
+        return matrix
+
+    def put(self, user_email: str, version, matrix: ChunkMatrix) -> None:
+        self.invalidate(user_email)
+        size = matrix.nbytes
+        if size > self.max_bytes:
+            return
+        self._entries[user_email] = (version, matrix)
+        self._bytes += size
+        while self._entries and (
+            self._bytes > self.max_bytes or len(self._entries) > self.max_users
+        ):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def invalidate(self, user_email: str) -> None:
+        entry = self._entries.pop(user_email, None)
+        if entry is not None:
+            self._bytes -= entry[1].nbytes
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+chunk_cache = ChunkCache(
+    max_bytes=settings.CHUNK_CACHE_MAX_MB * 1024 * 1024,
+    max_users=settings.CHUNK_CACHE_MAX_USERS,
+)
+
+
+async def load_user_chunks(user_email: str, version) -> ChunkMatrix:
+    """
+    Return the user's chunks as a ChunkMatrix, only pulling embeddings from
+    Neo4j when the cached copy is missing or older than version, the user's
+    current chunks_version (see retrieval.fetch_chunks_version).
+    Chunk text is not loaded (nor cached); it is hydrated for the winners only.
+    """
+    matrix = chunk_cache.get(user_email, version)
+    if matrix is not None:
+        return matrix
+
+    driver = get_driver()
+    async with driver.session() as session:
+        # fetch all chunks for this user, without text (see retrieval.hydrate_texts)
+        result = await session.run(
+            """
+            MATCH (u:User {email: $email})-[:UPLOADED]->(c:Chunk)
+            RETURN
+              c.id               AS id,
+              // the float list only for chunks without a packed copy
+              CASE WHEN c.embedding_bin IS NULL THEN c.embedding END AS embedding,
+              c.embedding_bin    AS embedding_bin,
+              c.embedding_format AS embedding_format,
+              c.embedding_scale  AS embedding_scale,
+              c.file_name        AS file_name,
+              c.pdf_id           AS pdf_id,
+              c.page             AS page
+            """,
+            {"email": user_email},
+        )
+        chunks = await result.data()
+
+    matrix = ChunkMatrix(chunks)
+    chunk_cache.put(user_email, version, matrix)
+    return matrix
@@ -0,0 +1,85 @@
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+class Settings:
+    # per-user chunk matrix cache (see app/chunk_cache.py)
+    CHUNK_CACHE_MAX_MB    = int(os.getenv("CHUNK_CACHE_MAX_MB", "512"))
+    CHUNK_CACHE_MAX_USERS = int(os.getenv("CHUNK_CACHE_MAX_USERS", "256"))
+
+    # dense retrieval: "scan" scores every user chunk, "vector" asks the
+    # chunkEmbedding index and "ann" the local per-user IVF files (written by
+    # pdf-graphrag-service into ANN_INDEX_DIR) for the top-N; both fall back to scan
+    RETRIEVAL_MODE    = os.getenv("RETRIEVAL_MODE", "scan").lower()
+    VECTOR_INDEX_NAME = os.getenv("VECTOR_INDEX_NAME", "chunkEmbedding")
+    VECTOR_TOP_N      = int(os.getenv("VECTOR_TOP_N", "100"))
+    # the index is shared by all users and filtered afterwards, so over-fetch;
+    # too few of the user's chunks left -> retry with 4x the fetch up to
+    # VECTOR_MAX_FETCH, then scan
+    VECTOR_OVERSAMPLE = int(os.getenv("VECTOR_OVERSAMPLE", "4"))
+    VECTOR_MAX_FETCH  = int(os.getenv("VECTOR_MAX_FETCH", "6400"))
+    ANN_INDEX_DIR     = os.getenv("ANN_INDEX_DIR", "")
+    # IVF lists searched per query: higher = better recall, slower
+    ANN_NPROBE        = int(os.getenv("ANN_NPROBE", "16"))
+
+    # BM25 leg: per-user inverted index files written by pdf-graphrag-service
+    # (see app/lexical_index.py); "" or a stale index = the chunkText fulltext index
+    LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "")
+
+    # MMR only diversifies among the MMR_POOL_SIZE best fused scores
+    MMR_POOL_SIZE = int(os.getenv("MMR_POOL_SIZE", "100"))
+
+    # Prompt context (see app/context_packer.py): selected chunks are packed
+    # best-first into CONTEXT_TOKEN_BUDGET tokens; a chunk whose word 3-grams
+    # overlap a packed one by CONTEXT_DEDUPE_THRESHOLD or more is dropped
+    CONTEXT_TOKEN_BUDGET     = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.8"))
+    # ranked (MMR or fused) candidates offered to the packer, at least top_k;
+    # the budget decides how many of them end up in the prompt
+    CONTEXT_MAX_CHUNKS       = int(os.getenv("CONTEXT_MAX_CHUNKS", "20"))
+
+    # Reranking of the RERANK_TOP_M best fused candidates:
+    # blend (off) | rrf | bm25f | cross_encoder (needs sentence-transformers)
+    RERANK_BACKEND      = os.getenv("RERANK_BACKEND", "blend").lower()
+    RERANK_TOP_M        = int(os.getenv("RERANK_TOP_M", "50"))
+    RERANK_BATCH_SIZE   = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+    # over budget -> the blend score is used as is
+    RERANK_BUDGET_MS    = int(os.getenv("RERANK_BUDGET_MS", "300"))
+    CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+    # In-process TTL+LRU caches for query embeddings and condensed questions
+    QUERY_CACHE_MAX_ENTRIES    = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2048"))
+    QUERY_CACHE_TTL_SECONDS    = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+    CONDENSE_CACHE_MAX_ENTRIES = int(os.getenv("CONDENSE_CACHE_MAX_ENTRIES", "2048"))
+    CONDENSE_CACHE_TTL_SECONDS = int(os.getenv("CONDENSE_CACHE_TTL_SECONDS", "600"))
+
+    # Semantic answer cache (see app/answer_cache.py), off unless
+    # ANSWER_CACHE_MAX_PER_USER > 0: a standalone question with cosine >=
+    # ANSWER_CACHE_THRESHOLD to one answered on the same chunks_version, and the
+    # same numbers and names, reuses its answer. ada-002 similarities sit in a
+    # narrow high band, so keep the threshold close to 1.
+    ANSWER_CACHE_MAX_USERS    = int(os.getenv("ANSWER_CACHE_MAX_USERS", "1024"))
+    ANSWER_CACHE_MAX_PER_USER = int(os.getenv("ANSWER_CACHE_MAX_PER_USER", "0"))
+    ANSWER_CACHE_TTL_SECONDS  = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+    ANSWER_CACHE_THRESHOLD    = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.985"))
+
+    # Client-side timeouts for every OpenAI call (AsyncOpenAI)
+    OPENAI_TIMEOUT_SECONDS         = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+    OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+
+    # Auth: pooled client to user-management plus a short-lived cache of
+    # verified tokens (keyed by sha256 of the token)
+    AUTH_CACHE_TTL_SECONDS    = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_CACHE_MAX_ENTRIES    = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "4096"))
+    AUTH_HTTP_MAX_CONNECTIONS = int(os.getenv("AUTH_HTTP_MAX_CONNECTIONS", "100"))
+    # Same value as user-management's jwt.secret to verify tokens locally; "" = ask /profile.
+    # jjwt treats that string as base64, set JWT_SECRET_BASE64=false for a raw key.
+    JWT_SECRET        = os.getenv("JWT_SECRET", "")
+    JWT_SECRET_BASE64 = os.getenv("JWT_SECRET_BASE64", "true").lower() == "true"
+
+    # Stage latency histograms and event counters on GET /metrics (see app/metrics.py).
+    # METRICS_SAMPLE_RATE is the fraction of stage timings recorded.
+    METRICS_ENABLED     = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+
+settings = Settings()
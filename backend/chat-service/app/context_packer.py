@@ -0,0 +1,193 @@
+import re
+from functools import lru_cache
+
+from app.config import settings
+
+# Builds the "Context:" section of the answer prompt from the selected chunks:
+#   - chunks are taken in the order given (best first) while they fit in
+#     CONTEXT_TOKEN_BUDGET tokens; one that doesn't fit is skipped, so a
+#     smaller chunk further down can still use the room
+#   - a chunk that mostly repeats one already taken (same text uploaded twice,
+#     or swallowed by a bigger overlapping chunk) is dropped
+#   - chunks that follow each other in the same document and page are merged
+#     into one passage, minus the text they overlap by (CHUNK_OVERLAP_TOKENS)
+#   - every passage gets its own [file:... page:...] tag for citations
+
+_WORD = re.compile(r"\S+")
+# word n-grams compared for near-duplicate detection
+SHINGLE_SIZE = 3
+# longest chunk overlap looked for when merging neighbours, in words
+MAX_OVERLAP_WORDS = 200
+SEPARATOR = "\n\n---\n\n"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """
+    cl100k_base matches gpt-3.5-turbo. Returns None when tiktoken or its
+    encoding file is unavailable, in which case we estimate.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print("WARN: tiktoken cl100k_base unavailable, estimating tokens as chars/4:", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    enc = _encoding()
+    if enc is None:
+        return text[: max_tokens * 4]
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _shingles(words: list[str]) -> set[tuple[str, ...]]:
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {
+        tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _is_duplicate(shingles: set, kept: list[set], threshold: float) -> bool:
+    """
+    Near-duplicate of a kept chunk: Jaccard similarity, or containment of the
+    smaller set in the larger, at or above threshold.
+    """
+    for other in kept:
+        common = len(shingles & other)
+        if not common:
+            continue
+        if common / len(shingles | other) >= threshold:
+            return True
+        if common / min(len(shingles), len(other)) >= threshold:
+            return True
+    return False
+
+
+def _position(chunk: dict) -> tuple[str, int] | None:
+    """
+    (pdf_id, index in the document) from the chunk id "<email>-<pdf_id>-<n>".
+    """
+    prefix, _, index = (chunk.get("id") or "").rpartition("-")
+    pdf_id = chunk.get("pdf_id")
+    if not pdf_id or not index.isdigit() or not prefix.endswith(pdf_id):
+        return None
+    return pdf_id, int(index)
+
+
+def _without_overlap(previous: str, text: str) -> str:
+    """
+    text minus its longest prefix (in words) that ends previous.
+    """
+    before = _WORD.findall(previous)[-MAX_OVERLAP_WORDS:]
+    words = list(_WORD.finditer(text))
+    for size in range(min(len(before), len(words)), 0, -1):
+        if [m.group() for m in words[:size]] == before[-size:]:
+            return text[words[size - 1].end() :].lstrip() if size < len(words) else ""
+    return text
+
+
+def _passages(chunks: list[dict]) -> list[dict]:
+    """
+    Merge runs of consecutive chunks (same document and page) into passages,
+    ordered by their best chunk.
+    """
+    runs: list[list[tuple[int, int, dict]]] = []
+    by_page: dict[tuple, list[tuple[int, int, dict]]] = {}
+    for order, chunk in enumerate(chunks):
+        position = _position(chunk)
+        if position is None:
+            runs.append([(order, 0, chunk)])
+        else:
+            by_page.setdefault((position[0], chunk.get("page")), []).append(
+                (order, position[1], chunk)
+            )
+
+    for members in by_page.values():
+        members.sort(key=lambda m: m[1])
+        run = [members[0]]
+        for member in members[1:]:
+            if member[1] == run[-1][1] + 1:
+                run.append(member)
+            else:
+                runs.append(run)
+                run = [member]
+        runs.append(run)
+    runs.sort(key=lambda run: min(order for order, _, _ in run))
+
+    passages = []
+    for run in runs:
+        first = run[0][2]
+        text = first["text"]
+        for _, _, chunk in run[1:]:
+            rest = _without_overlap(text, chunk["text"])
+            if rest:
+                text = f"{text}\n{rest}"
+        passages.append({**first, "text": text})
+    return passages
+
+
+def _tag(chunk: dict) -> str:
+    page = chunk.get("page")
+    if page is None:
+        page = "?"
+    return f"[file:{chunk.get('file_name') or 'unknown'} page:{page}]"
+
+
+def citations(used: list[dict]) -> list[dict]:
+    """
+    Distinct {"file_name", "page"} of the packed chunks, in packing order.
+    """
+    seen = {}
+    for chunk in used:
+        key = (chunk.get("file_name"), chunk.get("page"))
+        seen.setdefault(key, {"file_name": key[0], "page": key[1]})
+    return list(seen.values())
+
+
+def pack_context(
+    chunks: list[dict], budget: int | None = None
+) -> tuple[str, list[dict]]:
+    """
+    Context text for the prompt from chunks (best first, with "text"), and
+    the chunks it uses. budget defaults to CONTEXT_TOKEN_BUDGET.
+    """
+    budget = settings.CONTEXT_TOKEN_BUDGET if budget is None else budget
+    threshold = settings.CONTEXT_DEDUPE_THRESHOLD
+    separator_tokens = count_tokens(SEPARATOR)
+
+    used: list[dict] = []
+    kept_shingles: list[set] = []
+    spent = 0
+    for chunk in chunks:
+        text = (chunk.get("text") or "").strip()
+        if not text:
+            continue
+        shingles = _shingles(_WORD.findall(text.lower()))
+        if _is_duplicate(shingles, kept_shingles, threshold):
+            continue
+        cost = count_tokens(_tag(chunk)) + 1 + count_tokens(text)
+        if used:
+            cost += separator_tokens
+        if spent + cost > budget:
+            if used:
+                continue
+            # the best chunk alone is over budget: keep its beginning
+            text = _truncate(text, max(budget - count_tokens(_tag(chunk)) - 1, 0))
+            cost = budget
+        used.append({**chunk, "text": text})
+        kept_shingles.append(shingles)
+        spent += cost
+
+    context = SEPARATOR.join(f"{_tag(p)}\n{p['text']}" for p in _passages(used))
+    return context, used
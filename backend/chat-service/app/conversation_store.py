@@ -1,31 +1,40 @@
+from neo4j.exceptions import Neo4jError
+
+from app.metrics import span
 from app.neo4j_driver import get_driver
 import uuid
 
+# Turns form a linked list hanging off the conversation:
+#   (c:Conversation)-[:LAST_TURN]->(newest:Turn)-[:PREV]->(older:Turn)-[:PREV]->...
+# so reading the last N turns walks N hops instead of sorting every turn.
+# HAS_TURN edges are still created for anything that lists all turns.
+
 
-async def ensure_conversation(conversation_id: str | None, user_email: str) -> str:
+async def ensure_schema() -> None:
     """
-    Make sure a Conversation node exists. Return its id.
+    Constraint (and backing index) on Conversation.id; called at startup.
     """
-    cid = conversation_id or str(uuid.uuid4())
     driver = get_driver()
     async with driver.session() as session:
-        await session.run(
-            """
-            MERGE (c:Conversation {id: $cid})
-            ON CREATE SET c.user_email = $email,
-                          c.created_at = timestamp(),
-                          c.next_idx = 0
-        """,
-            {"cid": cid, "email": user_email},
-        )
-    return cid
+        try:
+            await (
+                await session.run(
+                    """
+                    CREATE CONSTRAINT conversationId IF NOT EXISTS
+                    FOR (c:Conversation) REQUIRE c.id IS UNIQUE
+                    """
+                )
+            ).consume()
+        except Neo4jError as e:
+            print("WARN: could not create constraint conversationId:", e)
 
 
-async def load_history(
-    conversation_id: str, user_email: str, limit: int = 10
+async def _load_history_legacy(
+    conversation_id: str, user_email: str, limit: int
 ) -> list[dict]:
     """
-    Return the last `limit` turns as [{"role": "...", "content": "..."}], oldest→newest.
+    History of a conversation written before LAST_TURN existed (sorted by idx).
+    It gets linked on its next append_turns.
     """
     driver = get_driver()
     async with driver.session() as session:
@@ -41,32 +50,98 @@ async def load_history(
         rows = await res.data()
 
     # rows are newest→oldest; reverse to oldest→newest
-    hist = [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
-    return hist
+    return [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
+
+
+async def open_conversation(
+    conversation_id: str | None, user_email: str, limit: int = 10
+) -> tuple[str, list[dict]]:
+    """
+    Make sure the Conversation node exists and return (id, last `limit` turns)
+    in one round-trip. Turns are [{"role": "...", "content": "..."}], oldest→newest.
+    """
+    cid = conversation_id or str(uuid.uuid4())
+    if limit <= 0:
+        limit = 1
+    driver = get_driver()
+    with span("neo4j_open_conversation"):
+        async with driver.session() as session:
+            # variable-length bounds can't be parameters; limit is an int
+            res = await session.run(
+                f"""
+                MERGE (c:Conversation {{id: $cid}})
+                ON CREATE SET c.user_email = $email,
+                              c.created_at = timestamp(),
+                              c.next_idx = 0
+                WITH c
+                OPTIONAL MATCH (c)-[:LAST_TURN]->(last:Turn)
+                OPTIONAL MATCH path = (last)-[:PREV*0..{int(limit) - 1}]->(t:Turn)
+                WITH c, last, t, length(path) AS depth
+                ORDER BY depth DESC
+                RETURN c.user_email AS owner,
+                       coalesce(c.next_idx, 0) AS next_idx,
+                       last IS NOT NULL AS linked,
+                       [x IN collect({{role: t.role, content: t.content}})
+                        WHERE x.role IS NOT NULL] AS turns
+            """,
+                {"cid": cid, "email": user_email},
+            )
+            row = await res.single()
+
+    if row is None or row["owner"] != user_email:
+        return cid, []
+    if not row["linked"] and row["next_idx"] > 0:
+        return cid, await _load_history_legacy(cid, user_email, limit)
+    return cid, [dict(t) for t in row["turns"]]
 
 
 async def append_turns(
     conversation_id: str, user_email: str, user_q: str, assistant_a: str
 ) -> None:
     """
-    Append a user turn and an assistant turn, keeping an incrementing idx.
+    Append a user turn and an assistant turn, keeping an incrementing idx,
+    and move LAST_TURN to the new assistant turn. A conversation from before
+    LAST_TURN existed has its old turns chained in idx order first (once).
     """
     driver = get_driver()
-    async with driver.session() as session:
-        await session.run(
-            """
-            MATCH (c:Conversation {id: $cid, user_email: $email})
-            WITH c, coalesce(c.next_idx, 0) AS i
-            SET c.next_idx = i + 2
-            CREATE (u:Turn {role: 'user',      content: $uq, idx: i,     ts: timestamp()})
-            CREATE (a:Turn {role: 'assistant', content: $aa, idx: i + 1, ts: timestamp()})
-            MERGE (c)-[:HAS_TURN]->(u)
-            MERGE (c)-[:HAS_TURN]->(a)
-        """,
-            {
-                "cid": conversation_id,
-                "email": user_email,
-                "uq": user_q,
-                "aa": assistant_a,
-            },
-        )
+    with span("neo4j_append_turns"):
+        async with driver.session() as session:
+            await session.run(
+                """
+                MATCH (c:Conversation {id: $cid, user_email: $email})
+                // write first: the node lock serializes concurrent appends, so
+                // LAST_TURN is read only after any earlier append has committed
+                SET c.next_idx = coalesce(c.next_idx, 0) + 2
+                WITH c, c.next_idx - 2 AS i
+                OPTIONAL MATCH (c)-[l:LAST_TURN]->(last:Turn)
+                CALL {
+                    // no-op (ts = []) unless this is an unlinked legacy conversation
+                    WITH c, last
+                    WITH c WHERE last IS NULL
+                    OPTIONAL MATCH (c)-[:HAS_TURN]->(t:Turn)
+                    WITH t ORDER BY t.idx
+                    WITH collect(t) AS ts
+                    FOREACH (k IN range(1, size(ts) - 1) |
+                        FOREACH (newer IN [ts[k]] |
+                            FOREACH (older IN [ts[k - 1]] |
+                                CREATE (newer)-[:PREV]->(older))))
+                    RETURN ts[-1] AS legacy_last
+                }
+                WITH c, i, l, coalesce(last, legacy_last) AS prev
+                CREATE (u:Turn {role: 'user',      content: $uq, idx: i,     ts: timestamp()})
+                CREATE (a:Turn {role: 'assistant', content: $aa, idx: i + 1, ts: timestamp()})
+                CREATE (c)-[:HAS_TURN]->(u)
+                CREATE (c)-[:HAS_TURN]->(a)
+                CREATE (a)-[:PREV]->(u)
+                FOREACH (p IN CASE WHEN prev IS NULL THEN [] ELSE [prev] END |
+                    CREATE (u)-[:PREV]->(p))
+                DELETE l
+                CREATE (c)-[:LAST_TURN]->(a)
+            """,
+                {
+                    "cid": conversation_id,
+                    "email": user_email,
+                    "uq": user_q,
+                    "aa": assistant_a,
+                },
+            )
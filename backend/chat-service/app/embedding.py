@@ -1,16 +1,49 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
+import httpx
 import os
+import time
+import unicodedata
 import numpy as np
 from dotenv import load_dotenv
+from app.config import settings
+from app.scoring import mmr_indices
+from app.ttl_cache import TTLCache
 
 load_dotenv()
 
-client = OpenAI()
+client = AsyncOpenAI(
+    timeout=httpx.Timeout(
+        settings.OPENAI_TIMEOUT_SECONDS, connect=settings.OPENAI_CONNECT_TIMEOUT_SECONDS
+    )
+)
 
+EMBEDDING_MODEL = "text-embedding-ada-002"
 
-def embed_text(text: str) -> list[float]:
-    response = client.embeddings.create(input=text, model="text-embedding-ada-002")
-    return response.data[0].embedding
+
+query_embedding_cache = TTLCache(
+    "query_embedding",
+    max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+)
+
+
+async def embed_text(text: str) -> list[float]:
+    """
+    Embed a query through the in-process TTL cache. Query embeddings are not
+    written to pdf-graphrag-service's on-disk chunk embedding cache, which
+    would otherwise grow with query traffic.
+    """
+    # NFC + collapsed whitespace, so trivially different spellings share a key
+    key = (EMBEDDING_MODEL, " ".join(unicodedata.normalize("NFC", text).split()))
+    vector = query_embedding_cache.get(key)
+    if vector is not TTLCache.MISSING:
+        return vector
+
+    start = time.perf_counter()
+    response = await client.embeddings.create(input=text, model=EMBEDDING_MODEL)
+    vector = response.data[0].embedding
+    query_embedding_cache.put(key, vector, time.perf_counter() - start)
+    return vector
 
 
 def cosine_similarity(a, b):
@@ -46,23 +79,13 @@ def mmr_select(candidates, k=5, lambda_=0.7):
     """
     candidates: list of tuples (final_score, embedding_vector(list[float]), chunk_dict)
     returns: list[chunk_dict]
+
+    Thin wrapper over scoring.mmr_indices for callers that still pass tuples;
+    every candidate is in the pool, matching the original exhaustive behaviour.
     """
     if not candidates:
         return []
-
-    rest = sorted(candidates, key=lambda x: x[0], reverse=True)
-    selected = []
-    while rest and len(selected) < k:
-        if not selected:
-            selected.append(rest.pop(0))
-            continue
-        best_idx, best_val = None, None
-        for i, cand in enumerate(rest):
-            rel = cand[0]
-
-            max_sim = max(cosine_similarity(cand[1], s[1]) for s in selected)
-            mmr_score = lambda_ * rel - (1 - lambda_) * max_sim
-            if best_val is None or mmr_score > best_val:
-                best_val, best_idx = mmr_score, i
-        selected.append(rest.pop(best_idx))
-    return [c[2] for c in selected]
+    scores = np.array([c[0] for c in candidates], dtype=np.float32)
+    embeddings = np.array([c[1] for c in candidates], dtype=np.float32)
+    picked = mmr_indices(embeddings, scores, k, lambda_, pool_size=len(candidates))
+    return [candidates[i][2] for i in picked]
@@ -0,0 +1,69 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import re
+import time
+
+# The user-management service signs with jjwt's HS512, so that is the only alg
+# accepted: never "none", a weaker HMAC, or an asymmetric alg that could be
+# confused with the shared secret.
+_ALGORITHM = "HS512"
+_NOT_BASE64 = re.compile(r"[^A-Za-z0-9+/=]")
+
+
+def _b64url_decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def secret_key(secret: str, base64_encoded: bool) -> bytes:
+    """
+    Key bytes for the shared jwt.secret.
+
+    jjwt 0.9's signWith(alg, String) / setSigningKey(String) treat the string
+    as base64 and decode it leniently: characters outside the alphabet are
+    skipped and a trailing incomplete 4-character group is dropped. By
+    default we do the same.
+    """
+    if not base64_encoded:
+        return secret.encode("utf-8")
+    cleaned = _NOT_BASE64.sub("", secret)
+    return base64.b64decode(cleaned[: len(cleaned) - len(cleaned) % 4])
+
+
+def unverified_expiry(token: str) -> float | None:
+    """
+    exp claim of a JWT without checking the signature (only for cache
+    bookkeeping); None when missing or malformed.
+    """
+    try:
+        return float(json.loads(_b64url_decode(token.split(".")[1]))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError, binascii.Error):
+        return None
+
+
+def verify_jwt(token: str, key: bytes, leeway_seconds: int = 0) -> dict | None:
+    """
+    Check an HS512-signed JWT against key and its exp claim.
+    Returns the claims when the token is valid, None otherwise.
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64url_decode(header_b64))
+        if header.get("alg") != _ALGORITHM:
+            return None
+        expected = hmac.new(
+            key, f"{header_b64}.{payload_b64}".encode("ascii"), hashlib.sha512
+        ).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature_b64)):
+            return None
+        claims = json.loads(_b64url_decode(payload_b64))
+        # a correctly signed payload can still be any JSON value; "not >="
+        # also rejects an exp of NaN
+        exp = claims.get("exp")
+        if exp is None or not float(exp) + leeway_seconds >= time.time():
+            return None
+    except (TypeError, ValueError, AttributeError, binascii.Error, UnicodeEncodeError):
+        return None
+    return claims
@@ -1,7 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
-from app.chat import router as chat_router
+from app.answer_cache import answer_cache
+from app.chat import router as chat_router, condense_cache
+from app.embedding import query_embedding_cache
+from app.chunk_cache import chunk_cache
+from app.rerank import get_reranker
+from app.auth import close_http_client, start_http_client, token_cache
+from app.conversation_store import ensure_schema
+from app.config import settings
+from app import metrics
+import asyncio
 
 from dotenv import load_dotenv
 
@@ -25,7 +35,45 @@ app.add_middleware(
 app.include_router(chat_router, prefix="/chat")
 
 
+@app.on_event("startup")
+async def startup():
+    try:
+        await ensure_schema()
+    except Exception as e:
+        # Neo4j may still be starting; chat works without the constraint
+        print("WARN: could not ensure conversation schema:", e)
+    # keep-alive pool to user-management for token verification
+    await start_http_client()
+    # load the reranker (possibly a cross-encoder model) before the first request
+    await asyncio.to_thread(get_reranker)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_client()
+
+
 # basic health check endpoint
 @app.get("/")
 async def root():
     return {"status": "Chat service is running."}
+
+
+CACHES = (query_embedding_cache, condense_cache, token_cache, answer_cache)
+for _cache in CACHES:
+    metrics.register_cache(_cache.name, _cache.stats)
+metrics.register_cache("chunk_matrix", chunk_cache.stats)
+
+
+# hit rate and saved latency of the in-process caches
+@app.get("/cache-stats")
+async def cache_stats():
+    return {cache.name: cache.stats() for cache in CACHES}
+
+
+# Prometheus text format: stage latency histograms, event counters, cache stats
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,244 @@
+import asyncio
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from app.config import settings
+from app.metrics import count
+from app.retrieval import with_text
+from app.scoring import ChunkMatrix, top_k_indices
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+class Reranker(ABC):
+    """
+    Scores (query, candidate) pairs. score() is synchronous and CPU-bound;
+    rerank() below runs it in a worker thread under the latency budget.
+
+    features carries per-candidate arrays computed during fusion
+    ("cosine", "bm25", "fused"), aligned with chunks.
+    """
+
+    name = "base"
+    # whether score() reads chunk text, which then has to be hydrated first
+    needs_text = True
+
+    @abstractmethod
+    def score(
+        self, query: str, chunks: list[dict], features: dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """
+        One score per chunk, higher is better.
+        """
+
+
+class RRFReranker(Reranker):
+    """
+    Reciprocal-rank fusion of the dense and BM25 rankings:
+    sum over rankings of 1 / (k + rank). Scale-free, so it does not depend
+    on min-max normalization of BM25 scores. Chunks with no BM25 hit are
+    left out of that ranking.
+    """
+
+    name = "rrf"
+    needs_text = False
+
+    def __init__(self, k: int = 60):
+        self.k = k
+
+    def score(self, query, chunks, features):
+        scores = np.zeros(len(chunks), dtype=np.float32)
+        for key in ("cosine", "bm25"):
+            values = features[key]
+            ranks = np.empty(len(values), dtype=np.float32)
+            ranks[np.argsort(-values, kind="stable")] = np.arange(1, len(values) + 1)
+            contribution = 1.0 / (self.k + ranks)
+            if key == "bm25":
+                contribution[values <= 0] = 0.0
+            scores += contribution
+        return scores
+
+
+class BM25FReranker(Reranker):
+    """
+    Pure-Python BM25F over three fields of each candidate: the heading (first
+    paragraph when it is short, as produced by the local chunker), the body
+    and the file name. Field weights and length normalization follow the
+    usual BM25F formulation; IDF is computed over the candidate pool.
+    """
+
+    name = "bm25f"
+
+    FIELDS = {"heading": (2.0, 0.3), "body": (1.0, 0.75), "file": (1.5, 0.0)}
+
+    def __init__(self, k1: float = 1.2):
+        self.k1 = k1
+
+    @staticmethod
+    def _fields(chunk: dict) -> dict[str, list[str]]:
+        text = chunk.get("text") or ""
+        head, sep, rest = text.partition("\n\n")
+        if sep and len(head.split()) <= 15:
+            heading, body = head, rest
+        else:
+            heading, body = "", text
+        return {
+            "heading": tokenize(heading),
+            "body": tokenize(body),
+            "file": tokenize(chunk.get("file_name") or ""),
+        }
+
+    def score(self, query, chunks, features):
+        terms = set(tokenize(query))
+        if not terms or not chunks:
+            return np.zeros(len(chunks), dtype=np.float32)
+
+        docs = [self._fields(c) for c in chunks]
+        n = len(docs)
+        avg_len = {
+            f: max(sum(len(d[f]) for d in docs) / n, 1.0) for f in self.FIELDS
+        }
+        df = Counter(
+            t for d in docs for t in terms if any(t in d[f] for f in self.FIELDS)
+        )
+
+        scores = np.zeros(n, dtype=np.float32)
+        for i, d in enumerate(docs):
+            counts = {f: Counter(d[f]) for f in self.FIELDS}
+            total = 0.0
+            for t in terms:
+                if not df[t]:
+                    continue
+                tf = 0.0
+                for f, (weight, b) in self.FIELDS.items():
+                    if counts[f][t]:
+                        norm = 1.0 - b + b * len(d[f]) / avg_len[f]
+                        tf += weight * counts[f][t] / norm
+                if tf:
+                    idf = math.log(1.0 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                    total += idf * tf / (self.k1 + tf)
+            scores[i] = total
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Local CPU cross-encoder (sentence-transformers). The package is optional:
+    it is imported on first use, and construction fails with ImportError when
+    it is missing, in which case rerank() falls back to the blend score.
+    """
+
+    name = "cross_encoder"
+
+    def __init__(self, model_name: str, batch_size: int):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = batch_size
+
+    def score(self, query, chunks, features):
+        pairs = [(query, c.get("text") or "") for c in chunks]
+        return np.asarray(
+            self.model.predict(pairs, batch_size=self.batch_size), dtype=np.float32
+        )
+
+
+@lru_cache(maxsize=1)
+def get_reranker() -> Reranker | None:
+    """
+    The configured RERANK_BACKEND, built once per process. None means the
+    blend score is final ("blend", or a backend that could not be loaded).
+    """
+    backend = settings.RERANK_BACKEND
+    try:
+        if backend == "rrf":
+            return RRFReranker()
+        if backend == "bm25f":
+            return BM25FReranker()
+        if backend == "cross_encoder":
+            return CrossEncoderReranker(
+                settings.CROSS_ENCODER_MODEL, settings.RERANK_BATCH_SIZE
+            )
+    except Exception as e:
+        print(f"WARN: reranker {backend!r} unavailable, using blend scores:", e)
+        return None
+    if backend != "blend":
+        print(f"WARN: unknown RERANK_BACKEND {backend!r}, using blend scores")
+    return None
+
+
+async def rerank(
+    user_email: str,
+    query: str,
+    matrix: ChunkMatrix,
+    fused: np.ndarray,
+    query_embedding: list[float],
+    bm25_by_id: dict[str, float],
+) -> tuple[np.ndarray, dict[str, str]]:
+    """
+    Re-score the RERANK_TOP_M best fused candidates with the configured backend.
+
+    Returns (scores, texts). scores is aligned with matrix rows: the pool gets
+    its rerank scores min-max scaled into [0, 1] (so MMR's relevance/diversity
+    trade-off keeps its meaning), every other row gets -1. When there is no
+    backend or it does not finish within RERANK_BUDGET_MS, fused is returned
+    unchanged. texts maps chunk id to the text hydrated for a text-based
+    backend (empty otherwise), for with_text(..., known=texts) to reuse.
+    Hydration counts against the budget. The thread of a timed-out scorer
+    cannot be interrupted; it finishes in the background and its result is
+    dropped.
+    """
+    texts: dict[str, str] = {}
+    reranker = get_reranker()
+    if reranker is None or len(matrix) == 0:
+        return fused, texts
+
+    pool = top_k_indices(fused, settings.RERANK_TOP_M)
+    chunks = [matrix.chunks[i] for i in pool]
+    features = {
+        "fused": fused[pool],
+        "cosine": matrix.cosine(query_embedding)[pool],
+        "bm25": np.array(
+            [bm25_by_id.get(matrix.ids[i], 0.0) for i in pool], dtype=np.float32
+        ),
+    }
+
+    async def score() -> np.ndarray:
+        pool_chunks = chunks
+        if reranker.needs_text:
+            pool_chunks = await with_text(user_email, chunks)
+            texts.update((c["id"], c["text"]) for c in pool_chunks)
+        return await asyncio.to_thread(reranker.score, query, pool_chunks, features)
+
+    try:
+        pool_scores = await asyncio.wait_for(
+            score(), timeout=settings.RERANK_BUDGET_MS / 1000
+        )
+    except asyncio.TimeoutError:
+        count("rerank_timeout")
+        print(
+            f"WARN: {reranker.name} rerank exceeded {settings.RERANK_BUDGET_MS} ms, "
+            "using blend scores"
+        )
+        return fused, texts
+    except Exception as e:
+        count("rerank_error")
+        print(f"WARN: {reranker.name} rerank failed, using blend scores:", e)
+        return fused, texts
+
+    lo, hi = float(pool_scores.min()), float(pool_scores.max())
+    scaled = (
+        (pool_scores - lo) / (hi - lo) if hi > lo else np.ones_like(pool_scores)
+    )
+    scores = np.full(len(matrix), -1.0, dtype=np.float32)
+    scores[pool] = scaled
+    return scores, texts
@@ -0,0 +1,307 @@
+import asyncio
+
+from neo4j.exceptions import Neo4jError
+
+from app import lexical_index
+from app.ann_index import load_index
+from app.chunk_cache import load_user_chunks
+from app.config import settings
+from app.metrics import count
+from app.neo4j_driver import get_driver
+from app.scoring import ChunkMatrix
+
+
+async def list_user_files(user_email: str) -> list[str]:
+    """
+    Distinct file names the user has uploaded, sorted.
+    """
+    driver = get_driver()
+    async with driver.session() as session:
+        res = await session.run(
+            """
+            MATCH (u:User {email: $email})-[:UPLOADED]->(c:Chunk)
+            RETURN DISTINCT c.file_name AS file_name
+            """,
+            {"email": user_email},
+        )
+        rows = await res.data()
+    return sorted({r["file_name"] for r in rows if r.get("file_name")})
+
+
+async def _lexical_hits(query: str, user_email: str, version) -> list[dict] | None:
+    """
+    BM25 hits from the user's local inverted index (see app/lexical_index.py).
+    None when the index is missing, stale or behind Neo4j's chunks_version.
+    """
+    index = await asyncio.to_thread(
+        lexical_index.load_index, settings.LEXICAL_INDEX_DIR, user_email
+    )
+    if index is None or index.stale or index.version != version:
+        return None
+    return await asyncio.to_thread(index.search, query, 100)
+
+
+async def fetch_bm25_hits(query: str, user_email: str, version) -> list[dict]:
+    """
+    BM25 hits for the user's chunks, best first. Uses the per-user index when
+    LEXICAL_INDEX_DIR is set and at the user's chunks_version (version), else
+    the shared chunkText fulltext index (which matches every user's chunks
+    before filtering).
+    """
+    if settings.LEXICAL_INDEX_DIR:
+        try:
+            hits = await _lexical_hits(query, user_email, version)
+            if hits is not None:
+                return hits
+            count("lexical_index_fallback")
+        except (OSError, ValueError) as e:
+            # segments replaced under us by a concurrent commit, or a bad manifest
+            count("lexical_index_fallback")
+            print("WARN: lexical index failed, falling back to fulltext:", e)
+
+    driver = get_driver()
+    async with driver.session() as session:
+        bm25_res = await session.run(
+            """
+            CALL db.index.fulltext.queryNodes('chunkText', $q) YIELD node, score
+            WHERE node.user_email = $email
+            RETURN node.id AS id, score
+            ORDER BY score DESC
+            LIMIT 100
+            """,
+            {"q": query, "email": user_email},
+        )
+        return await bm25_res.data()
+
+
+async def _vector_candidates(
+    user_email: str, query_embedding: list[float], bm25_ids: list[str]
+) -> ChunkMatrix | None:
+    """
+    Top-N dense candidates from the vector index plus the BM25 hits,
+    so fusion only ever sees this small set. Text is hydrated later.
+
+    The index is shared by all users and only filtered by user afterwards, so
+    a user with few chunks among many can get few or no dense rows out of the
+    global top $fetch. When fewer than min(VECTOR_TOP_N, the user's chunk
+    count) survive, the query is retried with a larger $fetch, up to
+    VECTOR_MAX_FETCH; None when that is still short.
+    """
+    fetch = settings.VECTOR_TOP_N * settings.VECTOR_OVERSAMPLE
+    user_chunks = None
+    while True:
+        rows = await _vector_rows(user_email, query_embedding, bm25_ids, fetch)
+        dense = sum(1 for row in rows if row["dense"])
+        if dense >= settings.VECTOR_TOP_N:
+            break
+        if user_chunks is None:
+            user_chunks = await _chunk_count(user_email)
+        if dense >= user_chunks:
+            break
+        if fetch >= settings.VECTOR_MAX_FETCH:
+            return None
+        fetch = min(fetch * 4, settings.VECTOR_MAX_FETCH)
+
+    # a chunk found by both legs comes back once per leg
+    unique = {}
+    for row in rows:
+        row.pop("dense")
+        unique.setdefault(row["id"], row)
+    return ChunkMatrix(list(unique.values()))
+
+
+async def _chunk_count(user_email: str) -> int:
+    driver = get_driver()
+    async with driver.session() as session:
+        res = await session.run(
+            """
+            MATCH (u:User {email: $email})
+            RETURN COUNT { (u)-[:UPLOADED]->(:Chunk) } AS n
+            """,
+            {"email": user_email},
+        )
+        row = await res.single()
+    return row["n"] if row else 0
+
+
+async def _vector_rows(
+    user_email: str, query_embedding: list[float], bm25_ids: list[str], fetch: int
+) -> list[dict]:
+    driver = get_driver()
+    async with driver.session() as session:
+        res = await session.run(
+            """
+            CALL db.index.vector.queryNodes($index, $fetch, $embedding)
+            YIELD node AS c, score
+            WHERE c.user_email = $email
+            WITH c, score
+            ORDER BY score DESC
+            LIMIT $n
+            RETURN
+              true               AS dense,
+              c.id               AS id,
+              // the float list only for chunks without a packed copy
+              CASE WHEN c.embedding_bin IS NULL THEN c.embedding END AS embedding,
+              c.embedding_bin    AS embedding_bin,
+              c.embedding_format AS embedding_format,
+              c.embedding_scale  AS embedding_scale,
+              c.file_name        AS file_name,
+              c.pdf_id           AS pdf_id,
+              c.page             AS page
+            UNION
+            MATCH (c:Chunk)
+            WHERE c.id IN $bm25_ids AND c.user_email = $email
+            RETURN
+              false              AS dense,
+              c.id               AS id,
+              // the float list only for chunks without a packed copy
+              CASE WHEN c.embedding_bin IS NULL THEN c.embedding END AS embedding,
+              c.embedding_bin    AS embedding_bin,
+              c.embedding_format AS embedding_format,
+              c.embedding_scale  AS embedding_scale,
+              c.file_name        AS file_name,
+              c.pdf_id           AS pdf_id,
+              c.page             AS page
+            """,
+            {
+                "index": settings.VECTOR_INDEX_NAME,
+                "fetch": fetch,
+                "n": settings.VECTOR_TOP_N,
+                "embedding": query_embedding,
+                "email": user_email,
+                "bm25_ids": bm25_ids,
+            },
+        )
+        return await res.data()
+
+
+async def _chunks_by_id(user_email: str, ids: list[str]) -> ChunkMatrix:
+    """
+    Slim candidate rows for the given chunk ids, in the order Neo4j returns them.
+    """
+    driver = get_driver()
+    async with driver.session() as session:
+        res = await session.run(
+            """
+            MATCH (c:Chunk)
+            WHERE c.id IN $ids AND c.user_email = $email
+            RETURN
+              c.id               AS id,
+              // the float list only for chunks without a packed copy
+              CASE WHEN c.embedding_bin IS NULL THEN c.embedding END AS embedding,
+              c.embedding_bin    AS embedding_bin,
+              c.embedding_format AS embedding_format,
+              c.embedding_scale  AS embedding_scale,
+              c.file_name        AS file_name,
+              c.pdf_id           AS pdf_id,
+              c.page             AS page
+            """,
+            {"ids": ids, "email": user_email},
+        )
+        rows = await res.data()
+    return ChunkMatrix(rows)
+
+
+async def fetch_chunks_version(user_email: str):
+    """
+    The user's User.chunks_version (None without uploads); bumped on every upload.
+    """
+    driver = get_driver()
+    async with driver.session() as session:
+        res = await session.run(
+            """
+            OPTIONAL MATCH (u:User {email: $email})
+            RETURN u.chunks_version AS version
+            """,
+            {"email": user_email},
+        )
+        row = await res.single()
+    return row["version"] if row else None
+
+
+async def _ann_candidates(
+    user_email: str, query_embedding: list[float], bm25_ids: list[str], version
+) -> ChunkMatrix | None:
+    """
+    Top-N dense candidates from the user's local IVF index (see app/ann_index.py)
+    plus the BM25 hits. None when the index is missing, stale or behind Neo4j.
+    """
+    index = await asyncio.to_thread(load_index, settings.ANN_INDEX_DIR, user_email)
+    if index is None or index.stale or index.version != version:
+        return None
+    ids, _ = await asyncio.to_thread(
+        index.search, query_embedding, settings.VECTOR_TOP_N, settings.ANN_NPROBE
+    )
+    if not ids:
+        return None
+    return await _chunks_by_id(user_email, list(dict.fromkeys(ids + bm25_ids)))
+
+
+async def load_candidates(
+    user_email: str, query_embedding: list[float], bm25_ids: list[str], version
+) -> ChunkMatrix:
+    """
+    Candidate chunks for fusion, according to RETRIEVAL_MODE; version is the
+    user's current chunks_version.
+
+    "vector" uses the native index and falls back to the full scan when the
+    index is missing/unsupported or returns too few of this user's chunks.
+    "ann" uses the local per-user IVF files and falls back the same way when
+    they are missing or do not match the user's chunks_version.
+    """
+    if settings.RETRIEVAL_MODE == "ann" and settings.ANN_INDEX_DIR:
+        try:
+            matrix = await _ann_candidates(
+                user_email, query_embedding, bm25_ids, version
+            )
+            if matrix is not None and len(matrix):
+                return matrix
+            count("ann_fallback")
+        except (OSError, ValueError) as e:
+            count("ann_fallback")
+            print("WARN: ANN retrieval failed, falling back to scan:", e)
+    if settings.RETRIEVAL_MODE == "vector":
+        try:
+            matrix = await _vector_candidates(user_email, query_embedding, bm25_ids)
+            if matrix is not None and len(matrix):
+                return matrix
+            count("vector_fallback")
+        except Neo4jError as e:
+            count("vector_fallback")
+            print("WARN: vector retrieval failed, falling back to scan:", e)
+    return await load_user_chunks(user_email, version)
+
+
+async def hydrate_texts(user_email: str, ids: list[str]) -> dict[str, str]:
+    """
+    Second retrieval phase: text of the chunks that made it past selection,
+    looked up through the Chunk.id uniqueness constraint.
+    """
+    if not ids:
+        return {}
+    driver = get_driver()
+    async with driver.session() as session:
+        res = await session.run(
+            """
+            MATCH (c:Chunk)
+            WHERE c.id IN $ids AND c.user_email = $email
+            RETURN c.id AS id, c.text AS text
+            """,
+            {"ids": list(ids), "email": user_email},
+        )
+        rows = await res.data()
+    return {r["id"]: r["text"] or "" for r in rows}
+
+
+async def with_text(
+    user_email: str, chunks: list[dict], known: dict[str, str] | None = None
+) -> list[dict]:
+    """
+    Copies of chunks with their "text" filled in (cached matrix rows stay slim).
+    Texts already in known (id -> text, e.g. from rerank) are not fetched again.
+    """
+    known = known or {}
+    texts = await hydrate_texts(
+        user_email, [c["id"] for c in chunks if c["id"] not in known]
+    )
+    return [{**c, "text": known.get(c["id"], texts.get(c["id"], ""))} for c in chunks]
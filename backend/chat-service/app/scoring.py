@@ -0,0 +1,183 @@
+import numpy as np
+
+from app.embedding_codec import decode_many
+
+_EMBEDDING_FIELDS = ("embedding", "embedding_bin", "embedding_format", "embedding_scale")
+
+
+def _stack_embeddings(chunks: list[dict]) -> np.ndarray:
+    """
+    One float32 row per chunk. Rows are grouped by storage format so each
+    group is converted in bulk; rows whose dimension differs from the first
+    usable embedding (or that have none) stay zero.
+    """
+    groups: dict[str, list[int]] = {}
+    for i, c in enumerate(chunks):
+        if c.get("embedding_bin") is not None and c.get("embedding_format"):
+            groups.setdefault(c["embedding_format"], []).append(i)
+        elif c.get("embedding"):
+            groups.setdefault("list", []).append(i)
+
+    decoded: dict[str, np.ndarray] = {}
+    for fmt, rows in groups.items():
+        if fmt == "list":
+            lists = [chunks[i]["embedding"] for i in rows]
+            if len({len(v) for v in lists}) == 1:
+                decoded[fmt] = np.array(lists, dtype=np.float32)
+            else:
+                # ragged input: keep the most common dimension, zero the rest
+                dim = max({len(v) for v in lists}, key=[len(v) for v in lists].count)
+                keep = [i for i, v in zip(rows, lists) if len(v) == dim]
+                groups[fmt] = keep
+                decoded[fmt] = np.array(
+                    [chunks[i]["embedding"] for i in keep], dtype=np.float32
+                ).reshape(len(keep), dim)
+        else:
+            blobs = [chunks[i]["embedding_bin"] for i in rows]
+            if len({len(b) for b in blobs}) != 1:
+                groups[fmt] = []
+                continue
+            decoded[fmt] = decode_many(
+                blobs, fmt, [chunks[i].get("embedding_scale") for i in rows]
+            )
+
+    dim = next((m.shape[1] for m in decoded.values() if m.size), 0)
+    if len(decoded) == 1 and len(groups[next(iter(decoded))]) == len(chunks):
+        return next(iter(decoded.values())).reshape(len(chunks), dim)
+
+    embeddings = np.zeros((len(chunks), dim), dtype=np.float32)
+    for fmt, matrix in decoded.items():
+        if matrix.size and matrix.shape[1] == dim:
+            embeddings[groups[fmt]] = matrix
+    return embeddings
+
+
+class ChunkMatrix:
+    """
+    All candidate chunks of a user stacked into one contiguous float32 matrix.
+
+    Row norms are computed once, so scoring a query against every chunk is a
+    single matrix-vector product instead of one cosine_similarity call per chunk.
+    Chunks without a usable embedding keep a zero row and always score 0.0.
+    Embeddings may arrive as float lists or packed (embedding_bin, see
+    app/embedding_codec.py); packed rows are decoded with np.frombuffer.
+    """
+
+    def __init__(self, chunks: list[dict]):
+        self.chunks = [c for c in chunks if c.get("id")]
+        self.ids = [c["id"] for c in self.chunks]
+        self.index_by_id = {cid: i for i, cid in enumerate(self.ids)}
+
+        self.embeddings = _stack_embeddings(self.chunks)
+        self.norms = np.linalg.norm(self.embeddings, axis=1)
+        # the raw float lists / blobs are now redundant with the matrix rows
+        self.chunks = [
+            {k: v for k, v in c.items() if k not in _EMBEDDING_FIELDS}
+            for c in self.chunks
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Rough memory footprint: the matrix plus any chunk text and per-row overhead.
+        """
+        text_bytes = sum(len(c.get("text") or "") for c in self.chunks)
+        return int(self.embeddings.nbytes + self.norms.nbytes + text_bytes + 256 * len(self))
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def cosine(self, query_embedding) -> np.ndarray:
+        """
+        Cosine similarity of the query against every row, as a float32 vector.
+        """
+        q = np.asarray(query_embedding, dtype=np.float32)
+        if len(self) == 0 or q.shape[0] != self.embeddings.shape[1]:
+            return np.zeros(len(self), dtype=np.float32)
+        denom = self.norms * np.linalg.norm(q)
+        dots = self.embeddings @ q
+        return np.divide(
+            dots, denom, out=np.zeros_like(dots), where=denom > 0
+        )
+
+    def fuse(
+        self, query_embedding, bm25_by_id: dict[str, float], alpha: float
+    ) -> np.ndarray:
+        """
+        Blend cosine and (already normalized) BM25 scores:
+        alpha * cos + (1 - alpha) * bm25, one value per row.
+        """
+        bm25 = np.zeros(len(self), dtype=np.float32)
+        for cid, score in bm25_by_id.items():
+            i = self.index_by_id.get(cid)
+            if i is not None:
+                bm25[i] = score
+        alpha = float(alpha)
+        return alpha * self.cosine(query_embedding) + (1.0 - alpha) * bm25
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, via argpartition (O(N) + O(k log k)).
+    Equal scores keep index order, also across the k-th place, so the result
+    doesn't depend on how argpartition happened to split a tie.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    if np.isnan(kth):
+        # fewer than k real scores; NaNs sort last
+        return np.argsort(-scores, kind="stable")[:k]
+    above = np.flatnonzero(scores > kth)
+    tied = np.flatnonzero(scores == kth)[: k - above.size]
+    part = np.concatenate([above, tied])
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def mmr_indices(
+    embeddings: np.ndarray,
+    scores: np.ndarray,
+    k: int,
+    lambda_: float = 0.7,
+    pool_size: int = 100,
+) -> np.ndarray:
+    """
+    Maximal marginal relevance over the rows of an embedding matrix.
+
+    Only the pool_size best-scoring rows are considered (MMR never reaches far
+    down the ranking for small k). The pool is L2-normalized once, and a running
+    max-similarity-to-selected vector is updated with one mat-vec per pick, so
+    the cost is O(M*d) per pick instead of re-comparing every candidate with
+    every selected item. Zero rows have similarity 0 to everything.
+
+    :return: Selected row indices in pick order
+    """
+    pool = top_k_indices(scores, max(k, pool_size))
+    if k <= 0 or pool.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    vectors = embeddings[pool].astype(np.float32, copy=False)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    relevance = lambda_ * scores[pool].astype(np.float32)
+    max_sim = np.full(pool.size, -np.inf, dtype=np.float32)
+    available = np.ones(pool.size, dtype=bool)
+    picked: list[int] = []
+
+    # the pool is sorted best-first, so the first pick is simply position 0
+    best = 0
+    for _ in range(min(k, pool.size)):
+        picked.append(best)
+        available[best] = False
+        np.maximum(max_sim, unit @ unit[best], out=max_sim)
+        if len(picked) == k or not available.any():
+            break
+        mmr = relevance - (1.0 - lambda_) * max_sim
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+
+    return pool[picked]
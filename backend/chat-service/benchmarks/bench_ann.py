@@ -0,0 +1,90 @@
+"""
+Recall@k and latency of the per-user IVF index against the brute-force scan.
+
+Builds an index the way pdf-graphrag-service does (a base built by rebuild(),
+then documents appended as delta segments), reloads it memory-mapped and
+compares its top-k with exact cosine ranking over the same vectors
+(ChunkMatrix.cosine + top_k_indices, i.e. RETRIEVAL_MODE=scan). Run from
+backend/chat-service:
+
+    python -m benchmarks.bench_ann
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.ann_index import append_document, load_index, rebuild
+from app.scoring import top_k_indices
+
+DIM = int(os.getenv("BENCH_DIM", "1536"))
+SIZES = [10_000, 50_000, 100_000]
+# chunks added as separate documents after the base build
+DELTA_DOCS, DELTA_CHUNKS = 4, 500
+QUERIES = 100
+TOP_K = 10
+# candidates handed to fusion (VECTOR_TOP_N)
+TOP_N = 100
+NPROBES = [4, 8, 16, 32]
+
+
+def make_corpus(rng, n):
+    centers = rng.standard_normal((max(n // 50, 1), DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors += 0.6 * rng.standard_normal((n, DIM)).astype(np.float32)
+    picks = rng.integers(0, n, QUERIES)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+    return vectors, queries
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"dim={DIM} queries={QUERIES} recall@{TOP_K} (and of the top {TOP_N} candidates)")
+    print(
+        f"{'chunks':>8} {'build s':>8} {'nprobe':>7} {'scan ms':>8} "
+        f"{'ann ms':>7} {f'recall@{TOP_K}':>10} {f'recall@{TOP_N}':>11}"
+    )
+    for n in SIZES:
+        vectors, queries = make_corpus(rng, n)
+        ids = [str(i) for i in range(n)]
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        base = n - DELTA_DOCS * DELTA_CHUNKS
+
+        with tempfile.TemporaryDirectory() as root:
+            t0 = time.perf_counter()
+            rebuild(root, "bench@example.com", 1, ids[:base], vectors[:base])
+            build = time.perf_counter() - t0
+            for d in range(DELTA_DOCS):
+                part = slice(base + d * DELTA_CHUNKS, base + (d + 1) * DELTA_CHUNKS)
+                append_document(root, "bench@example.com", 2 + d, ids[part], vectors[part])
+            index = load_index(root, "bench@example.com")
+            assert len(index) == n and not index.stale
+
+            scan_s, truth_k, truth_n = 0.0, [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                scores = unit @ (q / np.linalg.norm(q))
+                top = top_k_indices(scores, TOP_N)
+                scan_s += time.perf_counter() - t0
+                truth_k.append({ids[i] for i in top[:TOP_K]})
+                truth_n.append({ids[i] for i in top})
+
+            for nprobe in NPROBES:
+                ann_s, hits_k, hits_n = 0.0, 0, 0
+                for q, tk, tn in zip(queries, truth_k, truth_n):
+                    t0 = time.perf_counter()
+                    found, _ = index.search(q, TOP_N, nprobe)
+                    ann_s += time.perf_counter() - t0
+                    hits_k += len(tk & set(found[:TOP_K]))
+                    hits_n += len(tn & set(found))
+                print(
+                    f"{n:>8} {build:>8.1f} {nprobe:>7} {scan_s / QUERIES * 1e3:>8.2f} "
+                    f"{ann_s / QUERIES * 1e3:>7.2f} {hits_k / (TOP_K * QUERIES):>10.3f} "
+                    f"{hits_n / (TOP_N * QUERIES):>11.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
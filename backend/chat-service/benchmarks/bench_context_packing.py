@@ -0,0 +1,87 @@
+"""
+Prompt context size: the previous fixed concatenation of dyn_k chunks versus
+app/context_packer.pack_context under CONTEXT_TOKEN_BUDGET.
+
+Chunk selections are synthetic: dyn_k of 5 or 10 (broad questions), chunk
+lengths drawn from what the LLM and local chunkers produce (roughly 50 to
+800 tokens), some selections containing neighbours that overlap by
+CHUNK_OVERLAP_TOKENS and re-uploaded duplicates. Run from backend/chat-service:
+
+    python -m benchmarks.bench_context_packing
+"""
+
+import random
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.context_packer import count_tokens, pack_context
+
+SELECTIONS = 500
+OVERLAP_WORDS = 60
+
+
+def make_selection(rng: random.Random) -> list[dict]:
+    k = rng.choice([5, 10])
+    words = [f"w{rng.randrange(5000)}" for _ in range(20000)]
+    chunks = []
+    for _ in range(k):
+        length = int(rng.triangular(40, 600, 150))
+        if chunks and rng.random() < 0.3:
+            # next chunk of the same page, overlapping the previous one
+            prev = chunks[-1]
+            start = prev["end"] - OVERLAP_WORDS
+            index, page = prev["index"] + 1, prev["page"]
+        else:
+            start = rng.randrange(0, len(words) - 700)
+            index, page = rng.randrange(1000), rng.randrange(1, 50)
+        end = start + length
+        text = " ".join(words[start:end])
+        chunks.append({"index": index, "page": page, "end": end, "text": text})
+        if rng.random() < 0.1:
+            chunks.append({**chunks[-1], "index": rng.randrange(1000, 2000)})
+    return [
+        {
+            "id": f"bench@example.com-doc-{c['index']}",
+            "pdf_id": "doc",
+            "page": c["page"],
+            "file_name": "bench.pdf",
+            "text": c["text"],
+        }
+        for c in chunks[:k]
+    ]
+
+
+def legacy_context(chunks: list[dict]) -> str:
+    pages = sorted({ch.get("page", "?") for ch in chunks})
+    return f"[file:{chunks[0]['file_name']} pages:{','.join(map(str, pages))}]\n" + (
+        "\n\n---\n\n".join(ch["text"] for ch in chunks)
+    )
+
+
+def main():
+    rng = random.Random(0)
+    selections = [make_selection(rng) for _ in range(SELECTIONS)]
+    legacy = [count_tokens(legacy_context(s)) for s in selections]
+
+    t0 = time.perf_counter()
+    packed = [pack_context(s) for s in selections]
+    elapsed = time.perf_counter() - t0
+    packed_tokens = [count_tokens(context) for context, _ in packed]
+
+    print(f"{SELECTIONS} selections, CONTEXT_TOKEN_BUDGET={settings.CONTEXT_TOKEN_BUDGET}")
+    print(f"{'':>8} {'p50':>6} {'p95':>6} {'max':>6} {'std':>6}  (context tokens)")
+    for name, values in (("legacy", legacy), ("packed", packed_tokens)):
+        v = np.asarray(values)
+        print(
+            f"{name:>8} {np.percentile(v, 50):>6.0f} {np.percentile(v, 95):>6.0f} "
+            f"{v.max():>6} {v.std():>6.0f}"
+        )
+    used = sum(len(u) for _, u in packed)
+    offered = sum(len(s) for s in selections)
+    print(f"chunks packed: {used}/{offered}, pack time {elapsed / SELECTIONS * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
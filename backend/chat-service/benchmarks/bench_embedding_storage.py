@@ -0,0 +1,99 @@
+"""
+Size, decode time and retrieval quality of the EMBEDDING_STORAGE formats.
+
+For each format (list / float32 / int8, see app/embedding_codec.py) reports:
+  - bytes per chunk on the Bolt wire (PackStream: 9 bytes per float in a
+    list, 1 + 2 length bytes + payload for a byte array)
+  - bytes per chunk as Python objects before decoding (list of floats vs bytes)
+  - time to build a ChunkMatrix of N rows from driver-shaped records
+  - recall@10 of dense top-k against exact float64 ranking, averaged over
+    queries drawn near corpus vectors (clustered, like real document chunks)
+
+Run from backend/chat-service:
+
+    python -m benchmarks.bench_embedding_storage
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.embedding_codec import encode
+from app.scoring import ChunkMatrix, top_k_indices
+
+DIM = int(os.getenv("BENCH_DIM", "1536"))
+N = int(os.getenv("BENCH_CHUNKS", "10000"))
+QUERIES = 200
+TOP_K = 10
+
+
+def make_corpus(rng):
+    centers = rng.standard_normal((max(N // 20, 1), DIM))
+    vectors = centers[rng.integers(0, len(centers), N)] + 0.5 * rng.standard_normal((N, DIM))
+    # ada-002 vectors are unit length
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(0, N, QUERIES)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((QUERIES, DIM))
+    return vectors, queries
+
+
+def records(vectors, fmt):
+    rows = []
+    for i, v in enumerate(vectors):
+        row = {"id": str(i)}
+        if fmt == "list":
+            row["embedding"] = v.tolist()
+        else:
+            blob, scale = encode(v, fmt)
+            row.update(embedding_bin=blob, embedding_format=fmt, embedding_scale=scale)
+        rows.append(row)
+    return rows
+
+
+def wire_bytes(row):
+    if "embedding" in row:
+        return 3 + 9 * len(row["embedding"])
+    size = 3 + len(row["embedding_bin"])
+    if row.get("embedding_scale") is not None:
+        size += 9
+    return size
+
+
+def python_bytes(row):
+    if "embedding" in row:
+        return sys.getsizeof(row["embedding"]) + sum(sys.getsizeof(x) for x in row["embedding"])
+    return sys.getsizeof(row["embedding_bin"])
+
+
+def main():
+    rng = np.random.default_rng(0)
+    vectors, queries = make_corpus(rng)
+    exact = [set(np.argsort(-(vectors @ q))[:TOP_K].tolist()) for q in queries]
+
+    print(f"N={N} dim={DIM} queries={QUERIES} k={TOP_K}")
+    print(
+        f"{'format':>8} {'wire B/chunk':>13} {'python B/chunk':>15} "
+        f"{'build ms':>9} {'recall@10':>10}"
+    )
+    for fmt in ("list", "float32", "int8"):
+        rows = records(vectors, fmt)
+        t0 = time.perf_counter()
+        matrix = ChunkMatrix(rows)
+        build = time.perf_counter() - t0
+
+        hits = 0
+        for q, truth in zip(queries, exact):
+            found = top_k_indices(matrix.cosine(q), TOP_K)
+            hits += len(truth & set(found.tolist()))
+        recall = hits / (TOP_K * QUERIES)
+
+        print(
+            f"{fmt:>8} {wire_bytes(rows[0]):>13,} {python_bytes(rows[0]):>15,} "
+            f"{build * 1e3:>9.1f} {recall:>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
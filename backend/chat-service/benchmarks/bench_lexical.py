@@ -0,0 +1,102 @@
+"""
+Latency and correctness of the per-user BM25 index (app/lexical_index.py).
+
+Builds a user's index the way pdf-graphrag-service does (a base segment,
+then documents appended as segments), reloads it memory-mapped and checks
+its top hits against a straightforward BM25 over the same texts. Query
+time depends only on this user's postings, unlike the shared chunkText
+fulltext index, which matches every user's chunks before filtering. Run
+from backend/chat-service:
+
+    python -m benchmarks.bench_lexical
+"""
+
+import math
+import random
+import tempfile
+import time
+from collections import Counter
+
+from app.lexical_index import B, K1, append_document, load_index, rebuild, tokenize
+
+SIZES = [1_000, 10_000, 50_000]
+# chunks added as separate documents after the base build
+DELTA_DOCS, DELTA_CHUNKS = 4, 200
+VOCABULARY = 30_000
+# chunk lengths vary, as they do in real documents (and BM25 scores rarely tie)
+WORDS_PER_CHUNK = (100, 400)
+QUERIES = 50
+LIMIT = 100
+
+
+def make_corpus(rng, n):
+    # Zipf-ish term distribution, like natural text
+    words = [f"w{i}" for i in range(VOCABULARY)]
+    weights = [1.0 / (i + 1) for i in range(VOCABULARY)]
+    texts = [
+        " ".join(rng.choices(words, weights, k=rng.randint(*WORDS_PER_CHUNK)))
+        for _ in range(n)
+    ]
+    queries = [" ".join(rng.choices(words[50:5000], k=rng.randint(2, 6))) for _ in range(QUERIES)]
+    return texts, queries
+
+
+def reference_bm25(docs, query, limit):
+    n = len(docs)
+    avg = sum(len(d) for d in docs) / n
+    counts = [Counter(d) for d in docs]
+    scores = [0.0] * n
+    for term in set(tokenize(query)):
+        df = sum(1 for c in counts if term in c)
+        if not df:
+            continue
+        idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        for i, c in enumerate(counts):
+            tf = c.get(term)
+            if tf:
+                scores[i] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(docs[i]) / avg))
+    best = sorted(range(n), key=lambda i: -scores[i])[:limit]
+    return [i for i in best if scores[i] > 0]
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{WORDS_PER_CHUNK[0]}-{WORDS_PER_CHUNK[1]} words/chunk, {QUERIES} queries, top {LIMIT}")
+    print(f"{'chunks':>8} {'build s':>8} {'segments':>9} {'query ms':>9} {'agree@10':>9}")
+    for n in SIZES:
+        texts, queries = make_corpus(rng, n)
+        ids = [str(i) for i in range(n)]
+        base = n - DELTA_DOCS * DELTA_CHUNKS
+
+        with tempfile.TemporaryDirectory() as root:
+            t0 = time.perf_counter()
+            rebuild(root, "bench@example.com", 1, ids[:base], texts[:base])
+            for d in range(DELTA_DOCS):
+                part = slice(base + d * DELTA_CHUNKS, base + (d + 1) * DELTA_CHUNKS)
+                append_document(root, "bench@example.com", 2 + d, ids[part], texts[part])
+            build = time.perf_counter() - t0
+            index = load_index(root, "bench@example.com")
+            assert len(index) == n and not index.stale
+
+            elapsed, results = 0.0, []
+            for q in queries:
+                t0 = time.perf_counter()
+                results.append(index.search(q, LIMIT))
+                elapsed += time.perf_counter() - t0
+
+            # the reference is O(corpus) per query; check a sample of queries
+            docs = [tokenize(t) for t in texts]
+            agree = checked = 0
+            for q, hits in list(zip(queries, results))[:5]:
+                truth = {str(i) for i in reference_bm25(docs, q, 10)}
+                agree += len(truth & {h["id"] for h in hits[:10]})
+                checked += len(truth)
+
+            print(
+                f"{n:>8} {build:>8.1f} {len(index.segments):>9} "
+                f"{elapsed / QUERIES * 1e3:>9.2f} {agree / max(checked, 1):>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+MMR selection latency as the number of candidate chunks grows.
+
+Compares the previous mmr_select loop (cosine_similarity between every
+remaining candidate and every selected item, over all chunks) with
+scoring.mmr_indices (normalized top-M pool + running max-similarity
+vector). Also reports how often both pick the same set. Run from
+backend/chat-service:
+
+    python -m benchmarks.bench_mmr
+
+The legacy loop is slow: sizes above LEGACY_MAX_N are skipped for it.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from app.scoring import mmr_indices
+
+DIM = int(os.getenv("BENCH_DIM", "1536"))
+SIZES = [1_000, 10_000, 50_000, 100_000]
+LEGACY_MAX_N = int(os.getenv("BENCH_LEGACY_MAX_N", "100000"))
+TOP_K = 10
+POOL_SIZE = 100
+LAMBDA = 0.7
+
+
+def legacy_cosine_similarity(a, b):
+    a = np.array(a)
+    b = np.array(b)
+    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
+
+def legacy_mmr_select(candidates, k=5, lambda_=0.7):
+    if not candidates:
+        return []
+
+    rest = sorted(candidates, key=lambda x: x[0], reverse=True)
+    selected = []
+    while rest and len(selected) < k:
+        if not selected:
+            selected.append(rest.pop(0))
+            continue
+        best_idx, best_val = None, None
+        for i, cand in enumerate(rest):
+            rel = cand[0]
+
+            max_sim = max(legacy_cosine_similarity(cand[1], s[1]) for s in selected)
+            mmr_score = lambda_ * rel - (1 - lambda_) * max_sim
+            if best_val is None or mmr_score > best_val:
+                best_val, best_idx = mmr_score, i
+        selected.append(rest.pop(best_idx))
+    return [c[2] for c in selected]
+
+
+def make_corpus(rng, n):
+    """
+    Clustered vectors, so near-duplicates exist and MMR has something to do.
+    Scores follow cosine to the query, as the fused score would.
+    """
+    centers = rng.standard_normal((max(n // 50, 1), DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors += 0.3 * rng.standard_normal((n, DIM)).astype(np.float32)
+    query = centers[0] + 0.3 * rng.standard_normal(DIM).astype(np.float32)
+    scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    return vectors, scores.astype(np.float32)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(
+        f"{'chunks':>8} {'legacy ms':>12} {'pool=all ms':>12} "
+        f"{f'pool={POOL_SIZE} ms':>12} {'speedup':>9} {'same set':>9}"
+    )
+    for n in SIZES:
+        vectors, scores = make_corpus(rng, n)
+
+        full, full_s = timed(mmr_indices, vectors, scores, TOP_K, LAMBDA, n)
+        pooled, pooled_s = timed(mmr_indices, vectors, scores, TOP_K, LAMBDA, POOL_SIZE)
+
+        if n <= LEGACY_MAX_N:
+            candidates = [(float(scores[i]), vectors[i], i) for i in range(n)]
+            legacy, legacy_s = timed(legacy_mmr_select, candidates, TOP_K, LAMBDA)
+            # the exhaustive vectorized MMR must reproduce the legacy picks exactly
+            assert list(full) == legacy, (list(full), legacy)
+            legacy_col = f"{legacy_s * 1e3:>12.1f}"
+            speedup = f"{legacy_s / pooled_s:>8.0f}x"
+        else:
+            legacy_col, speedup = f"{'skipped':>12}", f"{'-':>9}"
+
+        same = set(full.tolist()) == set(pooled.tolist())
+        print(
+            f"{n:>8} {legacy_col} {full_s * 1e3:>12.2f} "
+            f"{pooled_s * 1e3:>12.2f} {speedup} {str(same):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
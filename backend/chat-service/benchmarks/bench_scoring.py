@@ -0,0 +1,72 @@
+"""
+Latency of dense scoring as the number of user chunks grows.
+
+Compares the previous per-chunk cosine_similarity loop with ChunkMatrix
+(one float32 mat-vec + argpartition top-k). Run from backend/chat-service:
+
+    python -m benchmarks.bench_scoring
+"""
+
+import time
+
+import numpy as np
+
+from app.scoring import ChunkMatrix, top_k_indices
+
+DIM = 1536
+SIZES = [1_000, 5_000, 10_000, 25_000, 50_000]
+TOP_K = 10
+REPEATS = 3
+
+
+def legacy_cosine_similarity(a, b):
+    a = np.array(a)
+    b = np.array(b)
+    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
+
+def legacy_top_k(chunks, query, k):
+    cosine_by_id = {}
+    for c in chunks:
+        cosine_by_id[c["id"]] = float(legacy_cosine_similarity(query, c["embedding"]))
+    ranked = sorted(cosine_by_id.items(), key=lambda x: x[1], reverse=True)
+    return [cid for cid, _ in ranked[:k]]
+
+
+def matrix_top_k(chunks, query, k):
+    matrix = ChunkMatrix(chunks)
+    scores = matrix.cosine(query)
+    return [matrix.ids[i] for i in top_k_indices(scores, k)]
+
+
+def best_of(fn, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'chunks':>8} {'legacy ms':>12} {'build ms':>10} {'score ms':>10} {'speedup':>8}")
+    for n in SIZES:
+        vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+        chunks = [{"id": str(i), "embedding": vectors[i].tolist()} for i in range(n)]
+        query = rng.standard_normal(DIM).tolist()
+
+        assert legacy_top_k(chunks, query, TOP_K) == matrix_top_k(chunks, query, TOP_K)
+
+        legacy = best_of(legacy_top_k, chunks, query, TOP_K)
+        build = best_of(ChunkMatrix, chunks)
+        matrix = ChunkMatrix(chunks)
+        score = best_of(lambda: top_k_indices(matrix.cosine(query), TOP_K))
+        print(
+            f"{n:>8} {legacy * 1e3:>12.1f} {build * 1e3:>10.1f} "
+            f"{score * 1e3:>10.2f} {legacy / (build + score):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
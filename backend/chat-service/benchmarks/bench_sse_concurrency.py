@@ -0,0 +1,80 @@
+"""
+N simultaneous answer streams on one event loop, against a local fake OpenAI.
+
+Each stream goes through app.chat.stream_completion (AsyncOpenAI). With a
+non-blocking client the streams interleave: every stream gets its first
+token after ~FAKE_CHAT_LATENCY_MS and total wall time stays close to a
+single stream's duration. A blocking client would serialize them, so wall
+time would grow ~N times. The run fails if the streams did not overlap.
+Run from backend/chat-service:
+
+    python -m benchmarks.bench_sse_concurrency
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+PORT = int(os.getenv("FAKE_OPENAI_PORT", "9200"))
+# backend/, for the shared benchmarks.fake_services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("USER_MGMT_URL", "http://127.0.0.1:1")
+os.environ.setdefault("NEO4J_URI", "bolt://127.0.0.1:7687")
+os.environ.setdefault("NEO4J_USER", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "unused")
+
+import uvicorn  # noqa: E402
+
+from app.chat import stream_completion  # noqa: E402
+from benchmarks.fake_services import app as fake_app  # noqa: E402
+
+STREAM_COUNTS = [1, 8, 32]
+
+
+def start_fake_server() -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(fake_app, host="127.0.0.1", port=PORT, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def one_stream(t0: float) -> tuple[float, float, int]:
+    first = None
+    tokens = 0
+    async for _ in stream_completion("benchmark prompt"):
+        if first is None:
+            first = time.perf_counter() - t0
+        tokens += 1
+    return first, time.perf_counter() - t0, tokens
+
+
+async def run(n: int) -> tuple[float, float, float]:
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(one_stream(t0) for _ in range(n)))
+    wall = time.perf_counter() - t0
+    first_tokens = sorted(r[0] for r in results)
+    last_first = first_tokens[-1]
+    earliest_end = min(r[1] for r in results)
+    # interleaved: every stream started before any stream finished
+    assert n == 1 or last_first < earliest_end, "streams were serialized"
+    return wall, first_tokens[0], last_first
+
+
+async def main():
+    print(f"{'streams':>8} {'wall s':>8} {'first TTFT s':>13} {'last TTFT s':>12}")
+    for n in STREAM_COUNTS:
+        wall, first, last = await run(n)
+        print(f"{n:>8} {wall:>8.2f} {first:>13.2f} {last:>12.2f}")
+
+
+if __name__ == "__main__":
+    server = start_fake_server()
+    asyncio.run(main())
+    server.should_exit = True
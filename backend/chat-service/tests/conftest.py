@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+# tests import the service as the "app" package, like uvicorn does from backend/chat-service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config / app.neo4j_driver read these at import; nothing connects until a
+# query runs, and unit tests swap the driver for FakeDriver below
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("USER_MGMT_URL", "http://127.0.0.1:1")
+os.environ.setdefault("NEO4J_URI", "bolt://127.0.0.1:7687")
+os.environ.setdefault("NEO4J_USER", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "unused")
+
+
+class FakeResult:
+    def __init__(self, rows: list[dict]):
+        self._rows = rows
+
+    async def data(self) -> list[dict]:
+        return [dict(r) for r in self._rows]
+
+    async def single(self):
+        return self._rows[0] if self._rows else None
+
+    async def consume(self):
+        return None
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self._driver = driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, parameters=None, **kwargs):
+        params = {**(parameters or {}), **kwargs}
+        self._driver.queries.append((query, params))
+        for marker, rows in self._driver.responses:
+            if marker in query:
+                return FakeResult(rows(params) if callable(rows) else rows)
+        return FakeResult([])
+
+
+class FakeDriver:
+    """
+    Stand-in for the async Neo4j driver: every query containing a registered
+    marker returns its rows (a list, or a function of the parameters); any
+    other query returns nothing. queries records (cypher, parameters).
+    """
+
+    def __init__(self):
+        self.responses: list[tuple[str, object]] = []
+        self.queries: list[tuple[str, dict]] = []
+
+    def respond(self, marker: str, rows) -> None:
+        self.responses.append((marker, rows))
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def count(self, marker: str) -> int:
+        return sum(marker in q for q, _ in self.queries)
+
+
+@pytest.fixture
+def fake_driver(monkeypatch):
+    """
+    A FakeDriver behind get_driver() in every loaded app module.
+    """
+    import app.neo4j_driver  # noqa: F401
+
+    driver = FakeDriver()
+    for name, module in list(sys.modules.items()):
+        if name.startswith("app.") and hasattr(module, "get_driver"):
+            monkeypatch.setattr(module, "get_driver", lambda: driver)
+    return driver
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.ann_index import (
+    AnnIndex,
+    append_document,
+    append_staged,
+    compact,
+    load_index,
+    rebuild,
+    stage_segment,
+)
+from app.index_files import STAGING, read_manifest, user_dir
+
+USER = "user@example.com"
+DIM = 16
+# more lists than any test index has, so every list is searched
+ALL_LISTS = 10_000
+
+
+def clustered(rng, n):
+    centers = rng.standard_normal((8, DIM))
+    return (centers[rng.integers(0, 8, n)] + 0.3 * rng.standard_normal((n, DIM))).astype(
+        np.float32
+    )
+
+
+def exact(ids, vectors, query, n):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores, kind="stable")[:n]
+    return [ids[i] for i in order], scores[order]
+
+
+def open_index(root) -> AnnIndex:
+    directory = user_dir(str(root), USER)
+    return AnnIndex(directory, read_manifest(directory))
+
+
+def add_documents(root, rng, count, size, **kwargs):
+    ids, vectors = [], []
+    for version in range(1, count + 1):
+        doc_ids = [f"d{version}-c{i}" for i in range(size)]
+        doc_vectors = clustered(rng, size)
+        append_document(str(root), USER, version, doc_ids, doc_vectors, **kwargs)
+        ids += doc_ids
+        vectors.append(doc_vectors)
+    return ids, np.concatenate(vectors)
+
+
+def assert_exact(index, ids, vectors, rng, n=10):
+    for query in clustered(rng, 5):
+        found, scores = index.search(query, n, nprobe=ALL_LISTS)
+        expected_ids, expected_scores = exact(ids, vectors, query, n)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5, atol=1e-6)
+        assert set(found) == set(expected_ids)
+
+
+def test_search_over_deltas_then_after_compaction(tmp_path):
+    rng = np.random.default_rng(0)
+    ids, vectors = add_documents(tmp_path, rng, 4, 50)
+    index = open_index(tmp_path)
+    assert [s[2] is None for s in index.segments] == [True] * 4  # flat deltas
+    assert len(index) == 200
+    assert_exact(index, ids, vectors, rng)
+
+    compact(str(tmp_path), USER)
+    manifest = read_manifest(user_dir(str(tmp_path), USER))
+    assert [s["kind"] for s in manifest["segments"]] == ["ivf"]
+    assert (manifest["version"], manifest["stale"], manifest["dim"]) == (4, False, DIM)
+    index = open_index(tmp_path)
+    assert len(index) == 200
+    assert_exact(index, ids, vectors, rng)
+
+
+def test_deltas_on_top_of_an_ivf_base(tmp_path):
+    rng = np.random.default_rng(1)
+    base_ids = [f"base-{i}" for i in range(300)]
+    base = clustered(rng, 300)
+    rebuild(str(tmp_path), USER, 1, base_ids, base)
+    ids, vectors = base_ids[:], [base]
+    for version in (2, 3):
+        doc_ids = [f"d{version}-{i}" for i in range(20)]
+        doc = clustered(rng, 20)
+        append_document(str(tmp_path), USER, version, doc_ids, doc)
+        ids += doc_ids
+        vectors.append(doc)
+    vectors = np.concatenate(vectors)
+
+    index = open_index(tmp_path)
+    assert [s[2] is not None for s in index.segments] == [True, False, False]
+    assert_exact(index, ids, vectors, rng)
+    compact(str(tmp_path), USER)
+    assert_exact(open_index(tmp_path), ids, vectors, rng)
+
+
+def test_too_many_deltas_compact_on_append(tmp_path):
+    rng = np.random.default_rng(2)
+    ids, vectors = add_documents(tmp_path, rng, 5, 30, max_deltas=3)
+    manifest = read_manifest(user_dir(str(tmp_path), USER))
+    assert [s["kind"] for s in manifest["segments"]] == ["ivf", "flat"]
+    assert sum(s["count"] for s in manifest["segments"]) == 150
+    assert_exact(open_index(tmp_path), ids, vectors, rng)
+
+
+def test_probing_fewer_lists_still_finds_the_query_vector(tmp_path):
+    rng = np.random.default_rng(3)
+    ids, vectors = add_documents(tmp_path, rng, 2, 400)
+    compact(str(tmp_path), USER)
+    index = open_index(tmp_path)
+    for i in rng.integers(0, len(ids), 20):
+        found, scores = index.search(vectors[i], 1, nprobe=2)
+        assert found == [ids[i]]
+        assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_staged_batches_publish_with_the_document(tmp_path):
+    rng = np.random.default_rng(4)
+    ids = [f"c{i}" for i in range(60)]
+    vectors = clustered(rng, 60)
+    staged = [
+        stage_segment(str(tmp_path), ids[i : i + 25], vectors[i : i + 25]) for i in (0, 25, 50)
+    ]
+    assert load_index(str(tmp_path), USER) is None
+
+    append_staged(str(tmp_path), USER, 1, staged)
+    assert os.listdir(tmp_path / STAGING) == []
+    index = load_index(str(tmp_path), USER)
+    assert (index.version, index.dim, len(index)) == (1, DIM, 60)
+    assert_exact(index, ids, vectors, rng)
+
+
+def test_query_of_another_dimension_finds_nothing(tmp_path):
+    rng = np.random.default_rng(5)
+    add_documents(tmp_path, rng, 1, 10)
+    found, scores = open_index(tmp_path).search(np.ones(DIM + 1), 5, nprobe=4)
+    assert found == [] and len(scores) == 0
+    found, _ = open_index(tmp_path).search(np.zeros(DIM), 5, nprobe=4)
+    assert found == []
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from app import answer_cache as answer_cache_module
+from app.answer_cache import AnswerCache, question_anchors
+
+DIM = 64
+PARAMS = ("gpt-3.5-turbo", 0.7)
+
+
+def make_cache(**kwargs):
+    defaults = dict(max_users=8, max_per_user=4, ttl_seconds=60, threshold=0.98)
+    return AnswerCache("test", **{**defaults, **kwargs})
+
+
+def unit(rng):
+    v = rng.standard_normal(DIM)
+    return v / np.linalg.norm(v)
+
+
+def at_cosine(v, cosine, rng):
+    """A unit vector with exactly this cosine to unit vector v."""
+    noise = rng.standard_normal(DIM)
+    noise -= (noise @ v) * v
+    noise /= np.linalg.norm(noise)
+    return cosine * v + np.sqrt(1 - cosine**2) * noise
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_hit_at_or_above_threshold_and_miss_below(rng):
+    cache = make_cache()
+    q = unit(rng)
+    cache.put("u", 1, "what is the refund policy", q, PARAMS, "answer", cost_seconds=2.0)
+
+    assert cache.get("u", 1, "what is the refund policy", q, PARAMS) == "answer"
+    close = at_cosine(q, 0.99, rng)
+    assert cache.get("u", 1, "what's the refund policy", close, PARAMS) == "answer"
+    far = at_cosine(q, 0.97, rng)
+    assert cache.get("u", 1, "what is the return policy", far, PARAMS) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_seconds"]) == (2, 1, 4.0)
+
+
+def test_embedding_scale_does_not_matter(rng):
+    cache = make_cache()
+    q = unit(rng)
+    cache.put("u", 1, "q", q, PARAMS, "answer")
+    assert cache.get("u", 1, "q", 7.5 * q, PARAMS) == "answer"
+    assert cache.get("u", 1, "q", np.zeros(DIM), PARAMS) is None
+    assert cache.get("u", 1, "q", q[:-1], PARAMS) is None
+
+
+def test_miss_on_other_version_params_or_user(rng):
+    cache = make_cache()
+    q = unit(rng)
+    cache.put("u", 1, "q", q, PARAMS, "answer")
+    assert cache.get("u", 1, "q", q, ("gpt-4", 0.7)) is None
+    assert cache.get("other", 1, "q", q, PARAMS) is None
+    # a new corpus version drops everything cached for the user
+    assert cache.get("u", 2, "q", q, PARAMS) is None
+    assert cache.get("u", 1, "q", q, PARAMS) is None
+    assert cache.stats()["users"] == 0
+
+
+def test_miss_when_numbers_or_names_differ(rng):
+    cache = make_cache()
+    q = unit(rng)
+    cache.put("u", 1, "What was revenue in 2021?", q, PARAMS, "2021 answer")
+    assert cache.get("u", 1, "What was revenue in 2022?", q, PARAMS) is None
+    assert cache.get("u", 1, "what was revenue in 2021", q, PARAMS) == "2021 answer"
+
+    cache.put("u", 1, "Who founded Acme?", q, PARAMS, "acme answer")
+    assert cache.get("u", 1, "Who founded Globex?", q, PARAMS) is None
+    assert cache.get("u", 1, "who founded acme", q, PARAMS) is None
+    assert cache.get("u", 1, "Who founded Acme", q, PARAMS) == "acme answer"
+
+
+def test_question_anchors():
+    assert question_anchors("What was revenue in 2021?") == {"2021"}
+    # digits inside names count as numbers too
+    assert question_anchors("How did AT&T and GPT-4 do in Q3 2023?") == {
+        "at&t", "gpt-4", "4", "q3", "3", "2023",
+    }
+    assert question_anchors('explain "net present value" briefly') == {'"net present value'}
+    # capitalized only because it starts a sentence
+    assert question_anchors("Explain this. Then summarize it.") == {"then"}
+    assert question_anchors("Summarize the policy. What changed?") == frozenset()
+    assert question_anchors("Version 1.2.3 on 12/05/2021") == {"version", "1.2.3", "12/05/2021"}
+
+
+def test_put_is_a_no_op_when_disabled(rng):
+    cache = make_cache(max_per_user=0)
+    q = unit(rng)
+    cache.put("u", 1, "q", q, PARAMS, "answer")
+    assert cache.get("u", 1, "q", q, PARAMS) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_per_user_and_over_users(rng):
+    cache = make_cache(max_users=2, max_per_user=2)
+    a, b, c = unit(rng), unit(rng), unit(rng)
+    cache.put("u", 1, "a", a, PARAMS, "A")
+    cache.put("u", 1, "b", b, PARAMS, "B")
+    assert cache.get("u", 1, "a", a, PARAMS) == "A"  # b is now least recently used
+    cache.put("u", 1, "c", c, PARAMS, "C")
+    assert cache.get("u", 1, "b", b, PARAMS) is None
+    assert cache.get("u", 1, "a", a, PARAMS) == "A"
+    assert cache.get("u", 1, "c", c, PARAMS) == "C"
+
+    cache.put("v", 1, "a", a, PARAMS, "vA")
+    cache.put("w", 1, "a", a, PARAMS, "wA")
+    # u was used before v, then w arrived: u is evicted
+    assert cache.get("u", 1, "a", a, PARAMS) is None
+    assert cache.get("w", 1, "a", a, PARAMS) == "wA"
+
+
+def test_entries_expire(rng, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: now[0])
+    cache = make_cache(ttl_seconds=10)
+    q = unit(rng)
+    cache.put("u", 1, "q", q, PARAMS, "answer")
+    now[0] += 9
+    assert cache.get("u", 1, "q", q, PARAMS) == "answer"
+    now[0] += 2
+    assert cache.get("u", 1, "q", q, PARAMS) is None
+    assert cache.stats()["entries"] == 0
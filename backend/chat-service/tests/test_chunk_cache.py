@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from app import chunk_cache as chunk_cache_module
+from app.chunk_cache import ChunkCache, load_user_chunks
+from app.scoring import ChunkMatrix
+
+CHUNKS_QUERY = "-[:UPLOADED]->(c:Chunk)"
+
+
+def matrix(n: int, dim: int = 8) -> ChunkMatrix:
+    return ChunkMatrix(
+        [{"id": f"c{i}", "embedding": [float(i + 1)] * dim} for i in range(n)]
+    )
+
+
+ONE = matrix(10).nbytes
+
+
+def test_same_version_hits_and_a_new_version_invalidates():
+    cache = ChunkCache(max_bytes=10 * ONE, max_users=10)
+    m = matrix(10)
+    cache.put("a@example.com", 3, m)
+    assert cache.get("a@example.com", 3) is m
+    assert cache.get("a@example.com", 4) is None
+    # the stale entry is gone, also for the old version, and so are its bytes
+    assert cache.get("a@example.com", 3) is None
+    assert cache.stats()["bytes"] == 0 and cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_put_replaces_the_users_entry():
+    cache = ChunkCache(max_bytes=10 * ONE, max_users=10)
+    cache.put("a@example.com", 1, matrix(10))
+    bigger = matrix(20)
+    cache.put("a@example.com", 2, bigger)
+    assert cache.get("a@example.com", 2) is bigger
+    assert cache.stats()["bytes"] == bigger.nbytes
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes():
+    cache = ChunkCache(max_bytes=int(2.5 * ONE), max_users=10)
+    cache.put("a@example.com", 1, matrix(10))
+    cache.put("b@example.com", 1, matrix(10))
+    cache.get("a@example.com", 1)  # b is now the least recently used
+    cache.put("c@example.com", 1, matrix(10))
+
+    assert cache.get("b@example.com", 1) is None
+    assert cache.get("a@example.com", 1) is not None
+    assert cache.get("c@example.com", 1) is not None
+    assert cache.stats()["bytes"] == 2 * ONE <= cache.max_bytes
+
+
+def test_a_larger_entry_evicts_as_many_as_needed():
+    cache = ChunkCache(max_bytes=int(3.5 * ONE), max_users=10)
+    for user in ("a", "b", "c"):
+        cache.put(f"{user}@example.com", 1, matrix(10))
+    big = matrix(20)
+    cache.put("d@example.com", 1, big)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("c@example.com", 1) is not None
+    assert cache.get("d@example.com", 1) is big
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_a_matrix_over_the_budget_is_not_cached_and_evicts_nothing():
+    cache = ChunkCache(max_bytes=2 * ONE, max_users=10)
+    cache.put("a@example.com", 1, matrix(10))
+    cache.put("huge@example.com", 1, matrix(100))
+    assert cache.get("huge@example.com", 1) is None
+    assert cache.get("a@example.com", 1) is not None
+
+
+def test_max_users_bounds_the_entry_count():
+    cache = ChunkCache(max_bytes=100 * ONE, max_users=2)
+    for user in ("a", "b", "c"):
+        cache.put(f"{user}@example.com", 1, matrix(10))
+    assert cache.get("a@example.com", 1) is None
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = ChunkCache(max_bytes=10 * ONE, max_users=10)
+    monkeypatch.setattr(chunk_cache_module, "chunk_cache", cache)
+    return cache
+
+
+def test_load_user_chunks_only_queries_neo4j_when_the_version_moves(
+    fake_driver, fresh_cache
+):
+    fake_driver.respond(
+        CHUNKS_QUERY,
+        [{"id": f"c{i}", "embedding": [1.0, float(i)], "file_name": "a.pdf", "page": 1}
+         for i in range(3)],
+    )
+
+    async def main():
+        first = await load_user_chunks("a@example.com", 1)
+        again = await load_user_chunks("a@example.com", 1)
+        assert again is first
+        assert fake_driver.count(CHUNKS_QUERY) == 1
+
+        reloaded = await load_user_chunks("a@example.com", 2)
+        assert reloaded is not first and reloaded.ids == first.ids
+        assert fake_driver.count(CHUNKS_QUERY) == 2
+
+    asyncio.run(main())
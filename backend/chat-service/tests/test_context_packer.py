@@ -0,0 +1,129 @@
+import re
+
+from app.config import settings
+from app.context_packer import SEPARATOR, citations, count_tokens, pack_context
+
+TAG = re.compile(r"^\[file:(\S+) page:(\S+)\]$", re.MULTILINE)
+
+
+def chunk(cid, text, file_name="a.pdf", page=1, pdf_id=None):
+    c = {"id": cid, "text": text, "file_name": file_name, "page": page}
+    if pdf_id:
+        c["pdf_id"] = pdf_id
+    return c
+
+
+def words(prefix, n):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_citations_follow_the_ranking():
+    chunks = [
+        chunk("c1", words("alpha", 30), "b.pdf", 4),
+        chunk("c2", words("beta", 30), "a.pdf", 2),
+        chunk("c3", words("gamma", 30), "c.pdf", 9),
+    ]
+    context, used = pack_context(chunks, budget=10_000)
+    assert [c["id"] for c in used] == ["c1", "c2", "c3"]
+    assert TAG.findall(context) == [("b.pdf", "4"), ("a.pdf", "2"), ("c.pdf", "9")]
+    assert context.count(SEPARATOR) == 2
+    # every passage directly follows its own tag
+    for c in chunks:
+        tag = f"[file:{c['file_name']} page:{c['page']}]\n"
+        assert tag + c["text"] in context
+
+
+def test_missing_file_and_page_are_tagged_unknown():
+    context, _ = pack_context([{"id": "x", "text": "some text here"}], budget=1_000)
+    assert context.startswith("[file:unknown page:?]\n")
+
+
+def test_budget_skips_what_does_not_fit_but_keeps_smaller_chunks():
+    big = chunk("big", words("big", 400), "big.pdf")
+    small = chunk("small", words("small", 10), "small.pdf")
+    first = chunk("first", words("first", 40), "first.pdf")
+    budget = count_tokens(f"[file:first.pdf page:1]\n{first['text']}") + 60
+
+    context, used = pack_context([first, big, small], budget=budget)
+    assert [c["id"] for c in used] == ["first", "small"]
+    assert count_tokens(context) <= budget
+    assert "big0" not in context
+
+
+def test_packed_context_stays_within_budget():
+    chunks = [
+        chunk(f"c{i}", words(f"w{i}x", 20 + 13 * i), f"f{i}.pdf", i) for i in range(20)
+    ]
+    for budget in (50, 200, 500, 1_000):
+        context, used = pack_context(chunks, budget=budget)
+        assert used
+        assert count_tokens(context) <= budget
+
+
+def test_best_chunk_alone_over_budget_is_truncated():
+    only = chunk("c1", words("long", 2_000))
+    context, used = pack_context([only, chunk("c2", "tiny")], budget=100)
+    assert [c["id"] for c in used] == ["c1"]
+    assert used[0]["text"].startswith("long0 long1")
+    assert len(used[0]["text"]) < len(only["text"])
+    assert count_tokens(context) <= 100
+
+
+def test_near_duplicates_are_dropped():
+    text = words("dup", 80)
+    chunks = [
+        chunk("c1", text, "a.pdf"),
+        chunk("c2", text + " extra", "b.pdf"),
+        chunk("c3", words("other", 80), "c.pdf"),
+    ]
+    _, used = pack_context(chunks, budget=10_000)
+    assert [c["id"] for c in used] == ["c1", "c3"]
+
+
+def test_neighbouring_chunks_merge_under_one_tag():
+    pdf = "p1"
+    first = words("n", 50)
+    # the next chunk repeats the last 10 words of the first (chunk overlap)
+    second = words("n", 60).split(" ", 40)[-1]
+    chunks = [
+        chunk(f"u@x.com-{pdf}-4", second, page=3, pdf_id=pdf),
+        chunk("other", words("z", 20), "b.pdf", 1),
+        chunk(f"u@x.com-{pdf}-3", first, page=3, pdf_id=pdf),
+    ]
+    context, used = pack_context(chunks, budget=10_000)
+    assert len(used) == 3
+    # one passage for the run, placed by its best-ranked chunk
+    assert TAG.findall(context) == [("a.pdf", "3"), ("b.pdf", "1")]
+    merged = context.split(SEPARATOR)[0].split("\n", 1)[1]
+    assert merged.split() == words("n", 60).split()
+
+
+def test_budget_not_top_k_decides_how_many_chunks_are_packed(monkeypatch):
+    from app.chat import context_candidates
+
+    monkeypatch.setattr(settings, "CONTEXT_MAX_CHUNKS", 20)
+    assert context_candidates("how does the refund policy handle partial returns", 5) == 20
+    monkeypatch.setattr(settings, "CONTEXT_MAX_CHUNKS", 3)
+    assert context_candidates("how does the refund policy handle partial returns", 5) == 5
+
+    ranked = [chunk(f"c{i}", words(f"r{i}x", 30), f"f{i}.pdf", i) for i in range(20)]
+    _, small = pack_context(ranked, budget=200)
+    _, large = pack_context(ranked, budget=2_000)
+    # ranked order is kept and a bigger budget takes more of the list
+    assert [c["id"] for c in small] == [c["id"] for c in ranked[: len(small)]]
+    assert [c["id"] for c in large] == [c["id"] for c in ranked[: len(large)]]
+    assert 1 <= len(small) < len(large) <= 20
+
+
+def test_citations_are_distinct_in_packing_order():
+    used = [
+        chunk("a", "x", "b.pdf", 2),
+        chunk("b", "y", "a.pdf", 1),
+        chunk("c", "z", "b.pdf", 2),
+        {"id": "d", "text": "w"},
+    ]
+    assert citations(used) == [
+        {"file_name": "b.pdf", "page": 2},
+        {"file_name": "a.pdf", "page": 1},
+        {"file_name": None, "page": None},
+    ]
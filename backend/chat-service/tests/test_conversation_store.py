@@ -0,0 +1,222 @@
+"""
+open_conversation / append_turns against a real Neo4j. Uses the server at
+NEO4J_TEST_URI when set, otherwise starts a neo4j:5 container through
+testcontainers (pip install testcontainers[neo4j]), otherwise skips. From
+backend/chat-service, e.g. against a throwaway server:
+
+    docker run -d --rm -p 7687:7687 -e NEO4J_AUTH=neo4j/testpassword neo4j:5
+    NEO4J_TEST_URI=bolt://localhost:7687 NEO4J_TEST_PASSWORD=testpassword \
+        python -m pytest tests/test_conversation_store.py
+
+Each test uses its own user email and deletes its conversations afterwards,
+so a shared database is fine.
+"""
+
+import asyncio
+import os
+import uuid
+
+import pytest
+from neo4j import AsyncGraphDatabase
+
+
+@pytest.fixture(scope="module")
+def neo4j_server():
+    """
+    (uri, user, password) of the Neo4j to test against.
+    """
+    uri = os.getenv("NEO4J_TEST_URI")
+    if uri:
+        yield (
+            uri,
+            os.getenv("NEO4J_TEST_USER", "neo4j"),
+            os.getenv("NEO4J_TEST_PASSWORD", "testpassword"),
+        )
+        return
+    try:
+        from testcontainers.neo4j import Neo4jContainer
+    except ImportError:
+        pytest.skip("set NEO4J_TEST_URI or install testcontainers[neo4j]")
+    try:
+        container = Neo4jContainer("neo4j:5").start()
+    except Exception as e:
+        pytest.skip(f"could not start a Neo4j container: {e}")
+    try:
+        yield container.get_connection_url(), container.username, container.password
+    finally:
+        container.stop()
+
+
+def run(neo4j_server, scenario):
+    """
+    Run scenario(conversation_store, driver, email) on a fresh event loop with its own driver (the
+    async driver is bound to the loop it was created on) and clean up after.
+    """
+    uri, user, password = neo4j_server
+    # app.neo4j_driver refuses to import without them; the tests use their own driver
+    os.environ.setdefault("NEO4J_URI", uri)
+    os.environ.setdefault("NEO4J_USER", user)
+    os.environ.setdefault("NEO4J_PASSWORD", password)
+    from app import conversation_store
+
+    async def main():
+        driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+        email = f"test-{uuid.uuid4()}@example.com"
+        original = conversation_store.get_driver
+        conversation_store.get_driver = lambda: driver
+        try:
+            await conversation_store.ensure_schema()
+            await scenario(conversation_store, driver, email)
+        finally:
+            conversation_store.get_driver = original
+            await driver.execute_query(
+                """
+                MATCH (c:Conversation {user_email: $email})
+                OPTIONAL MATCH (c)-[:HAS_TURN]->(t:Turn)
+                DETACH DELETE c, t
+                """,
+                email=email,
+            )
+            await driver.close()
+
+    asyncio.run(main())
+
+
+def turns(*contents):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": c}
+        for i, c in enumerate(contents)
+    ]
+
+
+async def linked_turn_count(driver, cid):
+    records, _, _ = await driver.execute_query(
+        """
+        MATCH (c:Conversation {id: $cid})-[:LAST_TURN]->(:Turn)-[:PREV*0..]->(t:Turn)
+        RETURN count(t) AS n
+        """,
+        cid=cid,
+    )
+    return records[0]["n"]
+
+
+def test_new_conversation_is_created_empty(neo4j_server):
+    async def scenario(store, driver, email):
+        cid, history = await store.open_conversation(None, email)
+        assert history == []
+        again, history = await store.open_conversation(cid, email)
+        assert again == cid
+        assert history == []
+
+        records, _, _ = await driver.execute_query(
+            "MATCH (c:Conversation {id: $cid}) RETURN c.user_email AS owner, c.next_idx AS next_idx",
+            cid=cid,
+        )
+        assert [dict(r) for r in records] == [{"owner": email, "next_idx": 0}]
+
+    run(neo4j_server, scenario)
+
+
+def test_appended_turns_come_back_oldest_first(neo4j_server):
+    async def scenario(store, driver, email):
+        cid, _ = await store.open_conversation(None, email)
+        await store.append_turns(cid, email, "q1", "a1")
+        await store.append_turns(cid, email, "q2", "a2")
+
+        _, history = await store.open_conversation(cid, email)
+        assert history == turns("q1", "a1", "q2", "a2")
+        assert await linked_turn_count(driver, cid) == 4
+
+    run(neo4j_server, scenario)
+
+
+def test_history_is_limited_to_the_newest_turns(neo4j_server):
+    async def scenario(store, driver, email):
+        cid, _ = await store.open_conversation(None, email)
+        for i in range(4):
+            await store.append_turns(cid, email, f"q{i}", f"a{i}")
+
+        _, history = await store.open_conversation(cid, email, limit=3)
+        assert history == [
+            {"role": "assistant", "content": "a2"},
+            {"role": "user", "content": "q3"},
+            {"role": "assistant", "content": "a3"},
+        ]
+        _, history = await store.open_conversation(cid, email, limit=100)
+        assert len(history) == 8
+        _, history = await store.open_conversation(cid, email, limit=0)
+        assert history == [{"role": "assistant", "content": "a3"}]
+
+    run(neo4j_server, scenario)
+
+
+def test_concurrent_appends_keep_one_chain(neo4j_server):
+    async def scenario(store, driver, email):
+        cid, _ = await store.open_conversation(None, email)
+        await asyncio.gather(
+            *(store.append_turns(cid, email, f"q{i}", f"a{i}") for i in range(5))
+        )
+
+        _, history = await store.open_conversation(cid, email, limit=100)
+        assert len(history) == 10
+        assert await linked_turn_count(driver, cid) == 10
+        # every answer directly follows its own question
+        for question, answer in zip(history[::2], history[1::2]):
+            assert answer["content"] == "a" + question["content"][1:]
+
+    run(neo4j_server, scenario)
+
+
+def test_other_users_do_not_see_the_conversation(neo4j_server):
+    async def scenario(store, driver, email):
+        cid, _ = await store.open_conversation(None, email)
+        await store.append_turns(cid, email, "q1", "a1")
+
+        same, history = await store.open_conversation(cid, "someone-else@example.com")
+        assert same == cid
+        assert history == []
+        # not owned by the caller: nothing is appended
+        await store.append_turns(cid, "someone-else@example.com", "q2", "a2")
+        _, history = await store.open_conversation(cid, email)
+        assert history == turns("q1", "a1")
+
+    run(neo4j_server, scenario)
+
+
+def test_legacy_conversation_is_read_by_idx_then_linked_on_append(neo4j_server):
+    async def scenario(store, driver, email):
+        cid = str(uuid.uuid4())
+        # the shape written before LAST_TURN/PREV existed
+        await driver.execute_query(
+            """
+            CREATE (c:Conversation {id: $cid, user_email: $email, created_at: timestamp(), next_idx: 4})
+            WITH c
+            UNWIND range(0, 3) AS i
+            CREATE (c)-[:HAS_TURN]->(:Turn {
+                role: CASE WHEN i % 2 = 0 THEN 'user' ELSE 'assistant' END,
+                content: 'old' + toString(i), idx: i, ts: timestamp()})
+            """,
+            cid=cid,
+            email=email,
+        )
+
+        _, history = await store.open_conversation(cid, email)
+        assert history == turns("old0", "old1", "old2", "old3")
+        _, history = await store.open_conversation(cid, email, limit=2)
+        assert history == turns("old2", "old3")
+
+        await store.append_turns(cid, email, "q", "a")
+        assert await linked_turn_count(driver, cid) == 6
+        _, history = await store.open_conversation(cid, email)
+        assert history == turns("old0", "old1", "old2", "old3", "q", "a")
+
+        records, _, _ = await driver.execute_query(
+            """
+            MATCH (:Conversation {id: $cid})-[:HAS_TURN]->(t:Turn)
+            RETURN t.idx AS idx ORDER BY idx
+            """,
+            cid=cid,
+        )
+        assert [r["idx"] for r in records] == list(range(6))
+
+    run(neo4j_server, scenario)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.embedding_codec import decode, decode_many, encode
+
+rng = np.random.default_rng(7)
+
+
+def vectors(n: int, dim: int = 64) -> np.ndarray:
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_float32_round_trip_is_exact():
+    vs = vectors(5)
+    encoded = [encode(v.tolist(), "float32") for v in vs]
+    assert all(scale is None for _, scale in encoded)
+    assert all(len(blob) == 4 * vs.shape[1] for blob, _ in encoded)
+
+    assert np.array_equal(decode(encoded[0][0], "float32"), vs[0])
+    matrix = decode_many([blob for blob, _ in encoded], "float32")
+    assert matrix.dtype == np.float32 and np.array_equal(matrix, vs)
+
+
+def test_int8_round_trip_stays_within_half_a_step():
+    vs = vectors(20, dim=256) * rng.uniform(0.01, 10.0, size=(20, 1)).astype(np.float32)
+    encoded = [encode(v.tolist(), "int8") for v in vs]
+    assert all(len(blob) == vs.shape[1] for blob, _ in encoded)
+
+    decoded = decode_many([b for b, _ in encoded], "int8", [s for _, s in encoded])
+    for v, (blob, scale), row in zip(vs, encoded, decoded):
+        assert scale == pytest.approx(np.abs(v).max() / 127.0)
+        # rounding to the nearest step: at most scale / 2 off per component
+        assert np.abs(row - v).max() <= scale / 2 * (1 + 1e-5)
+        assert np.array_equal(decode(blob, "int8", scale), row)
+        cosine = float(row @ v / (np.linalg.norm(row) * np.linalg.norm(v)))
+        assert cosine > 0.999
+
+
+def test_int8_uses_the_full_range():
+    blob, scale = encode([0.5, -1.0, 0.25, 1.0], "int8")
+    assert list(np.frombuffer(blob, dtype=np.int8)) == [64, -127, 32, 127]
+    assert scale == pytest.approx(1.0 / 127.0)
+
+
+def test_zero_vector_gets_scale_one_and_decodes_to_zeros():
+    blob, scale = encode([0.0] * 8, "int8")
+    assert scale == 1.0
+    assert np.array_equal(decode(blob, "int8", scale), np.zeros(8, dtype=np.float32))
+
+
+@pytest.mark.parametrize("scale", [None, 0, 0.0])
+def test_missing_or_zero_scale_decodes_as_scale_one(scale):
+    blob = np.array([3, -5, 127], dtype=np.int8).tobytes()
+    expected = np.array([3.0, -5.0, 127.0], dtype=np.float32)
+    assert np.array_equal(decode(blob, "int8", scale), expected)
+    assert np.array_equal(decode_many([blob], "int8", [scale])[0], expected)
+
+
+def test_decode_many_applies_each_rows_scale():
+    blobs_scales = [encode(v.tolist(), "int8") for v in vectors(3)]
+    blobs = [b for b, _ in blobs_scales]
+    scales = [s for _, s in blobs_scales]
+    scales[1] = None
+    matrix = decode_many(blobs, "int8", scales)
+    for blob, scale, row in zip(blobs, scales, matrix):
+        assert np.array_equal(decode(blob, "int8", scale), row)
+
+
+def test_decode_many_of_nothing_is_an_empty_matrix():
+    assert decode_many([], "float32").shape == (0, 0)
+    assert decode_many([], "int8", []).shape == (0, 0)
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="Unknown embedding format"):
+        encode([1.0], "float16")
+    with pytest.raises(ValueError, match="Unknown embedding format"):
+        encode([1.0], "list")
@@ -0,0 +1,66 @@
+import os
+
+from app.index_files import MANIFEST, LoadedIndexes, user_dir, write_manifest
+
+USER = "user@example.com"
+
+
+def opened_versions(tmp_path):
+    """
+    A LoadedIndexes whose "index" is the manifest version it was opened from,
+    and the list of versions opened so far.
+    """
+    opened = []
+
+    def opener(directory, manifest):
+        opened.append(manifest["version"])
+        return manifest["version"]
+
+    return LoadedIndexes(opener), opened
+
+
+def commit(root, version, mtime_ns=None):
+    directory = user_dir(str(root), USER)
+    os.makedirs(directory, exist_ok=True)
+    write_manifest(directory, {"version": version, "stale": False, "segments": []})
+    if mtime_ns is not None:
+        os.utime(os.path.join(directory, MANIFEST), ns=(mtime_ns, mtime_ns))
+
+
+def test_index_is_reused_until_the_manifest_changes(tmp_path):
+    indexes, opened = opened_versions(tmp_path)
+    assert indexes.get(str(tmp_path), USER) is None
+
+    commit(tmp_path, 1)
+    assert indexes.get(str(tmp_path), USER) == 1
+    assert indexes.get(str(tmp_path), USER) == 1
+    assert opened == [1]
+
+    commit(tmp_path, 2)
+    assert indexes.get(str(tmp_path), USER) == 2
+    assert opened == [1, 2]
+
+
+def test_commits_with_the_same_mtime_are_told_apart(tmp_path):
+    # two commits within the filesystem's timestamp granularity
+    indexes, opened = opened_versions(tmp_path)
+    commit(tmp_path, 1, mtime_ns=1_000_000_000)
+    assert indexes.get(str(tmp_path), USER) == 1
+    commit(tmp_path, 2, mtime_ns=1_000_000_000)
+    assert indexes.get(str(tmp_path), USER) == 2
+    assert opened == [1, 2]
+
+
+def test_least_recently_used_users_are_dropped(tmp_path):
+    opened = []
+    indexes = LoadedIndexes(lambda d, m: opened.append(d) or d, max_users=2)
+    users = ["a@example.com", "b@example.com", "c@example.com"]
+    for email in users:
+        directory = user_dir(str(tmp_path), email)
+        os.makedirs(directory)
+        write_manifest(directory, {"version": 1, "stale": False, "segments": []})
+        indexes.get(str(tmp_path), email)
+    indexes.get(str(tmp_path), users[0])
+    assert len(opened) == 4
+    indexes.get(str(tmp_path), users[2])
+    assert len(opened) == 4
@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+from app.jwt_verify import secret_key, unverified_expiry, verify_jwt
+
+SECRET = base64.b64encode(b"a shared secret of the user-management service").decode()
+KEY = secret_key(SECRET, base64_encoded=True)
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_token(claims, key=KEY, alg="HS512", digest=hashlib.sha512) -> str:
+    header = b64url(json.dumps({"alg": alg, "typ": "JWT"}).encode())
+    payload = b64url(json.dumps(claims).encode())
+    signing_input = f"{header}.{payload}".encode()
+    signature = hmac.new(key, signing_input, digest).digest() if digest else b""
+    return f"{header}.{payload}.{b64url(signature)}"
+
+
+def valid_claims(**extra):
+    return {"sub": "user@example.com", "exp": int(time.time()) + 600, **extra}
+
+
+def test_valid_hs512_token_returns_its_claims():
+    claims = valid_claims()
+    assert verify_jwt(make_token(claims), KEY) == claims
+
+
+def test_alg_none_is_rejected():
+    assert verify_jwt(make_token(valid_claims(), alg="none", digest=None), KEY) is None
+    # also with a signature that would be valid under HS512
+    forged = make_token(valid_claims(), alg="none")
+    assert verify_jwt(forged, KEY) is None
+
+
+@pytest.mark.parametrize(
+    "alg, digest",
+    [("HS256", hashlib.sha256), ("HS384", hashlib.sha384), ("RS256", hashlib.sha256)],
+)
+def test_other_algorithms_are_rejected(alg, digest):
+    assert verify_jwt(make_token(valid_claims(), alg=alg, digest=digest), KEY) is None
+
+
+def test_bad_signature_is_rejected():
+    token = make_token(valid_claims())
+    header, payload, signature = token.split(".")
+    assert verify_jwt(make_token(valid_claims(), key=b"another key"), KEY) is None
+    assert verify_jwt(f"{header}.{payload}.{signature[:-4]}AAAA", KEY) is None
+    assert verify_jwt(f"{header}.{payload}.", KEY) is None
+    # the payload swapped under a valid signature
+    other = make_token(valid_claims(sub="admin@example.com")).split(".")[1]
+    assert verify_jwt(f"{header}.{other}.{signature}", KEY) is None
+
+
+def test_expired_token_is_rejected_unless_within_leeway():
+    token = make_token(valid_claims(exp=int(time.time()) - 30))
+    assert verify_jwt(token, KEY) is None
+    assert verify_jwt(token, KEY, leeway_seconds=60) is not None
+
+
+@pytest.mark.parametrize("exp", [None, "soon", "NaN", [1], {"at": 1}])
+def test_missing_or_non_numeric_exp_is_rejected(exp):
+    claims = {"sub": "user@example.com"}
+    if exp is not None:
+        claims["exp"] = exp
+    assert verify_jwt(make_token(claims), KEY) is None
+
+
+def test_numeric_string_exp_is_accepted():
+    claims = valid_claims(exp=str(int(time.time()) + 600))
+    assert verify_jwt(make_token(claims), KEY) == claims
+
+
+@pytest.mark.parametrize(
+    "token",
+    ["", "abc", "a.b", "a.b.c.d", "!!!.???.***", "é.é.é"],
+)
+def test_malformed_tokens_are_rejected(token):
+    assert verify_jwt(token, KEY) is None
+
+
+def test_non_object_payload_is_rejected():
+    header = b64url(json.dumps({"alg": "HS512"}).encode())
+    payload = b64url(b"[1, 2, 3]")
+    signature = hmac.new(KEY, f"{header}.{payload}".encode(), hashlib.sha512).digest()
+    assert verify_jwt(f"{header}.{payload}.{b64url(signature)}", KEY) is None
+
+
+def test_base64_secret_is_decoded():
+    assert KEY == b"a shared secret of the user-management service"
+    raw = secret_key(SECRET, base64_encoded=False)
+    assert raw == SECRET.encode()
+    # a token signed with the decoded bytes only verifies under the decoded key
+    token = make_token(valid_claims())
+    assert verify_jwt(token, KEY) is not None
+    assert verify_jwt(token, raw) is None
+
+
+def test_raw_secret_is_used_as_is():
+    key = secret_key("not base64: ünïcode & spaces", base64_encoded=False)
+    assert key == "not base64: ünïcode & spaces".encode("utf-8")
+    token = make_token(valid_claims(), key=key)
+    assert verify_jwt(token, key) is not None
+    assert verify_jwt(token, secret_key("not base64: ünïcode & spaces", True)) is None
+
+
+def test_base64_secret_is_decoded_leniently_like_jjwt():
+    # jjwt skips characters outside the alphabet and drops a trailing partial group
+    assert secret_key("my-secret_key!", base64_encoded=True) == base64.b64decode("mysecret")
+    assert secret_key("c2VjcmV0\n", base64_encoded=True) == b"secret"
+
+
+def test_unverified_expiry():
+    assert unverified_expiry(make_token({"exp": 123})) == 123.0
+    assert unverified_expiry(make_token({"sub": "x"})) is None
+    assert unverified_expiry("garbage") is None
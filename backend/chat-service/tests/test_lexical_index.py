@@ -0,0 +1,136 @@
+import math
+import os
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.index_files import STAGING, read_manifest, user_dir
+from app.lexical_index import (
+    B,
+    K1,
+    LexicalIndex,
+    append_document,
+    append_staged,
+    compact,
+    load_index,
+    stage_segment,
+    tokenize,
+)
+
+USER = "user@example.com"
+VOCAB = "revenue margin policy refund shipping invoice contract clause audit risk".split()
+
+
+def reference_bm25(docs: dict[str, str], query: str) -> dict[str, float]:
+    """BM25 over the whole corpus, term by term."""
+    tokens = {cid: tokenize(text) for cid, text in docs.items()}
+    n = len(docs)
+    avg_len = sum(len(t) for t in tokens.values()) / n
+    scores: dict[str, float] = {}
+    for term in set(tokenize(query)):
+        df = sum(term in t for t in tokens.values())
+        if not df:
+            continue
+        idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        for cid, t in tokens.items():
+            tf = Counter(t)[term]
+            if tf:
+                norm = K1 * (1.0 - B + B * len(t) / avg_len)
+                scores[cid] = scores.get(cid, 0.0) + idf * tf * (K1 + 1.0) / (tf + norm)
+    return scores
+
+
+def documents(seed: int, count: int, size: int) -> list[dict[str, str]]:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            f"d{d}-c{c}": " ".join(rng.choice(VOCAB, rng.integers(3, 40)))
+            for c in range(size)
+        }
+        for d in range(count)
+    ]
+
+
+def assert_matches_reference(index: LexicalIndex, corpus: dict[str, str], query: str):
+    expected = reference_bm25(corpus, query)
+    hits = index.search(query, limit=len(corpus))
+    assert {h["id"] for h in hits} == set(expected)
+    for hit in hits:
+        assert hit["score"] == pytest.approx(expected[hit["id"]], rel=1e-4)
+    scores = [h["score"] for h in hits]
+    assert scores == sorted(scores, reverse=True)
+
+
+def open_index(root) -> LexicalIndex:
+    directory = user_dir(str(root), USER)
+    return LexicalIndex(directory, read_manifest(directory))
+
+
+@pytest.mark.parametrize("query", ["refund policy", "audit", "Revenue MARGIN risk", "unknown"])
+def test_search_matches_reference_before_and_after_compaction(tmp_path, query):
+    corpus = {}
+    for version, doc in enumerate(documents(0, 5, 30), start=1):
+        append_document(str(tmp_path), USER, version, list(doc), list(doc.values()))
+        corpus.update(doc)
+
+    index = open_index(tmp_path)
+    assert len(index.segments) == 5
+    assert len(index) == len(corpus)
+    assert_matches_reference(index, corpus, query)
+
+    compact(str(tmp_path), USER)
+    index = open_index(tmp_path)
+    assert len(index.segments) == 1
+    assert (index.version, index.stale) == (5, False)
+    assert_matches_reference(index, corpus, query)
+
+
+def test_appends_past_max_segments_merge_into_one(tmp_path):
+    corpus = {}
+    for version, doc in enumerate(documents(1, 4, 10), start=1):
+        append_document(
+            str(tmp_path), USER, version, list(doc), list(doc.values()), max_segments=2
+        )
+        corpus.update(doc)
+
+    index = open_index(tmp_path)
+    assert len(index.segments) == 2
+    assert_matches_reference(index, corpus, "contract clause")
+    # replaced segments are gone from disk
+    directory = user_dir(str(tmp_path), USER)
+    on_disk = {n for n in os.listdir(directory) if os.path.isdir(os.path.join(directory, n))}
+    assert on_disk == {s["name"] for s in read_manifest(directory)["segments"]}
+
+
+def test_staged_batches_of_one_document_publish_together(tmp_path):
+    doc = documents(2, 1, 40)[0]
+    ids, texts = list(doc), list(doc.values())
+    staged = [
+        stage_segment(str(tmp_path), ids[i : i + 15], texts[i : i + 15])
+        for i in range(0, 40, 15)
+    ]
+    assert load_index(str(tmp_path), USER) is None
+
+    append_staged(str(tmp_path), USER, 1, staged)
+    assert os.listdir(tmp_path / STAGING) == []
+    index = load_index(str(tmp_path), USER)
+    assert (index.version, len(index)) == (1, 40)
+    assert_matches_reference(index, doc, "invoice shipping")
+
+    compact(str(tmp_path), USER)
+    assert_matches_reference(load_index(str(tmp_path), USER), doc, "invoice shipping")
+
+
+def test_limit_and_version_gap(tmp_path):
+    docs = documents(3, 2, 20)
+    append_document(str(tmp_path), USER, 1, list(docs[0]), list(docs[0].values()))
+    # version 2 never reached the index
+    append_document(str(tmp_path), USER, 3, list(docs[1]), list(docs[1].values()))
+    index = open_index(tmp_path)
+    assert (index.version, index.stale) == (3, True)
+
+    corpus = {**docs[0], **docs[1]}
+    expected = sorted(reference_bm25(corpus, "risk").values(), reverse=True)[:5]
+    hits = index.search("risk", limit=5)
+    assert [h["score"] for h in hits] == pytest.approx(expected, rel=1e-4)
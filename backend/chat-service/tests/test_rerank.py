@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app import rerank as rerank_module
+from app.rerank import BM25FReranker, Reranker, RRFReranker, rerank
+from app.retrieval import with_text
+from app.scoring import ChunkMatrix
+
+USER = "user@example.com"
+TEXT_QUERY = "RETURN c.id AS id, c.text AS text"
+
+
+class ByTextLength(Reranker):
+    """
+    Longer text scores higher; records the pool it was asked to score.
+    """
+
+    name = "length"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.seen: list[list[str]] = []
+
+    def score(self, query, chunks, features):
+        time.sleep(self.delay)
+        self.seen.append([c["id"] for c in chunks])
+        return np.array([len(c["text"]) for c in chunks], dtype=np.float32)
+
+
+def make_matrix(n: int) -> ChunkMatrix:
+    return ChunkMatrix(
+        [{"id": f"c{i}", "file_name": "a.pdf", "page": 1, "embedding": [1.0, float(i)]}
+         for i in range(n)]
+    )
+
+
+@pytest.fixture
+def use_reranker(monkeypatch):
+    def install(reranker, top_m=50, budget_ms=1000):
+        monkeypatch.setattr(rerank_module, "get_reranker", lambda: reranker)
+        monkeypatch.setattr(rerank_module.settings, "RERANK_TOP_M", top_m)
+        monkeypatch.setattr(rerank_module.settings, "RERANK_BUDGET_MS", budget_ms)
+        return reranker
+
+    return install
+
+
+def texts_by_id(params):
+    # c0 gets the longest text, so the rerank order is the reverse of fused
+    return [{"id": cid, "text": "x" * (100 - int(cid[1:]))} for cid in params["ids"]]
+
+
+def run_rerank(matrix, fused):
+    return asyncio.run(rerank(USER, "query", matrix, fused, [1.0, 0.0], {}))
+
+
+def test_reranker_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        Reranker()
+
+
+def test_rerank_orders_the_pool_by_backend_scores(fake_driver, use_reranker):
+    fake_driver.respond(TEXT_QUERY, texts_by_id)
+    use_reranker(ByTextLength())
+    matrix = make_matrix(5)
+    fused = np.array([0.1, 0.2, 0.3, 0.4, 0.5], dtype=np.float32)
+
+    scores, texts = run_rerank(matrix, fused)
+
+    assert list(np.argsort(-scores, kind="stable")) == [0, 1, 2, 3, 4]
+    assert scores.max() == 1.0 and scores.min() == 0.0
+    assert set(texts) == {f"c{i}" for i in range(5)}
+
+
+def test_only_the_top_m_fused_candidates_are_scored(fake_driver, use_reranker):
+    fake_driver.respond(TEXT_QUERY, texts_by_id)
+    reranker = use_reranker(ByTextLength(), top_m=3)
+    matrix = make_matrix(6)
+    fused = np.array([0.6, 0.1, 0.5, 0.2, 0.4, 0.3], dtype=np.float32)
+
+    scores, texts = run_rerank(matrix, fused)
+
+    assert reranker.seen == [["c0", "c2", "c4"]]
+    assert set(texts) == {"c0", "c2", "c4"}
+    hydrated = [q for q, params in fake_driver.queries if TEXT_QUERY in q]
+    assert len(hydrated) == 1
+    # rows outside the pool drop below every pool row
+    assert list(scores[[1, 3, 5]]) == [-1.0, -1.0, -1.0]
+    assert scores[[0, 2, 4]].min() >= 0.0
+
+
+def test_texts_from_rerank_are_not_fetched_again(fake_driver, use_reranker):
+    fake_driver.respond(TEXT_QUERY, texts_by_id)
+    use_reranker(ByTextLength(), top_m=2)
+    matrix = make_matrix(4)
+    fused = np.array([0.4, 0.3, 0.2, 0.1], dtype=np.float32)
+    _, texts = run_rerank(matrix, fused)
+
+    fake_driver.queries.clear()
+    chunks = asyncio.run(with_text(USER, matrix.chunks[:3], known=texts))
+
+    assert [c["text"] for c in chunks] == ["x" * 100, "x" * 99, "x" * 98]
+    # only c2, which was outside the rerank pool, needed a lookup
+    assert [params["ids"] for _, params in fake_driver.queries] == [["c2"]]
+
+
+def test_text_free_backend_hydrates_nothing(fake_driver, use_reranker):
+    use_reranker(RRFReranker())
+    matrix = make_matrix(3)
+    scores, texts = asyncio.run(
+        rerank(USER, "q", matrix, np.array([0.3, 0.2, 0.1]), [1.0, 0.0], {"c2": 1.0})
+    )
+    assert texts == {} and fake_driver.queries == []
+    assert scores.shape == (3,)
+
+
+def test_timeout_falls_back_to_fused(fake_driver, use_reranker):
+    fake_driver.respond(TEXT_QUERY, texts_by_id)
+    use_reranker(ByTextLength(delay=0.3), budget_ms=50)
+    matrix = make_matrix(3)
+    fused = np.array([0.3, 0.2, 0.1], dtype=np.float32)
+    scores, texts = run_rerank(matrix, fused)
+    assert scores is fused
+    # the texts were fetched before the scorer ran out of time; keep them
+    assert set(texts) == {"c0", "c1", "c2"}
+
+
+def test_no_backend_returns_fused(use_reranker):
+    use_reranker(None)
+    fused = np.array([0.3, 0.2], dtype=np.float32)
+    scores, texts = run_rerank(make_matrix(2), fused)
+    assert scores is fused and texts == {}
+
+
+def test_bm25f_prefers_heading_and_file_name_matches():
+    chunks = [
+        {"id": "a", "text": "Refund policy\n\nBody about shipping.", "file_name": "x.pdf"},
+        {"id": "b", "text": "Body that mentions a refund once.", "file_name": "y.pdf"},
+        {"id": "c", "text": "Nothing relevant here.", "file_name": "refund.pdf"},
+        {"id": "d", "text": "Nothing relevant here.", "file_name": "z.pdf"},
+    ]
+    scores = BM25FReranker().score("refund", chunks, {})
+    assert scores[3] == 0.0
+    assert scores[0] > scores[1] and scores[2] > scores[1]
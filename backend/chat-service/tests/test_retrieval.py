@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app import lexical_index, metrics, retrieval
+from app.config import settings
+from app.index_files import user_dir
+
+USER = "user@example.com"
+FULLTEXT = [{"id": "c1", "score": 2.0}, {"id": "c2", "score": 1.0}]
+
+
+@pytest.fixture
+def lexical_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "LEXICAL_INDEX_DIR", str(tmp_path))
+    return tmp_path
+
+
+def fallbacks() -> float:
+    return metrics.events._values.get("lexical_index_fallback", 0)
+
+
+@pytest.mark.parametrize("error", [OSError("segment gone"), ValueError("bad manifest")])
+def test_broken_lexical_index_falls_back_to_fulltext(
+    monkeypatch, lexical_dir, fake_driver, error
+):
+    def broken(root, user_email):
+        raise error
+
+    monkeypatch.setattr(lexical_index, "load_index", broken)
+    fake_driver.respond("db.index.fulltext.queryNodes", FULLTEXT)
+    before = fallbacks()
+
+    hits = asyncio.run(retrieval.fetch_bm25_hits("refund policy", USER, 3))
+    assert hits == FULLTEXT
+    assert fallbacks() == before + 1
+
+
+def test_corrupt_manifest_falls_back_to_fulltext(lexical_dir, fake_driver):
+    directory = lexical_dir / user_dir(str(lexical_dir), USER)
+    directory.mkdir(parents=True)
+    (directory / "manifest.json").write_text('{"version": 3, "segm')
+    fake_driver.respond("db.index.fulltext.queryNodes", FULLTEXT)
+
+    assert asyncio.run(retrieval.fetch_bm25_hits("refund", USER, 3)) == FULLTEXT
+
+
+def test_current_lexical_index_skips_fulltext(lexical_dir, fake_driver):
+    lexical_index.append_document(
+        str(lexical_dir), USER, 1, ["a", "b"], ["refund policy", "shipping"]
+    )
+    hits = asyncio.run(retrieval.fetch_bm25_hits("refund", USER, 1))
+    assert [h["id"] for h in hits] == ["a"]
+    assert fake_driver.count("fulltext") == 0
+    # behind Neo4j's chunks_version: fulltext
+    fake_driver.respond("db.index.fulltext.queryNodes", FULLTEXT)
+    assert asyncio.run(retrieval.fetch_bm25_hits("refund", USER, 2)) == FULLTEXT
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from app.scoring import ChunkMatrix, mmr_indices, top_k_indices
+
+
+def reference_top_k(scores, k):
+    """Best first, ties by index: a plain stable sort."""
+    return sorted(range(len(scores)), key=lambda i: -scores[i])[:k]
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 8, 12])
+def test_top_k_matches_a_full_sort(k):
+    rng = np.random.default_rng(k)
+    scores = rng.standard_normal(10).astype(np.float32)
+    assert top_k_indices(scores, k).tolist() == reference_top_k(scores.tolist(), k)
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4, 6, 9])
+def test_top_k_ties_keep_index_order(k):
+    # many equal scores on both sides of the k-th place
+    scores = np.array([0.5, 0.9, 0.5, 0.5, 0.9, 0.1, 0.5, 0.9, 0.5], dtype=np.float32)
+    assert top_k_indices(scores, k).tolist() == reference_top_k(scores.tolist(), k)
+
+
+def test_top_k_ties_on_large_input_are_deterministic():
+    rng = np.random.default_rng(0)
+    # few distinct values, so the k-th place is always inside a tie
+    scores = rng.integers(0, 5, 10_000).astype(np.float32)
+    expected = reference_top_k(scores.tolist(), 100)
+    assert top_k_indices(scores, 100).tolist() == expected
+    assert top_k_indices(scores[::-1].copy(), 100).tolist() == reference_top_k(
+        scores[::-1].tolist(), 100
+    )
+
+
+def test_top_k_edge_cases():
+    scores = np.array([0.2, 0.8, 0.5], dtype=np.float32)
+    assert top_k_indices(scores, 0).tolist() == []
+    assert top_k_indices(np.zeros(0, dtype=np.float32), 3).tolist() == []
+    assert top_k_indices(scores, 10).tolist() == [1, 2, 0]
+    with_nan = np.array([np.nan, 0.3, np.nan, 0.7], dtype=np.float32)
+    assert top_k_indices(with_nan, 3).tolist() == [3, 1, 0]
+
+
+def test_chunk_matrix_cosine_and_fuse():
+    matrix = ChunkMatrix(
+        [
+            {"id": "a", "embedding": [1.0, 0.0]},
+            {"id": "b", "embedding": [0.0, 2.0]},
+            {"id": "c"},
+            {"text": "no id, dropped", "embedding": [1.0, 1.0]},
+        ]
+    )
+    assert matrix.ids == ["a", "b", "c"]
+    np.testing.assert_allclose(matrix.cosine([3.0, 0.0]), [1.0, 0.0, 0.0])
+    np.testing.assert_allclose(
+        matrix.fuse([3.0, 0.0], {"b": 1.0, "unknown": 1.0}, alpha=0.5), [0.5, 0.5, 0.0]
+    )
+    # a query of another dimension scores nothing
+    np.testing.assert_allclose(matrix.cosine([1.0, 0.0, 0.0]), [0.0, 0.0, 0.0])
+
+
+def reference_mmr(vectors, scores, k, lambda_):
+    """
+    The textbook loop: pick the best score first, then whatever maximizes
+    lambda * score - (1 - lambda) * max cosine to the picks (first wins ties).
+    """
+    rest = sorted(range(len(scores)), key=lambda i: -scores[i])
+    picked = []
+    while rest and len(picked) < k:
+        if not picked:
+            picked.append(rest.pop(0))
+            continue
+        best, best_value = None, None
+        for pos, i in enumerate(rest):
+            sim = max(
+                float(vectors[i] @ vectors[j])
+                / (np.linalg.norm(vectors[i]) * np.linalg.norm(vectors[j]))
+                for j in picked
+            )
+            value = lambda_ * scores[i] - (1 - lambda_) * sim
+            if best_value is None or value > best_value:
+                best, best_value = pos, value
+        picked.append(rest.pop(best))
+    return picked
+
+
+def clustered(rng, n, dim=32):
+    """Near-duplicate groups, so diversity changes the picks."""
+    centers = rng.standard_normal((max(n // 10, 1), dim))
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.2 * rng.standard_normal((n, dim))
+    query = centers[0] + 0.2 * rng.standard_normal(dim)
+    scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    return vectors.astype(np.float32), scores.astype(np.float32)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("lambda_", [0.3, 0.7, 1.0])
+def test_mmr_matches_reference(seed, lambda_):
+    rng = np.random.default_rng(seed)
+    vectors, scores = clustered(rng, 60)
+    expected = reference_mmr(vectors.astype(np.float64), scores.astype(np.float64), 8, lambda_)
+    got = mmr_indices(vectors, scores, 8, lambda_=lambda_, pool_size=len(scores))
+    assert got.tolist() == expected
+
+
+def test_mmr_only_picks_from_the_pool():
+    rng = np.random.default_rng(1)
+    vectors, scores = clustered(rng, 200)
+    pool = set(top_k_indices(scores, 20).tolist())
+    got = mmr_indices(vectors, scores, 10, lambda_=0.5, pool_size=20)
+    assert len(got) == 10
+    assert set(got.tolist()) <= pool
+    # within the pool it is the reference MMR
+    order = top_k_indices(scores, 20)
+    expected = reference_mmr(
+        vectors[order].astype(np.float64), scores[order].astype(np.float64), 10, 0.5
+    )
+    assert got.tolist() == order[expected].tolist()
+
+
+def test_mmr_skips_duplicates_and_handles_zero_rows():
+    vectors = np.array([[1, 0], [1, 0], [0, 1], [0, 0]], dtype=np.float32)
+    scores = np.array([0.9, 0.89, 0.5, 0.4], dtype=np.float32)
+    # the exact duplicate of the first pick loses to the orthogonal row
+    assert mmr_indices(vectors, scores, 2, lambda_=0.5).tolist() == [0, 2]
+    # k larger than the candidates: every row once
+    assert sorted(mmr_indices(vectors, scores, 10, lambda_=0.5).tolist()) == [0, 1, 2, 3]
+    assert mmr_indices(vectors, scores, 0).tolist() == []
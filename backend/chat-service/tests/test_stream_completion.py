@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from app import chat
+
+TOKENS = 5
+TOKEN_INTERVAL = 0.02
+
+
+def sse_chunk(delta: dict, finish_reason=None) -> bytes:
+    payload = {
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-3.5-turbo",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+async def fake_openai(request: httpx.Request) -> httpx.Response:
+    """
+    Streamed chat completion whose tokens name the prompt, with an
+    asyncio.sleep between them like a remote model.
+    """
+    body = json.loads(request.content)
+    name = body["messages"][-1]["content"]
+
+    async def events():
+        yield sse_chunk({"role": "assistant", "content": ""})
+        for i in range(TOKENS):
+            await asyncio.sleep(TOKEN_INTERVAL)
+            yield sse_chunk({"content": f"{name}{i} "})
+        yield sse_chunk({}, finish_reason="stop")
+        yield b"data: [DONE]\n\n"
+
+    return httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content=events()
+    )
+
+
+@pytest.fixture
+def streaming_client(monkeypatch):
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://openai.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake_openai)),
+    )
+    monkeypatch.setattr(chat, "client", client)
+    return client
+
+
+def test_concurrent_streams_interleave_without_blocking_the_loop(streaming_client):
+    async def main():
+        order: list[str] = []
+        ticks: list[float] = []
+        done = asyncio.Event()
+
+        async def ticker():
+            # keeps running only if nothing else holds the event loop
+            while not done.is_set():
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.002)
+
+        async def consume(name: str) -> str:
+            parts = []
+            async for token in chat.stream_completion(name):
+                order.append(token.strip())
+                parts.append(token)
+            return "".join(parts)
+
+        # first request pays one-off client setup (lazy imports, connection)
+        await consume("warmup")
+        order.clear()
+
+        tick_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        answers = await asyncio.gather(consume("a"), consume("b"))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await tick_task
+        return order, ticks, answers, elapsed
+
+    order, ticks, answers, elapsed = asyncio.run(main())
+
+    assert answers == [
+        "".join(f"{name}{i} " for i in range(TOKENS)) for name in ("a", "b")
+    ]
+    # interleaved: b's first token arrives before a's last, and vice versa
+    assert order.index("b0") < order.index(f"a{TOKENS - 1}")
+    assert order.index("a0") < order.index(f"b{TOKENS - 1}")
+    # overlapped: about one stream's duration, not two
+    assert elapsed < 2 * TOKENS * TOKEN_INTERVAL
+    # the loop kept serving other tasks between tokens
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    assert len(ticks) > TOKENS * 2
+    assert max(gaps) < TOKEN_INTERVAL * 2
@@ -0,0 +1,67 @@
+"""
+chat-service and pdf-graphrag-service each build their image from their own
+directory, so modules both of them need are copied into both app/ packages.
+Several define on-disk formats one service writes and the other reads (BM25
+tokenization, IVF layout, packed embeddings), so the copies must stay
+byte-identical. From backend/:
+
+    python check_shared_modules.py          # exit 1 and show a diff if they differ
+
+Edit one copy, then copy the file over the other.
+"""
+
+import difflib
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICES = ("chat-service", "pdf-graphrag-service")
+SHARED_MODULES = (
+    "ann_index.py",
+    "embedding_codec.py",
+    "index_files.py",
+    "jwt_verify.py",
+    "lexical_index.py",
+    "metrics.py",
+    "ttl_cache.py",
+)
+
+
+def differing_modules() -> dict[str, list[str]]:
+    """
+    Unified diff per shared module whose copies differ (or one is missing).
+    """
+    diffs = {}
+    for name in SHARED_MODULES:
+        paths = [os.path.join(BACKEND_DIR, service, "app", name) for service in SERVICES]
+        copies = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    copies.append(f.read().splitlines(keepends=True))
+            except FileNotFoundError:
+                copies.append(None)
+        if None in copies:
+            diffs[name] = [f"missing: {p}\n" for p, c in zip(paths, copies) if c is None]
+        elif copies[0] != copies[1]:
+            diffs[name] = list(
+                difflib.unified_diff(
+                    copies[0], copies[1], *(os.path.relpath(p, BACKEND_DIR) for p in paths)
+                )
+            )
+    return diffs
+
+
+def main() -> int:
+    diffs = differing_modules()
+    for lines in diffs.values():
+        sys.stdout.writelines(lines)
+    if diffs:
+        print(f"\nshared modules out of sync: {', '.join(diffs)}")
+        return 1
+    print(f"{len(SHARED_MODULES)} shared modules in sync")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
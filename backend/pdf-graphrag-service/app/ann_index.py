@@ -0,0 +1,269 @@
+import json
+import math
+import os
+
+import numpy as np
+
+from app.index_files import (
+    LoadedIndexes,
+    adopt_segments,
+    commit_manifest,
+    locked,
+    new_segment_path,
+    new_staged_path,
+    next_manifest,
+    read_manifest,
+    user_dir,
+)
+
+# Per-user approximate nearest neighbour index (IVF-flat), pure NumPy.
+#
+# Layout under ANN_INDEX_DIR/<sha256(email)[:32]>/:
+#   manifest.json   {"version", "dim", "stale", "segments": [...]}
+#   <segment>/      one directory per segment, never modified once written
+#     vectors.npy   unit-normalized float32 rows (ivf: grouped by list)
+#     ids.json      chunk ids, aligned with vectors.npy
+#     centroids.npy (ivf only) list centroids
+#     offsets.npy   (ivf only) rows of list i are offsets[i]:offsets[i+1]
+#
+# pdf-graphrag-service writes it: each ingest batch of a document is staged
+# as a flat "delta" segment and published once the document commits, and
+# once there are too many deltas everything is compacted into one new IVF
+# segment. chat-service memory-maps the arrays
+# and searches the nprobe closest lists of IVF segments plus every delta.
+# Versioning, locking and manifest handling: see app/index_files.py.
+
+KMEANS_ITERATIONS = 10
+# k-means trains on at most this many points per list
+KMEANS_SAMPLE_PER_LIST = 64
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _nlist_for(n: int) -> int:
+    return max(1, min(int(math.sqrt(n)), 4096))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 8192) -> np.ndarray:
+    """
+    Closest centroid (max inner product) per row, in blocks to bound memory.
+    """
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for i in range(0, len(vectors), block):
+        labels[i : i + block] = np.argmax(vectors[i : i + block] @ centroids.T, axis=1)
+    return labels
+
+
+def kmeans(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on unit rows: centroids are renormalized means, so
+    assignment by inner product is assignment by cosine.
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=nlist) == 0
+        # re-seed empty lists with random points instead of dropping them
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = _unit_rows(sums)
+    return centroids
+
+
+def _save_segment(path: str, vectors: np.ndarray, ids: list[str], ivf: bool) -> dict:
+    tmp = f"{path}.tmp"
+    os.makedirs(tmp)
+    if ivf and len(vectors):
+        centroids = kmeans(vectors, _nlist_for(len(vectors)))
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=len(centroids)))
+        vectors = vectors[order]
+        ids = [ids[i] for i in order]
+        np.save(os.path.join(tmp, "centroids.npy"), centroids)
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "vectors.npy"), np.ascontiguousarray(vectors, dtype=np.float32))
+    with open(os.path.join(tmp, "ids.json"), "w") as f:
+        json.dump(ids, f)
+    os.replace(tmp, path)
+    return {"name": os.path.basename(path), "kind": "ivf" if ivf else "flat", "count": len(ids)}
+
+
+def _load_all(directory: str, manifest: dict) -> tuple[np.ndarray, list[str]]:
+    vectors, ids = [], []
+    for segment in manifest["segments"]:
+        path = os.path.join(directory, segment["name"])
+        vectors.append(np.load(os.path.join(path, "vectors.npy")))
+        with open(os.path.join(path, "ids.json")) as f:
+            ids.extend(json.load(f))
+    dim = manifest.get("dim") or 0
+    return (np.concatenate(vectors) if vectors else np.zeros((0, dim), np.float32)), ids
+
+
+def _compact(directory: str, manifest: dict) -> dict:
+    vectors, ids = _load_all(directory, manifest)
+    path = new_segment_path(directory, "base")
+    return {**manifest, "segments": [_save_segment(path, vectors, ids, ivf=True)]}
+
+
+def stage_segment(root: str, ids: list[str], vectors: np.ndarray) -> dict:
+    """
+    Write part of a not yet committed document as a staged delta segment,
+    to be published with append_staged (or dropped with discard_segments).
+    """
+    vectors = _unit_rows(vectors)
+    segment = _save_segment(new_staged_path(root, "delta"), vectors, ids, ivf=False)
+    return {**segment, "dim": int(vectors.shape[1])}
+
+
+def append_document(
+    root: str,
+    user_email: str,
+    version: int,
+    ids: list[str],
+    vectors: np.ndarray,
+    max_deltas: int = 8,
+) -> None:
+    """
+    Add one committed document (version = the User.chunks_version it produced).
+    """
+    segments = [stage_segment(root, ids, vectors)] if len(ids) else []
+    append_staged(root, user_email, version, segments, max_deltas)
+
+
+def append_staged(
+    root: str,
+    user_email: str,
+    version: int,
+    segments: list[dict],
+    max_deltas: int = 8,
+) -> None:
+    """
+    Publish the staged segments of one committed document. Compacts into a
+    single IVF segment when deltas exceed max_deltas or hold more rows than
+    the IVF part.
+    """
+    directory = user_dir(root, user_email)
+    with locked(directory):
+        manifest = next_manifest(directory, version, {"dim": 0})
+
+        for segment in adopt_segments(root, directory, segments):
+            manifest["dim"] = segment["dim"]
+            manifest["segments"].append(segment)
+
+        flat = [s for s in manifest["segments"] if s["kind"] == "flat"]
+        indexed = sum(s["count"] for s in manifest["segments"] if s["kind"] == "ivf")
+        if len(flat) > max_deltas or sum(s["count"] for s in flat) > max(indexed, 1024):
+            manifest = _compact(directory, manifest)
+
+        commit_manifest(directory, manifest)
+
+
+def rebuild(root: str, user_email: str, version: int, ids: list[str], vectors: np.ndarray) -> None:
+    """
+    Replace the user's index with one IVF segment over all their chunks.
+    """
+    directory = user_dir(root, user_email)
+    with locked(directory):
+        vectors = _unit_rows(vectors) if len(ids) else np.zeros((0, 0), np.float32)
+        path = new_segment_path(directory, "base")
+        manifest = {
+            "version": version,
+            "dim": int(vectors.shape[1]) if len(ids) else 0,
+            "stale": False,
+            "segments": [_save_segment(path, vectors, ids, ivf=True)] if len(ids) else [],
+        }
+        commit_manifest(directory, manifest)
+
+
+def compact(root: str, user_email: str) -> None:
+    """
+    Merge all segments of a user's index into one IVF segment (keeps version/stale).
+    """
+    directory = user_dir(root, user_email)
+    with locked(directory):
+        manifest = read_manifest(directory)
+        if manifest is None or not manifest["segments"]:
+            return
+        manifest = _compact(directory, manifest)
+        commit_manifest(directory, manifest)
+
+
+class AnnIndex:
+    """
+    Read-only view of one user's index; arrays are memory-mapped, so only
+    the probed lists are paged in.
+    """
+
+    def __init__(self, directory: str, manifest: dict):
+        self.version = manifest["version"]
+        self.stale = manifest.get("stale", False)
+        self.dim = manifest.get("dim", 0)
+        self.segments = []
+        for segment in manifest["segments"]:
+            path = os.path.join(directory, segment["name"])
+            with open(os.path.join(path, "ids.json")) as f:
+                ids = json.load(f)
+            vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            if segment["kind"] == "ivf":
+                centroids = np.load(os.path.join(path, "centroids.npy"))
+                offsets = np.load(os.path.join(path, "offsets.npy"))
+            else:
+                centroids = offsets = None
+            self.segments.append((ids, vectors, centroids, offsets))
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids, _, _, _ in self.segments)
+
+    def search(self, query, n: int, nprobe: int) -> tuple[list[str], np.ndarray]:
+        """
+        Approximate top-n chunk ids by cosine, best first, with their scores.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if not self.segments or norm == 0 or q.shape[0] != self.dim:
+            return [], np.zeros(0, dtype=np.float32)
+        q = q / norm
+
+        found_ids: list[str] = []
+        found_scores: list[np.ndarray] = []
+        for ids, vectors, centroids, offsets in self.segments:
+            if centroids is None:
+                rows = np.arange(len(ids))
+                scores = vectors @ q
+            else:
+                lists = np.argsort(-(centroids @ q))[:nprobe]
+                rows = np.concatenate(
+                    [np.arange(offsets[i], offsets[i + 1]) for i in lists]
+                )
+                scores = np.concatenate(
+                    [vectors[offsets[i] : offsets[i + 1]] @ q for i in lists]
+                )
+            best = np.argsort(-scores)[:n]
+            found_ids.extend(ids[r] for r in rows[best])
+            found_scores.append(scores[best])
+
+        scores = np.concatenate(found_scores)
+        order = np.argsort(-scores, kind="stable")[:n]
+        return [found_ids[i] for i in order], scores[order]
+
+
+_loaded = LoadedIndexes(AnnIndex)
+
+
+def load_index(root: str, user_email: str) -> AnnIndex | None:
+    """
+    The user's index, reusing the mapped copy until manifest.json changes.
+    None when the user has no index.
+    """
+    return _loaded.get(root, user_email)
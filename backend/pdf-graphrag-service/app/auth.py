@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+import httpx
+from fastapi import HTTPException, Header
+
+from app.config import settings
+from app.jwt_verify import secret_key, unverified_expiry, verify_jwt
+from app.metrics import span
+from app.ttl_cache import TTLCache
+
+# verified profiles by sha256(token); never stores the raw token
+token_cache = TTLCache(
+    "auth_token",
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+_jwt_key = (
+    secret_key(settings.JWT_SECRET, settings.JWT_SECRET_BASE64)
+    if settings.JWT_SECRET
+    else None
+)
+_http: httpx.AsyncClient | None = None
+
+
+async def start_http_client() -> None:
+    """
+    Create the pooled keep-alive client to user-management (app startup).
+    """
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=5,
+            limits=httpx.Limits(
+                max_connections=settings.AUTH_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AUTH_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+
+
+async def close_http_client() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+# Dependency to fetch the current user from user-management service.
+async def get_current_user(authorization: str = Header(..., alias="Authorization")):
+    """
+    Verifies the user's JWT token: verified-token cache first, then locally
+    against JWT_SECRET when set (user is {"email": sub}), otherwise via the
+    /profile endpoint in the user-management backend.
+    """
+    with span("auth"):
+        token = authorization[7:] if authorization.startswith("Bearer ") else authorization
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        user = token_cache.get(key)
+        if user is not TTLCache.MISSING:
+            return user
+
+        if _jwt_key is not None:
+            claims = verify_jwt(token, _jwt_key)
+            sub = claims.get("sub") if claims is not None else None
+            if not isinstance(sub, str) or not sub:
+                raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
+            return {"email": sub}
+
+        if _http is None:
+            await start_http_client()
+        start = time.perf_counter()
+        try:
+            response = await _http.get(
+                f"{settings.USER_MGMT_URL}/profile",
+                headers={"Authorization": authorization},
+            )
+        except httpx.HTTPError:
+            raise HTTPException(status_code=500, detail="Could not validate user")
+        if response.status_code != 200:
+            raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
+
+        user = response.json()
+        # don't let a cached profile outlive its token
+        exp = unverified_expiry(token)
+        if exp is None or exp > time.time() + settings.AUTH_CACHE_TTL_SECONDS:
+            token_cache.put(key, user, time.perf_counter() - start)
+        return user
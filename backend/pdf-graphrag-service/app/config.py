@@ -4,9 +4,79 @@ load_dotenv()
 
 class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # point at a local fake server for tests/benchmarks; None = api.openai.com
+    OPENAI_BASE_URL  = os.getenv("OPENAI_BASE_URL") or None
     NEO4J_URI        = os.getenv("NEO4J_URI")
     NEO4J_USER       = os.getenv("NEO4J_USER")
     NEO4J_PASSWORD   = os.getenv("NEO4J_PASSWORD")
     USER_MGMT_URL    = os.getenv("USER_MGMT_URL")
 
+    # Native vector index on Chunk.embedding (needs Neo4j 5.11+)
+    VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "false").lower() == "true"
+    EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+    # How Chunk embeddings are stored: list (floats) | float32 | int8 (see app/embedding_codec.py).
+    # The packed formats are ~2x / ~8x smaller than list on the wire; with
+    # VECTOR_INDEX_ENABLED the list is written as well, because the index needs it.
+    EMBEDDING_STORAGE    = os.getenv("EMBEDDING_STORAGE", "list").lower()
+
+    # Batched embedding requests (see app/embedding.py)
+    EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "50000"))
+    EMBED_BATCH_SIZE   = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+    EMBED_CONCURRENCY  = int(os.getenv("EMBED_CONCURRENCY", "4"))
+    EMBED_MAX_RETRIES  = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+    # Content-addressed on-disk cache of chunk embeddings; "" disables it.
+    # Least recently used rows are dropped past EMBEDDING_CACHE_MAX_ROWS
+    # (~6 KB per ada-002 row, so the default is ~600 MB).
+    EMBEDDING_CACHE_PATH     = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3")
+    EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "100000"))
+
+    # Chunking: "llm" asks gpt-3.5-turbo per page, "local" uses app/local_chunker.py
+    CHUNKING_MODE        = os.getenv("CHUNKING_MODE", "llm").lower()
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "80"))
+    # Concurrent per-page LLM chunking (see app/pdf_ingest.py)
+    CHUNK_CONCURRENCY  = int(os.getenv("CHUNK_CONCURRENCY", "8"))
+
+    # Per-user IVF index files for chat-service's RETRIEVAL_MODE=ann (see app/ann_index.py);
+    # "" disables. Must be the same directory (shared volume) as chat-service's.
+    ANN_INDEX_DIR  = os.getenv("ANN_INDEX_DIR", "")
+    # committed documents kept as flat delta segments before compaction
+    ANN_MAX_DELTAS = int(os.getenv("ANN_MAX_DELTAS", "8"))
+    # Per-user BM25 index files queried by chat-service instead of the global
+    # chunkText fulltext index (see app/lexical_index.py); "" disables
+    LEXICAL_INDEX_DIR    = os.getenv("LEXICAL_INDEX_DIR", "")
+    # committed documents kept as separate segments before they are merged
+    LEXICAL_MAX_SEGMENTS = int(os.getenv("LEXICAL_MAX_SEGMENTS", "8"))
+
+    # Rows per UNWIND statement in ChunkWriter
+    NEO4J_WRITE_BATCH_SIZE = int(os.getenv("NEO4J_WRITE_BATCH_SIZE", "500"))
+
+    # Background ingest jobs (see app/jobs.py)
+    INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "2"))
+    INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "20"))
+    JOB_TTL_SECONDS    = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+    # Chunks embedded + staged per pipeline step; bounds ingest memory. Default
+    # (0) is one full round of embedding requests, EMBED_BATCH_SIZE x
+    # EMBED_CONCURRENCY; smaller leaves embedding concurrency unused.
+    INGEST_BATCH_CHUNKS = (
+        int(os.getenv("INGEST_BATCH_CHUNKS", "0")) or EMBED_BATCH_SIZE * EMBED_CONCURRENCY
+    )
+    # Where uploads are spooled before processing (None = system temp dir)
+    UPLOAD_TMP_DIR     = os.getenv("UPLOAD_TMP_DIR") or None
+
+
+    # Auth: pooled client to user-management plus a short-lived cache of
+    # verified tokens (keyed by sha256 of the token)
+    AUTH_CACHE_TTL_SECONDS    = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_CACHE_MAX_ENTRIES    = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "4096"))
+    AUTH_HTTP_MAX_CONNECTIONS = int(os.getenv("AUTH_HTTP_MAX_CONNECTIONS", "100"))
+    # Same value as user-management's jwt.secret to verify tokens locally; "" = ask /profile.
+    # jjwt treats that string as base64, set JWT_SECRET_BASE64=false for a raw key.
+    JWT_SECRET        = os.getenv("JWT_SECRET", "")
+    JWT_SECRET_BASE64 = os.getenv("JWT_SECRET_BASE64", "true").lower() == "true"
+
+    # Stage latency histograms and event counters on GET /metrics (see app/metrics.py).
+    # METRICS_SAMPLE_RATE is the fraction of stage timings recorded.
+    METRICS_ENABLED     = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+
 settings = Settings()
@@ -1,8 +1,115 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
 from openai import OpenAI
 from app.config import settings
+from app.embedding_cache import cache_key, embedding_cache
+
+# Initialize the OpenAI client (retries are handled per batch below)
+_client = OpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    max_retries=0,
+)
+
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token), same rule as pdf_ingest.
+    """
+    return len(text) // 4 + 1
+
+
+def make_batches(
+    chunks: list[str], max_tokens: int, max_inputs: int
+) -> list[tuple[int, list[str]]]:
+    """
+    Pack consecutive chunks into batches that stay under both the token
+    budget and the per-request input limit.
+
+    :return: List of (start_index, batch_chunks) in input order
+    """
+    batches: list[tuple[int, list[str]]] = []
+    start, current, current_tokens = 0, [], 0
+
+    for i, chunk in enumerate(chunks):
+        tokens = estimate_tokens(chunk)
+        if current and (
+            current_tokens + tokens > max_tokens or len(current) >= max_inputs
+        ):
+            batches.append((start, current))
+            start, current, current_tokens = i, [], 0
+        current.append(chunk)
+        current_tokens += tokens
+
+    if current:
+        batches.append((start, current))
+    return batches
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Honour Retry-After when the server sends one, otherwise exponential backoff with jitter.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return float(retry_after)
+    except ValueError:
+        pass
+    return min(30.0, 0.5 * 2**attempt) * (0.5 + random.random())
+
+
+def _embed_batch(batch: list[str], model: str) -> list[list[float]]:
+    """
+    Embed one batch in a single multi-input request, retrying transient failures.
+    """
+    for attempt in range(settings.EMBED_MAX_RETRIES + 1):
+        try:
+            resp = _client.embeddings.create(model=model, input=batch)
+            break
+        except _RETRYABLE as e:
+            if attempt == settings.EMBED_MAX_RETRIES:
+                raise
+            time.sleep(_retry_delay(e, attempt))
+
+    # The API tags each vector with its input index; don't rely on list order
+    data = sorted(resp.data, key=lambda d: d.index)
+    if len(data) != len(batch):
+        raise ValueError(
+            f"Embedding count mismatch: sent {len(batch)}, got {len(data)}"
+        )
+    return [d.embedding for d in data]
+
 
-# Initialize the OpenAI client
-_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+def _embed_uncached(chunks: list[str], model: str) -> list[list[float]]:
+    """
+    Embed chunks through the API: multi-input requests (EMBED_BATCH_TOKENS /
+    EMBED_BATCH_SIZE), at most EMBED_CONCURRENCY requests at once.
+    """
+    batches = make_batches(
+        chunks, settings.EMBED_BATCH_TOKENS, settings.EMBED_BATCH_SIZE
+    )
+    embeddings: list[list[float]] = [None] * len(chunks)
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(settings.EMBED_CONCURRENCY, len(batches)))
+    ) as pool:
+        results = pool.map(lambda b: _embed_batch(b[1], model), batches)
+        for (start, batch), vectors in zip(batches, results):
+            embeddings[start : start + len(batch)] = vectors
+
+    return embeddings
 
 
 def compute_embeddings(
@@ -12,17 +119,35 @@ def compute_embeddings(
     Given a list of text chunks, call OpenAI's embedding API
     to convert each chunk into a vector.
 
+    Chunks already in the embedding cache (same model + normalized text) are
+    not sent again; repeated chunks within the call are embedded once. The
+    rest go out in batched, concurrent requests.
+
     :param chunks: List of text strings to embed
     :param model: Embedding model to use (default: text-embedding-ada-002)
-    :return: List of embedding vectors (each a list of floats)
+    :return: List of embedding vectors (each a list of floats), in input order
     """
-    embeddings: list[list[float]] = []
+    if not chunks:
+        return []
+    if embedding_cache is None:
+        return _embed_uncached(chunks, model)
+
+    embeddings = embedding_cache.get_many(model, chunks)
+
+    # one API input per distinct missing key
+    missing: dict[str, str] = {}
+    for chunk, vector in zip(chunks, embeddings):
+        if vector is None:
+            missing.setdefault(cache_key(model, chunk), chunk)
 
-    for chunk in chunks:
-        # Create an embedding for this chunk
-        resp = _client.embeddings.create(model=model, input=chunk)
-        # Extract the embedding vector
-        vector = resp.data[0].embedding
-        embeddings.append(vector)
+    if missing:
+        texts = list(missing.values())
+        vectors = _embed_uncached(texts, model)
+        embedding_cache.put_many(model, texts, vectors)
+        by_key = dict(zip(missing.keys(), vectors))
+        embeddings = [
+            v if v is not None else by_key[cache_key(model, c)]
+            for c, v in zip(chunks, embeddings)
+        ]
 
     return embeddings
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+
+from app.config import settings
+
+# last_used is only rewritten when older than this, so hits don't turn every
+# read into a write
+TOUCH_INTERVAL_SECONDS = 3600
+
+
+def normalize_text(text: str) -> str:
+    """
+    NFC + collapsed whitespace, so re-extracted copies of the same text share a key.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache in a local SQLite file.
+
+    Keys are sha256(model, normalized text), so the same content is embedded
+    once no matter which user uploads it or which document it appears in.
+    Vectors are stored as packed float32. WAL mode lets several ingest
+    workers share the file (concurrent readers, one writer).
+
+    At most max_rows rows are kept: once an insert pushes the table past
+    that, the least recently used rows are deleted down to 90% of it. SQLite
+    reuses the freed pages, so the file stops growing at about that size.
+    """
+
+    def __init__(self, path: str, max_rows: int):
+        self.path = path
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "last_used" not in columns:
+            # files written before eviction existed count as least recently used
+            self._conn.execute(
+                "ALTER TABLE embeddings ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        # rows inserted since the table size was last checked; other processes
+        # write too, so the real count is only looked at every so often
+        self._inserted = 0
+        self._check_every = max(self.max_rows // 100, 100)
+        self._prune()
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        keys = [cache_key(model, t) for t in texts]
+        found: dict[str, bytes] = {}
+        now = int(time.time())
+        with self._lock:
+            # stay well under SQLite's host-parameter limit
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 500):
+                part = unique[i : i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    part,
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? "
+                        f"WHERE key IN ({placeholders}) AND last_used < ?",
+                        [now, *part, now - TOUCH_INTERVAL_SECONDS],
+                    )
+            self._conn.commit()
+
+        result: list[list[float] | None] = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                result.append(None)
+            else:
+                vector = array("f")
+                vector.frombytes(blob)
+                result.append(vector.tolist())
+        hits = sum(1 for r in result if r is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(result) - hits
+        return result
+
+    def put_many(self, model: str, texts: list[str], vectors: list[list[float]]) -> None:
+        now = int(time.time())
+        rows = [
+            (cache_key(model, t), array("f", v).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._inserted += len(rows)
+            if self._inserted < self._check_every:
+                return
+        self._prune()
+
+    def _prune(self) -> None:
+        """
+        Delete least recently used rows down to 90% of max_rows once over it.
+        """
+        with self._lock:
+            self._inserted = 0
+            (count,) = self._conn.execute("SELECT count(*) FROM embeddings").fetchone()
+            if count <= self.max_rows:
+                return
+            excess = count - int(self.max_rows * 0.9)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._conn.commit()
+            self.evicted += excess
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evicted": self.evicted,
+        }
+
+
+# None when EMBEDDING_CACHE_PATH is empty (cache disabled)
+embedding_cache = (
+    EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ROWS)
+    if settings.EMBEDDING_CACHE_PATH
+    else None
+)
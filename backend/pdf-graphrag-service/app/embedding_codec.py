@@ -0,0 +1,52 @@
+import numpy as np
+
+# Storage formats for Chunk embeddings (EMBEDDING_STORAGE):
+#   list    - c.embedding as a list of floats (8-byte doubles on the wire);
+#             the only format the native vector index can read
+#   float32 - c.embedding_bin: packed little-endian float32, 4 bytes/dim
+#   int8    - c.embedding_bin: symmetric scalar quantization, 1 byte/dim,
+#             with the per-vector scale in c.embedding_scale
+FORMATS = ("list", "float32", "int8")
+
+_DTYPES = {"float32": np.dtype("<f4"), "int8": np.dtype("i1")}
+
+
+def encode(vector: list[float], fmt: str) -> tuple[bytes, float | None]:
+    """
+    Pack one embedding as (bytes, scale) for the float32/int8 formats.
+    int8 maps [-max|x|, max|x|] onto [-127, 127]; scale is max|x| / 127.
+    """
+    v = np.asarray(vector, dtype=np.float32)
+    if fmt == "float32":
+        return v.astype("<f4").tobytes(), None
+    if fmt == "int8":
+        peak = float(np.abs(v).max()) if v.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        return np.round(v / scale).astype(np.int8).tobytes(), scale
+    raise ValueError(f"Unknown embedding format {fmt!r}, expected float32 or int8")
+
+
+def decode(blob: bytes, fmt: str, scale: float | None = None) -> np.ndarray:
+    """
+    View a packed embedding as a float32 vector. float32 blobs are not copied.
+    """
+    v = np.frombuffer(blob, dtype=_DTYPES[fmt])
+    if fmt == "int8":
+        return v.astype(np.float32) * np.float32(scale or 1.0)
+    return v
+
+
+def decode_many(
+    blobs: list[bytes], fmt: str, scales: list[float | None] | None = None
+) -> np.ndarray:
+    """
+    Decode same-length blobs of one format into an (n, dim) float32 matrix
+    with a single join + frombuffer instead of per-row conversion.
+    """
+    if not blobs:
+        return np.zeros((0, 0), dtype=np.float32)
+    flat = np.frombuffer(b"".join(blobs), dtype=_DTYPES[fmt]).reshape(len(blobs), -1)
+    if fmt == "int8":
+        s = np.array([x or 1.0 for x in scales], dtype=np.float32)
+        return flat.astype(np.float32) * s[:, None]
+    return flat.astype(np.float32, copy=False)
@@ -1,7 +1,16 @@
 from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError
+from app import ann_index, lexical_index
+from app.index_files import discard_segments
 from app.config import settings
+from app.embedding_codec import decode_many, encode
+from app.metrics import span
+import pickle
+import tempfile
 import uuid
 
+import numpy as np
+
 _driver = GraphDatabase.driver(
     settings.NEO4J_URI,
     auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
@@ -24,72 +33,395 @@ def pdf_exists(pdf_hash: str, user_email: str) -> bool:
         return result.single()["count"] > 0
 
 
-def write_chunks(
-    chunks: list[str],
-    embeddings: list[list[float]],
-    pages: list[int],
-    user_email: str,
-    pdf_hash: str,
-    file_name: str
-) -> None:
+# embedding / embedding_bin / embedding_scale are null (i.e. not set) unless
+# the storage format uses them, see app/embedding_codec.py
+_INSERT_CHUNKS = """
+MATCH (u:User {email: $user_email})
+UNWIND $rows AS row
+CREATE (c:Chunk {
+    id: row.id,
+    text: row.text,
+    embedding: row.embedding,
+    embedding_bin: row.embedding_bin,
+    embedding_format: row.embedding_format,
+    embedding_scale: row.embedding_scale,
+    user_email: $user_email,
+    pdf_id: $pdf_id,
+    pdf_hash: $pdf_hash,
+    file_name: $file_name,
+    page: row.page
+})
+CREATE (u)-[:UPLOADED]->(c)
+"""
+
+
+def _embedding_fields(embedding: list[float]) -> dict:
     """
-    Store each text chunk + its embedding + its page in Neo4j.
-    Skip if same PDF hash has already been uploaded by the user.
+    Row properties for one embedding in the configured EMBEDDING_STORAGE.
+    The float list is kept alongside the packed form when the vector index
+    is enabled, since the index can only read lists.
+    """
+    fmt = settings.EMBEDDING_STORAGE
+    if fmt == "list":
+        return {
+            "embedding": embedding,
+            "embedding_bin": None,
+            "embedding_format": None,
+            "embedding_scale": None,
+        }
+    blob, scale = encode(embedding, fmt)
+    return {
+        "embedding": embedding if settings.VECTOR_INDEX_ENABLED else None,
+        "embedding_bin": blob,
+        "embedding_format": fmt,
+        "embedding_scale": scale,
+    }
+
+
+class ChunkWriter:
+    """
+    Writes one document's chunks inside a single explicit transaction, so a
+    failed upload leaves no partial chunks behind. Chunks can be given in
+    any number of write() calls, which lets ingest stream batches without
+    holding the whole document in memory:
+
+        with ChunkWriter(user_email, pdf_hash, file_name) as writer:
+            if not writer.duplicate:
+                writer.write(chunks, embeddings, pages)
+
+    write() only stages the rows in a temporary spool file; the transaction
+    is opened on a clean exit and replays the spool into Neo4j, so chunking
+    and embedding time is never spent holding the User node's write lock.
+    Rolls back (and writes nothing) on an exception or a duplicate.
+    """
+
+    def __init__(self, user_email: str, pdf_hash: str, file_name: str):
+        self.user_email = user_email
+        self.pdf_hash = pdf_hash
+        self.file_name = file_name
+        self.pdf_id = str(uuid.uuid4())
+        self.count = 0
+        self.duplicate = False
+        self.version = None
+        self._spool = None
+        # sidecar index segments staged per write() (None once staging failed),
+        # published after commit
+        self._ann_segments: list[dict] | None = []
+        self._lexical_segments: list[dict] | None = []
+
+    def __enter__(self) -> "ChunkWriter":
+        # unlocked early check, so a re-upload skips chunking and embedding;
+        # repeated under the lock when committing
+        self.duplicate = pdf_exists(self.pdf_hash, self.user_email)
+        self._spool = tempfile.TemporaryFile(dir=settings.UPLOAD_TMP_DIR)
+        return self
+
+    def write(
+        self,
+        chunks: list[str],
+        embeddings: list[list[float]],
+        pages: list[int],
+    ) -> None:
+        """
+        Stage chunks for the commit on exit.
+        """
+        if not (len(chunks) == len(embeddings) == len(pages)):
+            raise ValueError(
+                f"Length mismatch: chunks={len(chunks)}, embeddings={len(embeddings)}, pages={len(pages)}"
+            )
+        if self.duplicate:
+            raise RuntimeError("Refusing to write chunks of a duplicate PDF")
+
+        rows = [
+            {
+                "id": f"{self.user_email}-{self.pdf_id}-{self.count + idx}",
+                "text": text,
+                "page": int(page),
+                **_embedding_fields(embedding),
+            }
+            for idx, (text, embedding, page) in enumerate(zip(chunks, embeddings, pages))
+        ]
+        pickle.dump(rows, self._spool, protocol=pickle.HIGHEST_PROTOCOL)
+        self.count += len(rows)
+        if rows:
+            self._stage_sidecar_segments([row["id"] for row in rows], chunks, embeddings)
+
+    def _stage_sidecar_segments(
+        self, ids: list[str], chunks: list[str], embeddings: list[list[float]]
+    ) -> None:
+        """
+        Write this batch's ANN / BM25 segments to the staging area. A failure
+        drops that index's segments for the whole document: it then lags
+        behind Neo4j, which chat-service detects and falls back from.
+        """
+        if settings.ANN_INDEX_DIR and self._ann_segments is not None:
+            try:
+                self._ann_segments.append(
+                    ann_index.stage_segment(
+                        settings.ANN_INDEX_DIR, ids, np.asarray(embeddings, dtype=np.float32)
+                    )
+                )
+            except Exception as e:
+                print(" Could not stage ANN index segment:", e)
+                discard_segments(settings.ANN_INDEX_DIR, self._ann_segments)
+                self._ann_segments = None
+        if settings.LEXICAL_INDEX_DIR and self._lexical_segments is not None:
+            try:
+                self._lexical_segments.append(
+                    lexical_index.stage_segment(settings.LEXICAL_INDEX_DIR, ids, chunks)
+                )
+            except Exception as e:
+                print(" Could not stage lexical index segment:", e)
+                discard_segments(settings.LEXICAL_INDEX_DIR, self._lexical_segments)
+                self._lexical_segments = None
+
+    def _staged_rows(self):
+        """
+        The staged rows in NEO4J_WRITE_BATCH_SIZE slices, read back one
+        write() call at a time.
+        """
+        batch_size = max(1, settings.NEO4J_WRITE_BATCH_SIZE)
+        self._spool.seek(0)
+        while True:
+            try:
+                rows = pickle.load(self._spool)
+            except EOFError:
+                return
+            for i in range(0, len(rows), batch_size):
+                yield rows[i : i + batch_size]
+
+    def _commit(self) -> bool:
+        """
+        Write the staged rows in one transaction; False when the PDF turned
+        out to be a duplicate once the user's node was locked.
+        """
+        with _driver.session() as session:
+            with session.begin_transaction() as tx:
+                # MERGE the user once. Bumping its chunk version write-locks the node,
+                # so concurrent uploads by the same user can't both pass the
+                # duplicate check; chat-service sees the new version only on commit.
+                version = tx.run(
+                    """
+                    MERGE (u:User {email: $user_email})
+                    SET u.chunks_version = coalesce(u.chunks_version, 0) + 1
+                    RETURN u.chunks_version AS version
+                    """,
+                    {"user_email": self.user_email}
+                ).single()["version"]
+
+                result = tx.run(
+                    """
+                    MATCH (c:Chunk {user_email: $user_email, pdf_hash: $pdf_hash})
+                    RETURN count(c) AS count
+                    """,
+                    {"user_email": self.user_email, "pdf_hash": self.pdf_hash}
+                )
+                if result.single()["count"] > 0:
+                    tx.rollback()
+                    return False
+
+                for rows in self._staged_rows():
+                    with span("neo4j_write_batch"):
+                        tx.run(
+                            _INSERT_CHUNKS,
+                            {
+                                "rows": rows,
+                                "user_email": self.user_email,
+                                "pdf_id": self.pdf_id,
+                                "pdf_hash": self.pdf_hash,
+                                "file_name": self.file_name,
+                            }
+                        ).consume()
+                with span("neo4j_commit"):
+                    tx.commit()
+        self.version = version
+        return True
+
+    def _update_sidecar_indexes(self) -> None:
+        """
+        Publish the committed document's staged ANN / BM25 segments. The
+        chunks are already stored, so a failure here only leaves an index behind
+        (chat-service notices the version gap and falls back to Neo4j until
+        `python -m app.index_rebuild`).
+        """
+        if settings.ANN_INDEX_DIR and self._ann_segments is not None:
+            try:
+                ann_index.append_staged(
+                    settings.ANN_INDEX_DIR,
+                    self.user_email,
+                    self.version,
+                    self._ann_segments,
+                    max_deltas=settings.ANN_MAX_DELTAS,
+                )
+                self._ann_segments = []
+            except Exception as e:
+                print(" Could not update ANN index:", e)
+        if settings.LEXICAL_INDEX_DIR and self._lexical_segments is not None:
+            try:
+                lexical_index.append_staged(
+                    settings.LEXICAL_INDEX_DIR,
+                    self.user_email,
+                    self.version,
+                    self._lexical_segments,
+                    max_segments=settings.LEXICAL_MAX_SEGMENTS,
+                )
+                self._lexical_segments = []
+            except Exception as e:
+                print(" Could not update lexical index:", e)
+
+    def _discard_sidecar_segments(self) -> None:
+        if settings.ANN_INDEX_DIR and self._ann_segments:
+            discard_segments(settings.ANN_INDEX_DIR, self._ann_segments)
+        if settings.LEXICAL_INDEX_DIR and self._lexical_segments:
+            discard_segments(settings.LEXICAL_INDEX_DIR, self._lexical_segments)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None and not self.duplicate:
+                if not self._commit():
+                    self.duplicate = True
+                    print(" Duplicate PDF detected — skipping chunk upload.")
+                    return
+                with span("sidecar_indexes"):
+                    self._update_sidecar_indexes()
+        finally:
+            self._spool.close()
+            # staged segments that were not published (rollback, duplicate, failure)
+            self._discard_sidecar_segments()
+
+
+def load_user_embeddings(user_email: str) -> tuple[int, list[str], np.ndarray]:
+    """
+    (chunks_version, chunk ids, float32 embedding matrix) of one user, read in
+    one transaction so the version matches the rows. Used to rebuild the ANN index.
+    Chunks with a missing or differently sized embedding are skipped.
+    """
+    with _driver.session() as session:
+        with session.begin_transaction() as tx:
+            record = tx.run(
+                "MATCH (u:User {email: $email}) RETURN u.chunks_version AS version",
+                {"email": user_email}
+            ).single()
+            rows = tx.run(
+                """
+                MATCH (u:User {email: $email})-[:UPLOADED]->(c:Chunk)
+                RETURN
+                  c.id               AS id,
+                  CASE WHEN c.embedding_bin IS NULL THEN c.embedding END AS embedding,
+                  c.embedding_bin    AS embedding_bin,
+                  c.embedding_format AS embedding_format,
+                  c.embedding_scale  AS embedding_scale
+                """,
+                {"email": user_email}
+            ).data()
+
+    version = (record["version"] if record else None) or 0
+    ids: list[str] = []
+    vectors: list[np.ndarray] = []
+    for row in rows:
+        if row["embedding_bin"] is not None:
+            vector = decode_many(
+                [row["embedding_bin"]], row["embedding_format"], [row["embedding_scale"]]
+            )[0]
+        elif row["embedding"]:
+            vector = np.asarray(row["embedding"], dtype=np.float32)
+        else:
+            continue
+        if vectors and vector.shape != vectors[0].shape:
+            continue
+        ids.append(row["id"])
+        vectors.append(vector)
+    return version, ids, (np.stack(vectors) if vectors else np.zeros((0, 0), np.float32))
+
+
+def load_user_texts(user_email: str) -> tuple[int, list[str], list[str]]:
+    """
+    (chunks_version, chunk ids, chunk texts) of one user, read in one
+    transaction. Used to rebuild the lexical index.
     """
-    if not (len(chunks) == len(embeddings) == len(pages)):
-        raise ValueError(
-            f"Length mismatch: chunks={len(chunks)}, embeddings={len(embeddings)}, pages={len(pages)}"
-        )
     with _driver.session() as session:
-        # Check if already exists 
+        with session.begin_transaction() as tx:
+            record = tx.run(
+                "MATCH (u:User {email: $email}) RETURN u.chunks_version AS version",
+                {"email": user_email}
+            ).single()
+            rows = tx.run(
+                """
+                MATCH (u:User {email: $email})-[:UPLOADED]->(c:Chunk)
+                RETURN c.id AS id, c.text AS text
+                """,
+                {"email": user_email}
+            ).data()
+
+    version = (record["version"] if record else None) or 0
+    return version, [r["id"] for r in rows], [r["text"] or "" for r in rows]
+
+
+def list_user_emails() -> list[str]:
+    with _driver.session() as session:
         result = session.run(
+            "MATCH (u:User) WHERE u.chunks_version IS NOT NULL RETURN u.email AS email"
+        )
+        return [r["email"] for r in result]
+
+
+def save_job(job: dict) -> None:
+    """
+    Persist an ingest job's status so any worker process can answer GET /jobs/{id}.
+    Finished jobs older than JOB_TTL_SECONDS are cleaned up on the way.
+    """
+    with _driver.session() as session:
+        session.run(
             """
-            MATCH (c:Chunk {user_email: $user_email, pdf_hash: $pdf_hash})
-            RETURN count(c) AS count
+            MERGE (j:IngestJob {id: $job.job_id})
+            SET j += $job, j.updated_at = timestamp()
+            WITH j
+            OPTIONAL MATCH (old:IngestJob)
+            WHERE old.status IN ['done', 'failed']
+              AND old.updated_at < timestamp() - $ttl_ms
+            DETACH DELETE old
             """,
-            {"user_email": user_email, "pdf_hash": pdf_hash}
-        )
+            {"job": job, "ttl_ms": settings.JOB_TTL_SECONDS * 1000}
+        ).consume()
 
-        if result.single()["count"] > 0:
-            print(" Duplicate PDF detected — skipping chunk upload.")
-            return
 
-        # Insert chunks
-        pdf_id = str(uuid.uuid4())
+def load_job(job_id: str) -> dict | None:
+    with _driver.session() as session:
+        result = session.run(
+            "MATCH (j:IngestJob {id: $job_id}) RETURN properties(j) AS job",
+            {"job_id": job_id}
+        )
+        record = result.single()
+        return dict(record["job"]) if record else None
 
-        for idx, (text, embedding, page) in enumerate(zip(chunks, embeddings, pages)):
-            chunk_id = f"{user_email}-{pdf_id}-{idx}"
-            page = int(pages[idx])
-            session.run(
-                """
-                MERGE (u:User {email: $user_email})
-                CREATE (c:Chunk {
-                    id: $chunk_id,
-                    text: $text,
-                    embedding: $embedding,
-                    user_email: $user_email,
-                    pdf_id: $pdf_id,
-                    pdf_hash: $pdf_hash,
-                    file_name: $file_name,
-                    page: $page
-                })
-                MERGE (u)-[:UPLOADED]->(c)
-                """,
-                {
-                    "user_email": user_email,
-                    "chunk_id": chunk_id,
-                    "text": text,
-                    "embedding": embedding,
-                    "pdf_id": pdf_id,
-                    "pdf_hash": pdf_hash,
-                    "file_name": file_name,
-                    "page": int(page),
-                }
-            )
 
 def ensure_indexes():
     with _driver.session() as session:
         session.run("""
         CREATE FULLTEXT INDEX chunkText IF NOT EXISTS FOR (c:Chunk) ON EACH [c.text]
         """)
+        session.run("""
+        CREATE CONSTRAINT ingestJobId IF NOT EXISTS FOR (j:IngestJob) REQUIRE j.id IS UNIQUE
+        """)
+        # backs chat-service's text hydration lookups (WHERE c.id IN $ids)
+        try:
+            session.run("""
+            CREATE CONSTRAINT chunkId IF NOT EXISTS FOR (c:Chunk) REQUIRE c.id IS UNIQUE
+            """).consume()
+        except Neo4jError as e:
+            print(" Could not create constraint chunkId:", e)
+
+        if settings.VECTOR_INDEX_ENABLED:
+            try:
+                session.run(f"""
+                CREATE VECTOR INDEX chunkEmbedding IF NOT EXISTS
+                FOR (c:Chunk) ON (c.embedding)
+                OPTIONS {{indexConfig: {{
+                    `vector.dimensions`: {int(settings.EMBEDDING_DIMENSIONS)},
+                    `vector.similarity_function`: 'cosine'
+                }}}}
+                """).consume()
+            except Neo4jError as e:
+                # Older servers have no vector indexes; chat-service falls back to scanning
+                print(" Could not create vector index chunkEmbedding:", e)
 
@@ -0,0 +1,168 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable
+
+# Shared plumbing of the per-user sidecar indexes (app/ann_index.py,
+# app/lexical_index.py). Each index lives in <root>/<sha256(email)[:32]>/:
+#   manifest.json   {"version", "stale", "segments": [{"name", ...}], ...}
+#   <segment>/      immutable once written; replaced, never modified
+# "version" is the User.chunks_version the index reflects; readers compare it
+# with Neo4j and ignore the index when it differs or "stale" is set.
+# Segments of a document that has not committed yet are written to
+# <root>/.staging/ and moved into the user's directory once it has.
+
+MANIFEST = "manifest.json"
+STAGING = ".staging"
+# staged segments older than this were left behind by a crashed ingest
+STAGING_MAX_AGE_SECONDS = 24 * 3600
+
+
+def user_dir(root: str, user_email: str) -> str:
+    return os.path.join(root, hashlib.sha256(user_email.encode("utf-8")).hexdigest()[:32])
+
+
+def read_manifest(directory: str) -> dict | None:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(directory: str, manifest: dict) -> None:
+    tmp = os.path.join(directory, f"{MANIFEST}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+
+def new_segment_path(directory: str, prefix: str) -> str:
+    return os.path.join(directory, f"{prefix}-{uuid.uuid4().hex[:12]}")
+
+
+def new_staged_path(root: str, prefix: str) -> str:
+    """
+    Where to write a segment before its document commits: outside every user
+    directory, so commit_manifest can't delete it meanwhile.
+    """
+    staging = os.path.join(root, STAGING)
+    os.makedirs(staging, exist_ok=True)
+    cutoff = time.time() - STAGING_MAX_AGE_SECONDS
+    for name in os.listdir(staging):
+        path = os.path.join(staging, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except FileNotFoundError:
+            pass
+    return new_segment_path(staging, prefix)
+
+
+def adopt_segments(root: str, directory: str, segments: list[dict]) -> list[dict]:
+    """
+    Move staged segments into a user's index directory (call under its lock).
+    """
+    for segment in segments:
+        os.replace(
+            os.path.join(root, STAGING, segment["name"]),
+            os.path.join(directory, segment["name"]),
+        )
+    return segments
+
+
+def discard_segments(root: str, segments: list[dict]) -> None:
+    for segment in segments:
+        shutil.rmtree(os.path.join(root, STAGING, segment["name"]), ignore_errors=True)
+
+
+@contextmanager
+def locked(directory: str):
+    """
+    Serialize writers of one user's index (across processes).
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def next_manifest(directory: str, version: int, empty: dict) -> dict:
+    """
+    Manifest to extend with the document that produced `version`. A first-ever
+    document starts a complete index; a gap in versions (missing index, failed
+    or out-of-order append) marks it stale until rebuilt.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        manifest = {**empty, "version": 0, "stale": version != 1, "segments": []}
+    elif manifest["version"] != version - 1:
+        manifest["stale"] = True
+    manifest["version"] = max(manifest["version"], version)
+    return manifest
+
+
+def commit_manifest(directory: str, manifest: dict) -> None:
+    """
+    Publish the manifest, then delete segments it no longer references
+    (open memory maps in readers keep unlinked files alive, so this is safe).
+    """
+    write_manifest(directory, manifest)
+    keep = {s["name"] for s in manifest["segments"]}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class LoadedIndexes:
+    """
+    Per-process LRU of opened indexes, reused until manifest.json changes.
+    A commit replaces the manifest with a new file, so (inode, mtime, size)
+    tells commits apart even within the filesystem's mtime granularity.
+    """
+
+    def __init__(self, opener: Callable[[str, dict], object], max_users: int = 256):
+        self._opener = opener
+        self._max_users = max_users
+        # directory -> ((st_ino, st_mtime_ns, st_size) of its manifest, index)
+        self._entries: OrderedDict[str, tuple[tuple, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, root: str, user_email: str):
+        """
+        The user's opened index, or None when the user has none.
+        """
+        directory = user_dir(root, user_email)
+        try:
+            st = os.stat(os.path.join(directory, MANIFEST))
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(directory)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(directory)
+                return entry[1]
+
+        manifest = read_manifest(directory)
+        if manifest is None:
+            return None
+        index = self._opener(directory, manifest)
+        with self._lock:
+            self._entries[directory] = (key, index)
+            self._entries.move_to_end(directory)
+            while len(self._entries) > self._max_users:
+                self._entries.popitem(last=False)
+        return index
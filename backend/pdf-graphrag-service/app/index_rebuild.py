@@ -0,0 +1,74 @@
+"""
+Rebuild or compact the per-user sidecar index files (see app/ann_index.py
+and app/lexical_index.py).
+
+    python -m app.index_rebuild rebuild --user alice@example.com
+    python -m app.index_rebuild rebuild --all
+    python -m app.index_rebuild compact --all --index lexical
+
+rebuild re-reads the user's chunks from Neo4j and writes a fresh segment
+tagged with the current chunks_version (fixes stale indexes); compact only
+merges existing segments and does not touch Neo4j. --index picks ann,
+lexical or all (default: every index whose directory is configured).
+"""
+
+import argparse
+import os
+import time
+
+from app import ann_index, lexical_index
+from app.config import settings
+from app.graph_store import list_user_emails, load_user_embeddings, load_user_texts
+from app.index_files import user_dir
+
+
+def _rebuild_ann(email: str) -> str:
+    version, ids, vectors = load_user_embeddings(email)
+    ann_index.rebuild(settings.ANN_INDEX_DIR, email, version, ids, vectors)
+    return f"{len(ids)} chunks, version {version}"
+
+
+def _rebuild_lexical(email: str) -> str:
+    version, ids, texts = load_user_texts(email)
+    lexical_index.rebuild(settings.LEXICAL_INDEX_DIR, email, version, ids, texts)
+    return f"{len(ids)} chunks, version {version}"
+
+
+# name -> (root directory, rebuild, compact)
+INDEXES = {
+    "ann": (lambda: settings.ANN_INDEX_DIR, _rebuild_ann, ann_index.compact),
+    "lexical": (lambda: settings.LEXICAL_INDEX_DIR, _rebuild_lexical, lexical_index.compact),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["rebuild", "compact"])
+    parser.add_argument("--index", choices=[*INDEXES, "all"], default="all")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--user", action="append", help="user email (repeatable)")
+    target.add_argument("--all", action="store_true", help="every user with chunks")
+    args = parser.parse_args()
+
+    names = list(INDEXES) if args.index == "all" else [args.index]
+    names = [name for name in names if INDEXES[name][0]()]
+    if not names:
+        parser.error(f"no index directory configured for --index {args.index}")
+
+    users = list_user_emails() if args.all else args.user
+    for email in users:
+        for name in names:
+            root, rebuild, compact = INDEXES[name]
+            start = time.perf_counter()
+            if args.command == "rebuild":
+                detail = rebuild(email)
+            else:
+                if not os.path.isdir(user_dir(root(), email)):
+                    continue
+                compact(root(), email)
+                detail = "compacted"
+            print(f" {email} [{name}]: {detail} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
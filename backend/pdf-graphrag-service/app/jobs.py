@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+
+from app.config import settings
+from app.embedding import compute_embeddings
+from app.graph_store import ChunkWriter, load_job, save_job
+from app.metrics import count, observe, span
+from app.pdf_ingest import iter_page_chunks
+
+
+class IngestJob:
+    """
+    State of one background PDF ingest, as reported by GET /jobs/{job_id}.
+    status: queued -> running -> done | failed
+    stage:  what the pipeline is doing right now (chunking / embedding / storing)
+    """
+
+    def __init__(self, user_email: str, file_name: str, pdf_hash: str):
+        self.id = str(uuid.uuid4())
+        self.user_email = user_email
+        self.file_name = file_name
+        self.pdf_hash = pdf_hash
+        self.status = "queued"
+        self.stage = "queued"
+        self.percent = 0
+        self.chunks = 0
+        self.error: str | None = None
+        self._saved_percent = -100
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "percent": self.percent,
+            "user_id": self.user_email,
+            "file_name": self.file_name,
+            "pdf_hash": self.pdf_hash,
+            "chunks": self.chunks,
+            "error": self.error,
+        }
+
+    def save(self, force: bool = False) -> None:
+        """
+        Mirror the status to Neo4j so every worker process can report it.
+        Progress within a stage is only written every 5%.
+        """
+        if not force and self.percent - self._saved_percent < 5:
+            return
+        self._saved_percent = self.percent
+        try:
+            save_job(self.to_dict())
+        except Exception as e:
+            print(f" Could not save status of ingest job {self.id}:", e)
+
+    def update(self, stage: str, percent: int | None = None) -> None:
+        # a new stage is always written, so other workers never report an old one
+        changed = stage != self.stage
+        self.stage = stage
+        if percent is not None:
+            self.percent = percent
+        self.save(force=changed)
+
+
+class JobManager:
+    """
+    Runs ingest jobs on a bounded worker pool.
+
+    At most INGEST_CONCURRENCY jobs run at once per process; submit() refuses
+    new work once INGEST_MAX_PENDING jobs are queued or running, so heavy
+    uploads can't pile up. Status lives in memory for local jobs and in
+    Neo4j for everyone else (finished jobs expire after JOB_TTL_SECONDS).
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingest"
+        )
+        self._max_pending = max_pending
+        self._active: dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self, pdf_path: str, user_email: str, pdf_hash: str, file_name: str
+    ) -> IngestJob | None:
+        """
+        Queue an ingest of the spooled file at pdf_path; the job deletes the
+        file when it finishes. Returns None when this worker is at its pending limit.
+        """
+        with self._lock:
+            if len(self._active) >= self._max_pending:
+                return None
+            job = IngestJob(user_email, file_name, pdf_hash)
+            self._active[job.id] = job
+        job.save(force=True)
+        self._executor.submit(self._run, job, pdf_path)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        job = self._active.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return load_job(job_id)
+
+    def _run(self, job: IngestJob, pdf_path: str) -> None:
+        """
+        Streaming pipeline: pages are chunked in order and every
+        INGEST_BATCH_CHUNKS chunks are embedded and staged on disk, so memory
+        stays flat regardless of PDF size. The staged rows are written in one
+        short transaction once the whole document is embedded.
+        """
+        job.status = "running"
+        start = time.perf_counter()
+        try:
+            doc = fitz.open(pdf_path)
+            try:
+                total_pages = max(len(doc), 1)
+                with ChunkWriter(job.user_email, job.pdf_hash, job.file_name) as writer:
+                    if writer.duplicate:
+                        print(" Duplicate PDF detected — skipping chunk upload.")
+                    else:
+                        batch_chunks: list[str] = []
+                        batch_pages: list[int] = []
+
+                        def flush() -> None:
+                            job.update("embedding")
+                            with span("embed_batch"):
+                                embeddings = compute_embeddings(batch_chunks)
+                            writer.write(batch_chunks, embeddings, batch_pages)
+                            job.chunks += len(batch_chunks)
+                            batch_chunks.clear()
+                            batch_pages.clear()
+
+                        job.update("chunking")
+                        for page_number, page_chunks in iter_page_chunks(doc):
+                            batch_chunks.extend(page_chunks)
+                            batch_pages.extend([page_number] * len(page_chunks))
+                            if len(batch_chunks) >= settings.INGEST_BATCH_CHUNKS:
+                                flush()
+                            job.update("chunking", int(99 * page_number / total_pages))
+                        if batch_chunks:
+                            flush()
+                        # the writer commits when the block exits
+                        job.update("storing")
+            finally:
+                doc.close()
+
+            job.status = "done"
+            job.stage = "done"
+            job.percent = 100
+            count("ingest_done")
+            observe("ingest_total", time.perf_counter() - start)
+        except Exception as e:
+            count("ingest_failed")
+            print(f" Ingest job {job.id} failed:", e)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.save(force=True)
+            with self._lock:
+                self._active.pop(job.id, None)
+            try:
+                os.remove(pdf_path)
+            except OSError:
+                pass
+
+
+job_manager = JobManager(
+    max_workers=settings.INGEST_CONCURRENCY,
+    max_pending=settings.INGEST_MAX_PENDING,
+)
@@ -0,0 +1,275 @@
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from app.index_files import (
+    LoadedIndexes,
+    adopt_segments,
+    commit_manifest,
+    locked,
+    new_segment_path,
+    new_staged_path,
+    next_manifest,
+    read_manifest,
+    user_dir,
+)
+
+# Per-user BM25 inverted index, pure NumPy. Same file in pdf-graphrag-service
+# (stages a segment per ingest batch, publishes them when the document
+# commits) and chat-service (queries it), so both tokenize identically.
+#
+# Layout under LEXICAL_INDEX_DIR/<sha256(email)[:32]>/ (see app/index_files.py):
+#   <segment>/
+#     vocab.json     sorted terms of the segment
+#     offsets.npy    postings of term i are offsets[i]:offsets[i+1]
+#     docs.npy       int32 segment-local doc number per posting
+#     tfs.npy        uint16 term frequency per posting
+#     doc_len.npy    int32 tokens per doc
+#     ids.json       chunk id per doc
+# Document count, average length and document frequencies are summed over
+# segments at query time, so IDF always reflects the user's whole corpus.
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    NFKC, lower-case, runs of word characters. Shared by indexing and querying.
+    """
+    return _TOKEN.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+def _write_segment(
+    path: str,
+    vocab: list[str],
+    offsets: np.ndarray,
+    docs: np.ndarray,
+    tfs: np.ndarray,
+    doc_len: np.ndarray,
+    ids: list[str],
+) -> dict:
+    tmp = f"{path}.tmp"
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "offsets.npy"), offsets.astype(np.int64))
+    np.save(os.path.join(tmp, "docs.npy"), docs.astype(np.int32))
+    np.save(os.path.join(tmp, "tfs.npy"), tfs.astype(np.uint16))
+    np.save(os.path.join(tmp, "doc_len.npy"), doc_len.astype(np.int32))
+    with open(os.path.join(tmp, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(tmp, "ids.json"), "w") as f:
+        json.dump(ids, f)
+    os.replace(tmp, path)
+    return {"name": os.path.basename(path), "docs": len(ids), "tokens": int(doc_len.sum())}
+
+
+def _save_segment(path: str, ids: list[str], texts: list[str]) -> dict:
+    postings: dict[str, list[tuple[int, int]]] = {}
+    doc_len = np.zeros(len(ids), dtype=np.int32)
+    for doc, text in enumerate(texts):
+        tokens = tokenize(text)
+        doc_len[doc] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append((doc, min(tf, 65535)))
+
+    vocab = sorted(postings)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[t]) for t in vocab])
+    flat = np.array([p for t in vocab for p in postings[t]], dtype=np.int64).reshape(-1, 2)
+    return _write_segment(path, vocab, offsets, flat[:, 0], flat[:, 1], doc_len, ids)
+
+
+class _Segment:
+    def __init__(self, path: str, mmap: bool):
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "vocab.json")) as f:
+            self.term_index = {t: i for i, t in enumerate(json.load(f))}
+        with open(os.path.join(path, "ids.json")) as f:
+            self.ids = json.load(f)
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode=mode)
+        self.docs = np.load(os.path.join(path, "docs.npy"), mmap_mode=mode)
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode=mode)
+        self.doc_len = np.load(os.path.join(path, "doc_len.npy"))
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        i = self.term_index.get(term)
+        if i is None:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.docs[start:end], self.tfs[start:end]
+
+
+def _merge(directory: str, manifest: dict) -> dict:
+    """
+    One segment holding every posting of the current segments.
+    """
+    segments = [
+        _Segment(os.path.join(directory, s["name"]), mmap=False)
+        for s in manifest["segments"]
+    ]
+    vocab = sorted(set().union(*(seg.term_index for seg in segments)))
+    global_id = {t: i for i, t in enumerate(vocab)}
+
+    terms, docs, tfs = [], [], []
+    doc_offset = 0
+    for seg in segments:
+        local_terms = sorted(seg.term_index, key=seg.term_index.get)
+        mapping = np.array([global_id[t] for t in local_terms], dtype=np.int64)
+        terms.append(np.repeat(mapping, np.diff(seg.offsets)))
+        docs.append(seg.docs.astype(np.int64) + doc_offset)
+        tfs.append(seg.tfs)
+        doc_offset += len(seg.ids)
+
+    terms = np.concatenate(terms) if terms else np.zeros(0, np.int64)
+    # stable: within a term, postings stay in segment then doc order
+    order = np.argsort(terms, kind="stable")
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(vocab)))
+    segment = _write_segment(
+        new_segment_path(directory, "base"),
+        vocab,
+        offsets,
+        np.concatenate(docs)[order],
+        np.concatenate(tfs)[order],
+        np.concatenate([seg.doc_len for seg in segments]),
+        [cid for seg in segments for cid in seg.ids],
+    )
+    return {**manifest, "segments": [segment]}
+
+
+def stage_segment(root: str, ids: list[str], texts: list[str]) -> dict:
+    """
+    Write part of a not yet committed document as a staged segment, to be
+    published with append_staged (or dropped with discard_segments).
+    """
+    return _save_segment(new_staged_path(root, "delta"), ids, texts)
+
+
+def append_document(
+    root: str,
+    user_email: str,
+    version: int,
+    ids: list[str],
+    texts: list[str],
+    max_segments: int = 8,
+) -> None:
+    """
+    Add one committed document (version = the User.chunks_version it produced).
+    """
+    segments = [stage_segment(root, ids, texts)] if ids else []
+    append_staged(root, user_email, version, segments, max_segments)
+
+
+def append_staged(
+    root: str,
+    user_email: str,
+    version: int,
+    segments: list[dict],
+    max_segments: int = 8,
+) -> None:
+    """
+    Publish the staged segments of one committed document; merges everything
+    into one segment past max_segments.
+    """
+    directory = user_dir(root, user_email)
+    with locked(directory):
+        manifest = next_manifest(directory, version, {})
+        manifest["segments"].extend(adopt_segments(root, directory, segments))
+        if len(manifest["segments"]) > max_segments:
+            manifest = _merge(directory, manifest)
+        commit_manifest(directory, manifest)
+
+
+def rebuild(root: str, user_email: str, version: int, ids: list[str], texts: list[str]) -> None:
+    """
+    Replace the user's index with one segment over all their chunks.
+    """
+    directory = user_dir(root, user_email)
+    with locked(directory):
+        segments = []
+        if ids:
+            path = new_segment_path(directory, "base")
+            segments.append(_save_segment(path, ids, texts))
+        commit_manifest(directory, {"version": version, "stale": False, "segments": segments})
+
+
+def compact(root: str, user_email: str) -> None:
+    """
+    Merge all segments of a user's index into one (keeps version/stale).
+    """
+    directory = user_dir(root, user_email)
+    with locked(directory):
+        manifest = read_manifest(directory)
+        if manifest is None or len(manifest["segments"]) < 2:
+            return
+        commit_manifest(directory, _merge(directory, manifest))
+
+
+class LexicalIndex:
+    """
+    Read-only view of one user's inverted index; postings are memory-mapped.
+    """
+
+    def __init__(self, directory: str, manifest: dict):
+        self.version = manifest["version"]
+        self.stale = manifest.get("stale", False)
+        self.segments = [
+            _Segment(os.path.join(directory, s["name"]), mmap=True)
+            for s in manifest["segments"]
+        ]
+        self.doc_count = sum(s["docs"] for s in manifest["segments"])
+        tokens = sum(s["tokens"] for s in manifest["segments"])
+        self.avg_len = tokens / self.doc_count if self.doc_count else 0.0
+
+    def __len__(self) -> int:
+        return self.doc_count
+
+    def search(self, query: str, limit: int = 100) -> list[dict]:
+        """
+        BM25 top hits as [{"id": ..., "score": ...}], best first (the shape of
+        the fulltext query it replaces).
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.doc_count:
+            return []
+
+        found = [(t, [seg.postings(t) for seg in self.segments]) for t in terms]
+        hits: list[tuple[float, str]] = []
+        scores = [np.zeros(len(seg.ids), dtype=np.float32) for seg in self.segments]
+        for term, per_segment in found:
+            df = sum(len(p[0]) for p in per_segment if p is not None)
+            if not df:
+                continue
+            idf = math.log(1.0 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for seg, acc, p in zip(self.segments, scores, per_segment):
+                if p is None:
+                    continue
+                docs, tfs = p
+                tf = tfs.astype(np.float32)
+                norm = K1 * (1.0 - B + B * seg.doc_len[docs] / self.avg_len)
+                acc[docs] += idf * tf * (K1 + 1.0) / (tf + norm)
+
+        for seg, acc in zip(self.segments, scores):
+            nonzero = np.flatnonzero(acc)
+            if nonzero.size > limit:
+                nonzero = nonzero[np.argpartition(-acc[nonzero], limit - 1)[:limit]]
+            hits.extend((float(acc[i]), seg.ids[i]) for i in nonzero)
+        hits.sort(key=lambda h: h[0], reverse=True)
+        return [{"id": cid, "score": score} for score, cid in hits[:limit]]
+
+
+_loaded = LoadedIndexes(LexicalIndex)
+
+
+def load_index(root: str, user_email: str) -> LexicalIndex | None:
+    """
+    The user's index, reusing the opened copy until manifest.json changes.
+    None when the user has no index.
+    """
+    return _loaded.get(root, user_email)
@@ -0,0 +1,181 @@
+import re
+import statistics
+from functools import lru_cache
+from typing import Iterator
+
+import fitz
+
+# Sentence boundary: end punctuation followed by whitespace and an uppercase/digit/quote start
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-Z0-9])")
+_WHITESPACE = re.compile(r"[ \t]+")
+# pages sampled to estimate the body font size for heading detection
+BODY_SIZE_SAMPLE_PAGES = 50
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """
+    cl100k_base matches ada-002 and gpt-3.5-turbo. Returns None when tiktoken
+    or its encoding file is unavailable, in which case we estimate.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(" tiktoken cl100k_base unavailable, estimating tokens as chars/4:", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _split_by_tokens(text: str, max_tokens: int) -> list[str]:
+    """
+    Hard split for a single sentence that is longer than max_tokens.
+    """
+    enc = _encoding()
+    if enc is None:
+        step = max_tokens * 4
+        return [text[i : i + step] for i in range(0, len(text), step)]
+    ids = enc.encode(text, disallowed_special=())
+    return [enc.decode(ids[i : i + max_tokens]) for i in range(0, len(ids), max_tokens)]
+
+
+def _page_blocks(page: fitz.Page) -> list[tuple[str, float, bool]]:
+    """
+    Text blocks of a page in reading order as (text, max_font_size, is_bold).
+    """
+    blocks = []
+    for block in page.get_text("dict", sort=True)["blocks"]:
+        if block.get("type") != 0:
+            continue
+        lines, sizes, bold = [], [], True
+        for line in block["lines"]:
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if not spans:
+                continue
+            lines.append(_WHITESPACE.sub(" ", "".join(s["text"] for s in spans)).strip())
+            sizes.extend(s["size"] for s in spans)
+            bold = bold and all(s["flags"] & 16 for s in spans)
+        if lines:
+            blocks.append((" ".join(lines), max(sizes), bold))
+    return blocks
+
+
+def _is_heading(text: str, size: float, bold: bool, body_size: float) -> bool:
+    if len(text.split()) > 15 or text.endswith((".", ",", ";", ":")):
+        return False
+    return size >= body_size * 1.15 or (bold and size >= body_size)
+
+
+def _segments(text: str, max_tokens: int) -> list[tuple[str, int]]:
+    """
+    Break a paragraph into (sentence, tokens) pieces, none above max_tokens.
+    """
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append((sentence, tokens))
+        else:
+            pieces.extend((part, count_tokens(part)) for part in _split_by_tokens(sentence, max_tokens))
+    return pieces
+
+
+class _PageChunker:
+    """
+    Packs sentences into chunks of at most max_tokens (heading included),
+    carrying the last overlap_tokens worth of sentences into the next chunk.
+    """
+
+    def __init__(self, max_tokens: int, overlap_tokens: int):
+        self.max_tokens = max_tokens
+        # overlap is context, not content: cap it at a quarter of the chunk
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 4)
+        self.heading = ""
+        self.heading_tokens = 0
+        self.current: list[tuple[str, int]] = []
+        self.chunks: list[str] = []
+
+    def _size(self) -> int:
+        return self.heading_tokens + sum(t for _, t in self.current)
+
+    def flush(self, keep_overlap: bool) -> None:
+        if not self.current:
+            return
+        body = " ".join(s for s, _ in self.current)
+        self.chunks.append(f"{self.heading}\n\n{body}" if self.heading else body)
+
+        carry: list[tuple[str, int]] = []
+        if keep_overlap:
+            total = 0
+            for sentence, tokens in reversed(self.current):
+                if total + tokens > self.overlap_tokens:
+                    break
+                carry.insert(0, (sentence, tokens))
+                total += tokens
+        self.current = carry
+
+    def set_heading(self, heading: str) -> None:
+        self.flush(keep_overlap=False)
+        self.heading = heading
+        self.heading_tokens = count_tokens(heading)
+        # never let a long heading eat the whole budget
+        if self.heading_tokens > self.max_tokens // 4:
+            self.heading, self.heading_tokens = "", 0
+
+    def add_paragraph(self, text: str) -> None:
+        budget = self.max_tokens - self.heading_tokens
+        for sentence, tokens in _segments(text, budget):
+            if self.current and self._size() + tokens > self.max_tokens:
+                self.flush(keep_overlap=True)
+                # the carried overlap itself may not leave room for this sentence
+                while self.current and self._size() + tokens > self.max_tokens:
+                    self.current.pop(0)
+            self.current.append((sentence, tokens))
+
+
+def iter_document_chunks(
+    doc: fitz.Document, max_tokens: int = 800, overlap_tokens: int = 80
+) -> Iterator[tuple[int, list[str]]]:
+    """
+    Deterministic, LLM-free chunking using PyMuPDF block layout.
+
+    Blocks are treated as paragraphs, split into sentences and packed into
+    chunks of at most max_tokens tokens, with ~overlap_tokens of trailing
+    sentences repeated at the start of the next chunk. Headings (larger or
+    bold short blocks) start a new chunk and are prefixed to every chunk
+    under them, including on following pages. Chunks never span pages.
+
+    Pages are processed one at a time and yielded as (page_number, chunks);
+    the body font size used for heading detection is sampled from the first
+    BODY_SIZE_SAMPLE_PAGES pages so memory does not grow with the document.
+    """
+    sizes = [
+        size
+        for i in range(min(len(doc), BODY_SIZE_SAMPLE_PAGES))
+        for _, size, _ in _page_blocks(doc[i])
+    ]
+    body_size = statistics.median(sizes) if sizes else 0.0
+
+    chunker = _PageChunker(max_tokens, overlap_tokens)
+    for page_index in range(len(doc)):
+        for text, size, bold in _page_blocks(doc[page_index]):
+            if _is_heading(text, size, bold, body_size):
+                chunker.set_heading(text)
+            else:
+                chunker.add_paragraph(text)
+        chunker.flush(keep_overlap=False)
+
+        page_chunks = [ch.strip() for ch in chunker.chunks if ch.strip()]
+        chunker.chunks = []
+        if page_chunks:
+            yield page_index + 1, page_chunks
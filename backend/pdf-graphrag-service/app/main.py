@@ -1,24 +1,41 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header
-from fastapi.responses import JSONResponse
-import requests
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import hashlib
+import os
+import tempfile
 from app.graph_store import ensure_indexes
 
-from app.pdf_ingest import extract_and_chunk
-from app.graph_store import write_chunks
+from app import metrics
+from app.auth import close_http_client, get_current_user, start_http_client, token_cache
 from app.config import settings
-from app.embedding import compute_embeddings
-from app.graph_store import write_chunks, pdf_exists
+from app.embedding_cache import embedding_cache
+from app.graph_store import pdf_exists
+from app.jobs import job_manager
 
 
 app = FastAPI(title="PDF GraphRAG Service")
 
+UPLOAD_READ_BYTES = 1024 * 1024
+
 # Ensure index exists on startup
 ensure_indexes()
 
+
+@app.on_event("startup")
+async def startup():
+    # keep-alive pool to user-management for token verification
+    await start_http_client()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_client()
+
+
 # Allow requests from React
 origins = ["http://localhost", "http://localhost:3000"]
 
@@ -33,25 +50,22 @@ app.add_middleware(
 )
 
 
-# Dependency to fetch the current user from user-management service
-async def get_current_user(authorization: str = Header(..., alias="Authorization")):
+async def spool_upload(file: UploadFile) -> tuple[str, str]:
     """
-    Verifies the user's JWT token via the /profile endpoint in the user-management backend.
+    Copy the upload to a temp file block by block while hashing it,
+    so the PDF is never held in memory as a whole. Returns (path, sha256).
     """
+    sha = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=settings.UPLOAD_TMP_DIR)
     try:
-        response = requests.get(
-            f"{settings.USER_MGMT_URL}/profile",
-            headers={"Authorization": authorization},
-            timeout=5,
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Unauthorized: invalid token")
-
-        print("get_current_user called")
-        return response.json()
-
-    except requests.RequestException:
-        raise HTTPException(status_code=500, detail="Could not validate user")
+        with os.fdopen(fd, "wb") as out:
+            while block := await file.read(UPLOAD_READ_BYTES):
+                sha.update(block)
+                out.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, sha.hexdigest()
 
 
 @app.post("/upload-pdf")
@@ -61,16 +75,17 @@ async def upload_pdf(
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    # Read and hash the PDF bytes
-    pdf_bytes = await file.read()
-    pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
-    print("PDF Hash:", pdf_hash)
+    metrics.count("upload")
+    # Spool the PDF to disk and hash it incrementally
+    with metrics.span("spool_upload"):
+        pdf_path, pdf_hash = await spool_upload(file)
 
     user_email = user["email"]
-    print("User info from /profile:", user)
 
     # Check if the PDF already exists for this user
-    if pdf_exists(pdf_hash, user_email):
+    if await run_in_threadpool(pdf_exists, pdf_hash, user_email):
+        os.remove(pdf_path)
+        metrics.count("upload_duplicate")
         return JSONResponse(
             content={
                 "message": "This PDF has already been uploaded by this user.",
@@ -80,28 +95,50 @@ async def upload_pdf(
             }
         )
 
-    try:
-        chunks, pages = extract_and_chunk(pdf_bytes)
-        embeddings = compute_embeddings(chunks)
-        write_chunks(
-            chunks,
-            embeddings,
-            pages=pages,
-            user_email=user_email,
-            pdf_hash=pdf_hash,
-            file_name=file.filename,
+    # Extraction, chunking, embedding and storage run on the ingest worker pool
+    job = job_manager.submit(pdf_path, user_email, pdf_hash, file.filename)
+    if job is None:
+        os.remove(pdf_path)
+        metrics.count("upload_rejected")
+        raise HTTPException(
+            status_code=429, detail="Too many uploads in progress, try again later."
         )
-        return JSONResponse(
-            content={
-                "message": "PDF processed and stored in Neo4j",
-                "chunks": len(chunks),
-                "user_id": user_email,
-                "pdf_hash": pdf_hash,
-                "file_name": file.filename,
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "PDF accepted for processing",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}",
+            "user_id": user_email,
+            "pdf_hash": pdf_hash,
+            "file_name": file.filename,
+        },
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, user: dict = Depends(get_current_user)):
+    """
+    Stage (chunking / embedding / storing) and percent of a background ingest.
+    """
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if job is None or job.get("user_id") != user["email"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+metrics.register_cache(token_cache.name, token_cache.stats)
+if embedding_cache is not None:
+    metrics.register_cache("embedding_store", embedding_cache.stats)
+
+
+# Prometheus text format: stage latency histograms, event counters, cache stats
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
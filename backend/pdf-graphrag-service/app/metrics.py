@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable
+
+from app.config import settings
+
+# In-process Prometheus metrics, rendered as text by GET /metrics. Same file in
+# chat-service and pdf-graphrag-service.
+#
+#   with span("embed"):            # time a block (sync or around an await)
+#       ...
+#   observe("first_token", secs)   # record a duration measured elsewhere
+#   count("ann_fallback")          # bump an event counter
+#
+# Stage durations go to one histogram labelled by stage. With METRICS_ENABLED
+# off every call returns after one attribute check; METRICS_SAMPLE_RATE < 1
+# records that fraction of durations (counters are always exact).
+
+# seconds; covers cache hits (sub-ms) up to slow LLM calls and ingests
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+_INF = float("inf")
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label: str, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label value -> [per-bucket counts..., sum, count]
+        self._series: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: str, seconds: float) -> None:
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(value)
+            if series is None:
+                series = self._series[value] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for value, data in sorted(series.items()):
+            label = f'{self.label}="{_escape(value)}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, data):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {data[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {data[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {data[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: str, n: int = 1) -> None:
+        with self._lock:
+            self._values[value] = self._values.get(value, 0) + n
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for value, n in sorted(values.items()):
+            lines.append(f'{self.name}{{{self.label}="{_escape(value)}"}} {n}')
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_seconds = Histogram(
+    "graphrag_stage_seconds", "Wall-clock duration of request and ingest stages.", "stage"
+)
+events = Counter("graphrag_events_total", "Requests, fallbacks and other events.", "event")
+# name -> stats() of an in-process cache (see /cache-stats)
+_caches: dict[str, Callable[[], dict]] = {}
+
+
+def _sampled() -> bool:
+    rate = settings.METRICS_SAMPLE_RATE
+    return rate >= 1.0 or random.random() < rate
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stage_seconds.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+_NOOP = nullcontext()
+
+
+def span(stage: str):
+    """
+    Context manager timing the block into graphrag_stage_seconds{stage=...}.
+    """
+    if not settings.METRICS_ENABLED or not _sampled():
+        return _NOOP
+    return _Span(stage)
+
+
+def observe(stage: str, seconds: float) -> None:
+    if settings.METRICS_ENABLED and _sampled():
+        stage_seconds.observe(stage, seconds)
+
+
+def count(event: str, n: int = 1) -> None:
+    if settings.METRICS_ENABLED:
+        events.inc(event, n)
+
+
+def register_cache(name: str, stats: Callable[[], dict]) -> None:
+    """
+    Export the numeric fields of stats() as graphrag_cache_<field>{cache=name}.
+    """
+    _caches[name] = stats
+
+
+def render() -> str:
+    lines = stage_seconds.render() + events.render()
+    fields: dict[str, list[str]] = {}
+    for name, stats in sorted(_caches.items()):
+        for field, value in stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                fields.setdefault(field, []).append(
+                    f'graphrag_cache_{field}{{cache="{_escape(name)}"}} {value}'
+                )
+    for field, samples in fields.items():
+        lines.append(f"# TYPE graphrag_cache_{field} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
@@ -1,77 +1,117 @@
 import fitz
 import json
+from collections import deque
+from typing import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from openai import OpenAI
 from app.config import settings
+from app.local_chunker import iter_document_chunks
+from app.metrics import count, span
 import hashlib
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
 
 
-def extract_and_chunk(
-    pdf_bytes: bytes, max_tokens: int = 800
-) -> tuple[list[str], list[int]]:
+def split_paragraphs(page_text: str, max_tokens: int) -> list[str]:
     """
-    Extracts text per page and chunks each page separately so we keep page numbers.
-    Returns:
-      - chunks: list[str]  (each chunk's text)
-      - pages:  list[int]  (same length; page number for each chunk, 1-based)
+    Fallback chunking: split on blank lines, then slice long paragraphs
+    at ~4 characters per token.
     """
+    paragraphs = [p.strip() for p in page_text.split("\n\n") if p.strip()]
+    page_chunks = []
+    for para in paragraphs:
 
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-
-    all_chunks: list[str] = []
-    all_pages: list[int] = []
-
-    # Loop page by page, chunk each page so we keep page numbers
-    for page_index in range(len(doc)):
-        page = doc[page_index]
-        page_text = (page.get_text() or "").strip()
-        if not page_text:
-            continue
-
-        # Ask LLM to chunk THIS PAGE ONLY
-        prompt = (
-            "You are a PDF knowledge assistant. "
-            "Given the following SINGLE PAGE of text, split it into logical, self-contained chunks, "
-            f"each no longer than {max_tokens} tokens. "
-            "Return ONLY a JSON array of strings (no extra prose).\n\n"
-            f"PAGE_NUMBER: {page_index + 1}\n"
-            f"PAGE_TEXT:\n{page_text[:3000]}\n"
-        )
-
-        try:
+        for i in range(0, len(para), max_tokens * 4):
+            page_chunks.append(para[i : i + max_tokens * 4])
+    return page_chunks
+
+
+def chunk_page(page_number: int, page_text: str, max_tokens: int) -> list[str]:
+    """
+    Ask the LLM to chunk a single page; fall back to paragraph splitting
+    if the call fails or the answer is not a JSON array of strings.
+    """
+    prompt = (
+        "You are a PDF knowledge assistant. "
+        "Given the following SINGLE PAGE of text, split it into logical, self-contained chunks, "
+        f"each no longer than {max_tokens} tokens. "
+        "Return ONLY a JSON array of strings (no extra prose).\n\n"
+        f"PAGE_NUMBER: {page_number}\n"
+        f"PAGE_TEXT:\n{page_text[:3000]}\n"
+    )
+
+    try:
+        with span("chunk_page_llm"):
             chat_response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "system", "content": prompt}],
                 temperature=0.0,
             )
-            content = (chat_response.choices[0].message.content or "").strip()
+        content = (chat_response.choices[0].message.content or "").strip()
+
+        # Try to parse JSON array of strings
+        page_chunks = json.loads(content)
+        if not isinstance(page_chunks, list) or not all(
+            isinstance(c, str) for c in page_chunks
+        ):
+            raise ValueError("Invalid chunk format from LLM")
 
-            # Try to parse JSON array of strings
-            page_chunks = json.loads(content)
-            if not isinstance(page_chunks, list) or not all(
-                isinstance(c, str) for c in page_chunks
-            ):
-                raise ValueError("Invalid chunk format from LLM")
+    except Exception:
+        count("chunk_page_fallback")
+        page_chunks = split_paragraphs(page_text, max_tokens)
 
-        except Exception:
+    return page_chunks
 
-            paragraphs = [p.strip() for p in page_text.split("\n\n") if p.strip()]
-            page_chunks = []
-            for para in paragraphs:
 
-                for i in range(0, len(para), max_tokens * 4):
-                    page_chunks.append(para[i : i + max_tokens * 4])
+def _iter_llm_chunks(
+    doc: fitz.Document, max_tokens: int
+) -> Iterator[tuple[int, list[str]]]:
+    """
+    Chunk pages with the LLM, at most CHUNK_CONCURRENCY calls in flight.
+    Page text is extracted lazily and only a small window of pages is held
+    at once; results are yielded in page order.
+    """
+    workers = max(1, settings.CHUNK_CONCURRENCY)
+    window = workers * 2
+    pending: deque[tuple[int, Future]] = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page_index in range(len(doc)):
+            with span("extract_page"):
+                page_text = (doc[page_index].get_text() or "").strip()
+            if not page_text:
+                continue
+            pending.append(
+                (page_index + 1, pool.submit(chunk_page, page_index + 1, page_text, max_tokens))
+            )
+            if len(pending) >= window:
+                page_number, future = pending.popleft()
+                yield page_number, future.result()
 
-        # Collect with page numbers
-        for ch in page_chunks:
-            if ch and ch.strip():
-                all_chunks.append(ch.strip())
-                all_pages.append(page_index + 1)
+        while pending:
+            page_number, future = pending.popleft()
+            yield page_number, future.result()
 
-    doc.close()
 
-    return all_chunks, all_pages
+def iter_page_chunks(
+    doc: fitz.Document, max_tokens: int = 800, mode: str | None = None
+) -> Iterator[tuple[int, list[str]]]:
+    """
+    Yield (page_number, chunks) page by page, in page order, skipping pages
+    without chunks. mode (default: CHUNKING_MODE) selects the chunker:
+      - "llm":   each page is chunked by the LLM, pages run concurrently
+                 (at most CHUNK_CONCURRENCY calls in flight)
+      - "local": deterministic token-aware chunking, no LLM calls
+    """
+    if (mode or settings.CHUNKING_MODE) == "local":
+        pages = iter_document_chunks(doc, max_tokens, settings.CHUNK_OVERLAP_TOKENS)
+    else:
+        pages = _iter_llm_chunks(doc, max_tokens)
+
+    for page_number, page_chunks in pages:
+        page_chunks = [ch.strip() for ch in page_chunks if ch and ch.strip()]
+        if page_chunks:
+            yield page_number, page_chunks
 
 
 def compute_pdf_hash(chunks: list[str]) -> str:
@@ -0,0 +1,101 @@
+"""
+Page-chunking throughput, sequential vs concurrent, against a stubbed LLM.
+
+Generates a synthetic PDF with PyMuPDF, starts the shared fake OpenAI
+(backend/benchmarks/fake_services.py) in-process (each chat completion
+sleeps FAKE_CHAT_LATENCY_MS) and runs the ingest chunking loop
+(pdf_ingest.iter_page_chunks) with CHUNK_CONCURRENCY=1 and with higher limits.
+Run from backend/pdf-graphrag-service:
+
+    python -m benchmarks.bench_chunking
+"""
+
+import os
+import sys
+import threading
+import time
+
+PORT = int(os.getenv("FAKE_OPENAI_PORT", "9100"))
+os.environ.setdefault("FAKE_CHAT_LATENCY_MS", "300")
+# non-streamed completions also wait out the simulated token stream
+os.environ.setdefault("FAKE_TOKEN_INTERVAL_MS", "0")
+# backend/, for the shared benchmarks.fake_services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+import fitz  # noqa: E402
+import uvicorn  # noqa: E402
+
+from app import pdf_ingest  # noqa: E402
+from app.config import settings  # noqa: E402
+from benchmarks.fake_services import app as fake_app  # noqa: E402
+
+PAGE_COUNTS = [20, 100]
+CONCURRENCY = [1, 4, 8, 16]
+
+
+def make_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        text = "\n\n".join(
+            f"Page {p + 1} paragraph {i}. " + "Some body text here. " * 8
+            for i in range(4)
+        )
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def chunk_pdf(pdf: bytes) -> tuple[list[str], list[int]]:
+    """
+    Chunks and their page numbers, collected the way jobs.py consumes them.
+    """
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    chunks, pages = [], []
+    try:
+        for page_number, page_chunks in pdf_ingest.iter_page_chunks(doc):
+            chunks.extend(page_chunks)
+            pages.extend([page_number] * len(page_chunks))
+    finally:
+        doc.close()
+    return chunks, pages
+
+
+def start_fake_server() -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(fake_app, host="127.0.0.1", port=PORT, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    server = start_fake_server()
+    print(f"{'pages':>6} {'workers':>8} {'seconds':>8} {'pages/s':>8} {'chunks':>7}")
+    for pages in PAGE_COUNTS:
+        pdf = make_pdf(pages)
+        baseline = None
+        for workers in CONCURRENCY:
+            settings.CHUNK_CONCURRENCY = workers
+            t0 = time.perf_counter()
+            chunks, page_numbers = chunk_pdf(pdf)
+            elapsed = time.perf_counter() - t0
+
+            assert page_numbers == sorted(page_numbers), "pages out of order"
+            if baseline is None:
+                baseline = chunks
+            assert chunks == baseline, "chunking changed with concurrency"
+            print(
+                f"{pages:>6} {workers:>8} {elapsed:>8.2f} "
+                f"{pages / elapsed:>8.1f} {len(chunks):>7}"
+            )
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Per-chunk vs batched/concurrent embedding against a local fake server.
+
+Starts the shared fake OpenAI (backend/benchmarks/fake_services.py)
+in-process, points the OpenAI client at it and embeds a synthetic document
+both ways, checking the batched output keeps input order. Run from backend/pdf-graphrag-service:
+
+    python -m benchmarks.bench_embeddings
+"""
+
+import os
+import sys
+import threading
+import time
+
+PORT = int(os.getenv("FAKE_OPENAI_PORT", "9100"))
+os.environ.setdefault("FAKE_EMBED_LATENCY_MS", "100")
+os.environ.setdefault("FAKE_RATE_LIMIT_EVERY", "7")
+# backend/, for the shared benchmarks.fake_services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+import uvicorn  # noqa: E402
+
+from app import embedding  # noqa: E402
+from benchmarks.fake_services import app as fake_app, fake_vector, stats  # noqa: E402
+
+CHUNK_COUNTS = [50, 200, 600]
+
+
+def start_fake_server() -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(fake_app, host="127.0.0.1", port=PORT, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def per_chunk(chunks: list[str]) -> list[list[float]]:
+    """The previous implementation: one request per chunk, one at a time."""
+    out = []
+    for chunk in chunks:
+        out.append(embedding._embed_batch([chunk], "text-embedding-ada-002")[0])
+    return out
+
+
+def main():
+    server = start_fake_server()
+    print(f"{'chunks':>7} {'per-chunk s':>12} {'batched s':>10} {'requests':>9} {'429s':>5}")
+    for n in CHUNK_COUNTS:
+        chunks = [f"chunk {i}: " + "lorem ipsum " * 120 for i in range(n)]
+
+        t0 = time.perf_counter()
+        per_chunk(chunks)
+        sequential = time.perf_counter() - t0
+
+        before = dict(stats)
+        t0 = time.perf_counter()
+        vectors = embedding.compute_embeddings(chunks)
+        batched = time.perf_counter() - t0
+
+        assert vectors == [fake_vector(c) for c in chunks], "output order changed"
+        print(
+            f"{n:>7} {sequential:>12.2f} {batched:>10.2f} "
+            f"{stats['requests'] - before['requests']:>9} "
+            f"{stats['rate_limited'] - before['rate_limited']:>5}"
+        )
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
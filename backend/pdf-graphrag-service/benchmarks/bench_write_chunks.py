@@ -0,0 +1,109 @@
+"""
+Chunks/sec for graph_store.ChunkWriter against a local Neo4j.
+
+Compares the previous one-autocommit-statement-per-chunk writer with the
+ingest writer (fed INGEST_BATCH_CHUNKS at a time, like jobs.py) at a few
+NEO4J_WRITE_BATCH_SIZE values. Needs a throwaway Neo4j, e.g.
+
+    docker run --rm -p 7687:7687 -e NEO4J_AUTH=neo4j/benchpass neo4j:5
+
+then, from backend/pdf-graphrag-service:
+
+    NEO4J_URI=bolt://localhost:7687 NEO4J_USER=neo4j NEO4J_PASSWORD=benchpass \\
+        python -m benchmarks.bench_write_chunks
+
+All data is written under a synthetic user and deleted afterwards.
+"""
+
+import time
+import uuid
+
+import numpy as np
+
+from app import graph_store
+from app.config import settings
+
+BENCH_USER = "bench-write-chunks@example.com"
+CHUNK_COUNTS = [200, 1000, 5000]
+BATCH_SIZES = [100, 500, 2000]
+DIM = 1536
+
+
+def legacy_write_chunks(chunks, embeddings, pages, user_email, pdf_hash, file_name):
+    """The previous writer: one autocommit MERGE/CREATE/MERGE per chunk."""
+    pdf_id = str(uuid.uuid4())
+    with graph_store._driver.session() as session:
+        for idx, (text, embedding, page) in enumerate(zip(chunks, embeddings, pages)):
+            session.run(
+                """
+                MERGE (u:User {email: $user_email})
+                CREATE (c:Chunk {
+                    id: $chunk_id, text: $text, embedding: $embedding,
+                    user_email: $user_email, pdf_id: $pdf_id, pdf_hash: $pdf_hash,
+                    file_name: $file_name, page: $page
+                })
+                MERGE (u)-[:UPLOADED]->(c)
+                """,
+                {
+                    "user_email": user_email,
+                    "chunk_id": f"{user_email}-{pdf_id}-{idx}",
+                    "text": text,
+                    "embedding": embedding,
+                    "pdf_id": pdf_id,
+                    "pdf_hash": pdf_hash,
+                    "file_name": file_name,
+                    "page": int(page),
+                },
+            )
+
+
+def chunk_writer(chunks, embeddings, pages, user_email, pdf_hash, file_name):
+    """The ingest path: staged per INGEST_BATCH_CHUNKS, committed on exit."""
+    step = settings.INGEST_BATCH_CHUNKS
+    with graph_store.ChunkWriter(user_email, pdf_hash, file_name) as writer:
+        for i in range(0, len(chunks), step):
+            writer.write(chunks[i : i + step], embeddings[i : i + step], pages[i : i + step])
+
+
+def cleanup():
+    with graph_store._driver.session() as session:
+        session.run(
+            """
+            MATCH (u:User {email: $email})
+            OPTIONAL MATCH (u)-[:UPLOADED]->(c:Chunk)
+            DETACH DELETE c, u
+            """,
+            {"email": BENCH_USER},
+        ).consume()
+
+
+def timed(fn, n, *args):
+    t0 = time.perf_counter()
+    fn(*args, user_email=BENCH_USER, pdf_hash=uuid.uuid4().hex, file_name="bench.pdf")
+    elapsed = time.perf_counter() - t0
+    cleanup()
+    return n / elapsed
+
+
+def main():
+    rng = np.random.default_rng(0)
+    cleanup()
+    header = f"{'chunks':>7} {'legacy/s':>10} " + " ".join(
+        f"{'unwind' + str(b) + '/s':>12}" for b in BATCH_SIZES
+    )
+    print(header)
+    for n in CHUNK_COUNTS:
+        chunks = [f"bench chunk {i} " + "text " * 100 for i in range(n)]
+        embeddings = rng.standard_normal((n, DIM)).astype(np.float32).tolist()
+        pages = [i // 5 + 1 for i in range(n)]
+
+        legacy = timed(legacy_write_chunks, n, chunks, embeddings, pages)
+        bulk = []
+        for batch_size in BATCH_SIZES:
+            settings.NEO4J_WRITE_BATCH_SIZE = batch_size
+            bulk.append(timed(chunk_writer, n, chunks, embeddings, pages))
+        print(f"{n:>7} {legacy:>10.0f} " + " ".join(f"{r:>12.0f}" for r in bulk))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# tests import the service as the "app" package, like uvicorn does from backend/pdf-graphrag-service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config / app.graph_store read these at import; nothing connects until a
+# query runs. The module-level embedding cache stays off; tests build their own.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("USER_MGMT_URL", "http://127.0.0.1:1")
+os.environ.setdefault("NEO4J_URI", "bolt://127.0.0.1:7687")
+os.environ.setdefault("NEO4J_USER", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "unused")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
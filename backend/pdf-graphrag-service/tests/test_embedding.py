@@ -0,0 +1,135 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app import embedding
+from app.embedding import estimate_tokens, make_batches
+
+
+class FakeEmbeddings:
+    """
+    Stands in for client.embeddings: fails with the queued errors first, then
+    returns one vector per input ([len(text), position]) in the given order.
+    """
+
+    def __init__(self, errors=(), shuffle=False, drop=0):
+        self.errors = list(errors)
+        self.shuffle = shuffle
+        self.drop = drop
+        self.calls = []
+
+    def create(self, model, input):
+        self.calls.append(list(input))
+        if self.errors:
+            raise self.errors.pop(0)
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(t)), float(i)])
+            for i, t in enumerate(input)
+        ]
+        if self.shuffle:
+            data.reverse()
+        return SimpleNamespace(data=data[: len(data) - self.drop])
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    def install(**kw):
+        fake = FakeEmbeddings(**kw)
+        monkeypatch.setattr(embedding, "_client", SimpleNamespace(embeddings=fake))
+        return fake
+
+    return install
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(embedding, "time", SimpleNamespace(sleep=slept.append))
+    return slept
+
+
+def rate_limited(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(
+        429, headers=headers, request=httpx.Request("POST", "https://api.test/v1/embeddings")
+    )
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_batches_split_at_the_token_budget():
+    chunks = ["x" * 39] * 5  # 10 tokens each
+    batches = make_batches(chunks, max_tokens=30, max_inputs=100)
+    assert [(start, len(b)) for start, b in batches] == [(0, 3), (3, 2)]
+    assert all(sum(estimate_tokens(c) for c in b) <= 30 for _, b in batches)
+
+
+def test_batches_split_at_the_input_limit():
+    batches = make_batches(["a"] * 7, max_tokens=10_000, max_inputs=3)
+    assert [(start, len(b)) for start, b in batches] == [(0, 3), (3, 3), (6, 1)]
+
+
+def test_oversized_chunk_gets_a_batch_of_its_own():
+    chunks = ["a", "x" * 400, "b"]
+    batches = make_batches(chunks, max_tokens=20, max_inputs=100)
+    assert batches == [(0, ["a"]), (1, ["x" * 400]), (2, ["b"])]
+
+
+def test_batches_cover_every_chunk_in_order():
+    chunks = [str(i) * (i % 13 + 1) for i in range(100)]
+    batches = make_batches(chunks, max_tokens=12, max_inputs=4)
+    assert [c for _, b in batches for c in b] == chunks
+    assert all(chunks[start : start + len(b)] == b for start, b in batches)
+
+
+def test_vectors_follow_input_order_when_data_comes_back_shuffled(fake_api, sleeps):
+    fake_api(shuffle=True)
+    vectors = embedding._embed_batch(["a", "bb", "ccc"], "m")
+    assert vectors == [[1.0, 0.0], [2.0, 1.0], [3.0, 2.0]]
+
+
+def test_uncached_embeddings_keep_input_order_across_batches(fake_api, sleeps, monkeypatch):
+    fake = fake_api(shuffle=True)
+    monkeypatch.setattr(embedding.settings, "EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(embedding.settings, "EMBED_CONCURRENCY", 3)
+    chunks = ["a" * n for n in range(1, 8)]
+    vectors = embedding._embed_uncached(chunks, "m")
+    assert [v[0] for v in vectors] == [float(n) for n in range(1, 8)]
+    assert len(fake.calls) == 4
+
+
+def test_count_mismatch_raises(fake_api, sleeps):
+    fake_api(drop=1)
+    with pytest.raises(ValueError, match="count mismatch"):
+        embedding._embed_batch(["a", "b", "c"], "m")
+
+
+def test_rate_limit_is_retried_after_the_server_given_delay(fake_api, sleeps):
+    fake = fake_api(errors=[rate_limited("7"), rate_limited("1.5")])
+    assert embedding._embed_batch(["a"], "m") == [[1.0, 0.0]]
+    assert sleeps == [7.0, 1.5]
+    assert len(fake.calls) == 3
+
+
+def test_rate_limit_without_retry_after_backs_off(fake_api, sleeps):
+    fake_api(errors=[rate_limited(), rate_limited()])
+    embedding._embed_batch(["a"], "m")
+    assert len(sleeps) == 2
+    assert 0.25 <= sleeps[0] <= 0.75 and 0.5 <= sleeps[1] <= 1.5
+
+
+def test_gives_up_after_max_retries(fake_api, sleeps, monkeypatch):
+    monkeypatch.setattr(embedding.settings, "EMBED_MAX_RETRIES", 2)
+    fake = fake_api(errors=[rate_limited("0")] * 3)
+    with pytest.raises(openai.RateLimitError):
+        embedding._embed_batch(["a"], "m")
+    assert len(fake.calls) == 3 and len(sleeps) == 2
+
+
+def test_non_retryable_errors_are_not_retried(fake_api, sleeps):
+    response = httpx.Response(400, request=httpx.Request("POST", "https://api.test"))
+    fake = fake_api(errors=[openai.BadRequestError("bad", response=response, body=None)])
+    with pytest.raises(openai.BadRequestError):
+        embedding._embed_batch(["a"], "m")
+    assert len(fake.calls) == 1 and sleeps == []
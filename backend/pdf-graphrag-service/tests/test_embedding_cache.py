@@ -0,0 +1,104 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app import embedding, embedding_cache
+from app.embedding_cache import EmbeddingCache, cache_key, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Controls the time EmbeddingCache stamps on last_used.
+    """
+    now = SimpleNamespace(t=1_000_000.0)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: now.t))
+    return now
+
+
+def stored_keys(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0] for row in conn.execute("SELECT key FROM embeddings")}
+
+
+def test_vectors_round_trip_as_float32(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"), max_rows=100)
+    cache.put_many("m", ["a", "b"], [[0.5, -1.25], [3.0, 0.0]])
+    assert cache.get_many("m", ["b", "missing", "a"]) == [[3.0, 0.0], None, [0.5, -1.25]]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_key_normalizes_whitespace_and_unicode():
+    assert normalize_text("  a \n\tb  ") == "a b"
+    assert cache_key("m", "café  au lait") == cache_key("m", "café au\nlait")
+    assert cache_key("m", "text") != cache_key("other-model", "text")
+    assert cache_key("m", "text") != cache_key("m", "Text")
+
+
+def test_normalized_copies_hit_the_same_row(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"), max_rows=100)
+    cache.put_many("m", ["page one\ntext"], [[1.0]])
+    assert cache.get_many("m", ["page  one text ", "page one text"]) == [[1.0], [1.0]]
+    assert cache.get_many("other-model", ["page one text"]) == [None]
+
+
+def test_least_recently_used_rows_are_evicted_past_max_rows(tmp_path, clock):
+    path = str(tmp_path / "c.sqlite3")
+    cache = EmbeddingCache(path, max_rows=10)
+    old = [f"old {i}" for i in range(4)]
+    new = [f"new {i}" for i in range(8)]
+    cache.put_many("m", old, [[float(i)] for i in range(4)])
+    clock.t += 10_000
+    cache.put_many("m", new, [[float(i)] for i in range(8)])
+    clock.t += 10_000
+    # a hit refreshes last_used, so "old 0" is no longer among the oldest
+    assert cache.get_many("m", ["old 0"]) == [[0.0]]
+
+    # 12 rows > max_rows: reopening prunes down to 90% (9), oldest first
+    reopened = EmbeddingCache(path, max_rows=10)
+    assert reopened.evicted == 3
+    assert stored_keys(path) == {cache_key("m", t) for t in ["old 0", *new]}
+
+
+def test_recent_hits_are_not_rewritten(tmp_path, clock):
+    path = str(tmp_path / "c.sqlite3")
+    cache = EmbeddingCache(path, max_rows=10)
+    cache.put_many("m", ["a"], [[1.0]])
+    clock.t += embedding_cache.TOUCH_INTERVAL_SECONDS - 1
+    cache.get_many("m", ["a"])
+    with sqlite3.connect(path) as conn:
+        (last_used,) = conn.execute("SELECT last_used FROM embeddings").fetchone()
+    assert last_used == 1_000_000
+
+
+def test_inserts_prune_once_enough_rows_were_added(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    cache = EmbeddingCache(path, max_rows=100)
+    texts = [f"chunk {i}" for i in range(99)]
+    cache.put_many("m", texts, [[float(i)] for i in range(99)])
+    cache.put_many("m", ["one more", "and another"], [[1.0], [2.0]])
+    assert len(stored_keys(path)) == 90
+    assert cache.evicted == 11
+
+
+def test_compute_embeddings_sends_each_distinct_chunk_once(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"), max_rows=100)
+    monkeypatch.setattr(embedding, "embedding_cache", cache)
+    sent = []
+
+    def fake_embed(chunks, model):
+        sent.append(list(chunks))
+        return [[float(len(c))] for c in chunks]
+
+    monkeypatch.setattr(embedding, "_embed_uncached", fake_embed)
+
+    chunks = ["alpha", "beta", "alpha ", "alpha", "gamma"]
+    first = embedding.compute_embeddings(chunks, model="m")
+    assert sent == [["alpha", "beta", "gamma"]]
+    assert first == [[5.0], [4.0], [5.0], [5.0], [5.0]]
+
+    # everything is cached now, only the new chunk goes out
+    second = embedding.compute_embeddings(["beta", "delta!", "alpha"], model="m")
+    assert sent[1:] == [["delta!"]]
+    assert second == [[4.0], [6.0], [5.0]]
@@ -0,0 +1,212 @@
+"""
+ChunkWriter against a real Neo4j. Uses the server at NEO4J_TEST_URI when
+set, otherwise starts a neo4j:5 container through testcontainers
+(pip install testcontainers[neo4j]), otherwise skips. From
+backend/pdf-graphrag-service, e.g. against a throwaway server:
+
+    docker run -d --rm -p 7687:7687 -e NEO4J_AUTH=neo4j/testpassword neo4j:5
+    NEO4J_TEST_URI=bolt://localhost:7687 NEO4J_TEST_PASSWORD=testpassword \
+        python -m pytest tests/test_graph_store.py
+
+Each test uses its own user email and deletes its nodes afterwards, so a
+shared database is fine. The staging tests at the top need no server.
+"""
+
+import contextlib
+import os
+import uuid
+
+import pytest
+from neo4j import GraphDatabase
+
+from app import graph_store
+from app.graph_store import ChunkWriter
+
+
+@pytest.fixture(autouse=True)
+def no_sidecar_indexes(monkeypatch, tmp_path):
+    monkeypatch.setattr(graph_store.settings, "ANN_INDEX_DIR", "")
+    monkeypatch.setattr(graph_store.settings, "LEXICAL_INDEX_DIR", "")
+    monkeypatch.setattr(graph_store.settings, "EMBEDDING_STORAGE", "list")
+    monkeypatch.setattr(graph_store.settings, "UPLOAD_TMP_DIR", str(tmp_path))
+
+
+def chunks(n, prefix="chunk"):
+    texts = [f"{prefix} {i}" for i in range(n)]
+    return texts, [[float(i), 1.0] for i in range(n)], [i // 3 + 1 for i in range(n)]
+
+
+def test_chunk_ids_stay_unique_across_write_calls(monkeypatch):
+    monkeypatch.setattr(graph_store, "pdf_exists", lambda pdf_hash, email: False)
+    monkeypatch.setattr(graph_store.settings, "NEO4J_WRITE_BATCH_SIZE", 4)
+    writer = ChunkWriter("u@example.com", "hash", "a.pdf")
+    writer.__enter__()
+    try:
+        for n in (3, 5, 2):
+            writer.write(*chunks(n))
+        batches = list(writer._staged_rows())
+    finally:
+        writer._spool.close()
+
+    ids = [row["id"] for rows in batches for row in rows]
+    assert len(ids) == len(set(ids)) == writer.count == 10
+    assert ids[-1] == f"u@example.com-{writer.pdf_id}-9"
+    assert all(len(rows) <= 4 for rows in batches)
+
+
+def test_write_rejects_mismatched_lengths_and_duplicates(monkeypatch):
+    monkeypatch.setattr(graph_store, "pdf_exists", lambda pdf_hash, email: False)
+    writer = ChunkWriter("u@example.com", "hash", "a.pdf")
+    writer.__enter__()
+    try:
+        texts, embeddings, pages = chunks(3)
+        with pytest.raises(ValueError, match="Length mismatch"):
+            writer.write(texts, embeddings[:2], pages)
+        writer.duplicate = True
+        with pytest.raises(RuntimeError):
+            writer.write(texts, embeddings, pages)
+    finally:
+        writer._spool.close()
+
+
+@pytest.fixture(scope="module")
+def neo4j_server():
+    """
+    (uri, user, password) of the Neo4j to test against.
+    """
+    uri = os.getenv("NEO4J_TEST_URI")
+    if uri:
+        yield (
+            uri,
+            os.getenv("NEO4J_TEST_USER", "neo4j"),
+            os.getenv("NEO4J_TEST_PASSWORD", "testpassword"),
+        )
+        return
+    try:
+        from testcontainers.neo4j import Neo4jContainer
+    except ImportError:
+        pytest.skip("set NEO4J_TEST_URI or install testcontainers[neo4j]")
+    try:
+        container = Neo4jContainer("neo4j:5").start()
+    except Exception as e:
+        pytest.skip(f"could not start a Neo4j container: {e}")
+    try:
+        yield container.get_connection_url(), container.username, container.password
+    finally:
+        container.stop()
+
+
+@pytest.fixture
+def db(neo4j_server, monkeypatch):
+    """
+    (driver, email): graph_store pointed at the test server, with the
+    chunkId uniqueness constraint in place, cleaned up afterwards.
+    """
+    uri, user, password = neo4j_server
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    monkeypatch.setattr(graph_store, "_driver", driver)
+    graph_store.ensure_indexes()
+    email = f"test-{uuid.uuid4()}@example.com"
+    try:
+        yield driver, email
+    finally:
+        driver.execute_query(
+            "MATCH (n) WHERE n.email = $email OR n.user_email = $email DETACH DELETE n",
+            email=email,
+        )
+        driver.close()
+
+
+def stored(driver, email):
+    """
+    (chunks_version, chunk ids, distinct pdf_ids) currently stored for the user.
+    """
+    records, _, _ = driver.execute_query(
+        """
+        OPTIONAL MATCH (u:User {email: $email})
+        OPTIONAL MATCH (c:Chunk {user_email: $email})
+        RETURN u.chunks_version AS version, collect(c.id) AS ids,
+               collect(DISTINCT c.pdf_id) AS pdf_ids
+        """,
+        email=email,
+    )
+    r = records[0]
+    return r["version"], sorted(r["ids"]), r["pdf_ids"]
+
+
+def test_commit_writes_every_batch_and_bumps_the_version(db, monkeypatch):
+    driver, email = db
+    monkeypatch.setattr(graph_store.settings, "NEO4J_WRITE_BATCH_SIZE", 2)
+    with ChunkWriter(email, "h1", "a.pdf") as writer:
+        writer.write(*chunks(3))
+        writer.write(*chunks(4))
+    version, ids, _ = stored(driver, email)
+    assert version == writer.version == 1
+    assert len(ids) == len(set(ids)) == 7
+
+    with ChunkWriter(email, "h2", "b.pdf") as second:
+        second.write(*chunks(2))
+    version, ids, pdf_ids = stored(driver, email)
+    assert version == second.version == 2
+    assert len(ids) == len(set(ids)) == 9
+    assert len(pdf_ids) == 2
+
+
+def test_exception_rolls_back_everything(db):
+    driver, email = db
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        with ChunkWriter(email, "h1", "a.pdf") as writer:
+            writer.write(*chunks(3))
+            raise RuntimeError("embedding failed")
+    assert stored(driver, email) == (None, [], [])
+
+
+def test_failure_during_commit_leaves_no_partial_chunks(db, monkeypatch):
+    driver, email = db
+    with ChunkWriter(email, "h0", "first.pdf"):
+        pass
+    monkeypatch.setattr(graph_store.settings, "NEO4J_WRITE_BATCH_SIZE", 2)
+
+    batches = []
+
+    @contextlib.contextmanager
+    def failing_span(name):
+        if name == "neo4j_write_batch":
+            batches.append(name)
+            if len(batches) == 2:
+                raise RuntimeError("connection lost")
+        yield
+
+    monkeypatch.setattr(graph_store, "span", failing_span)
+    with pytest.raises(RuntimeError, match="connection lost"):
+        with ChunkWriter(email, "h1", "a.pdf") as writer:
+            writer.write(*chunks(5))
+    # the first batch was sent before the failure, but never committed
+    assert stored(driver, email) == (1, [], [])
+
+
+def test_reupload_is_detected_before_writing(db):
+    driver, email = db
+    with ChunkWriter(email, "h1", "a.pdf") as writer:
+        writer.write(*chunks(2))
+    with ChunkWriter(email, "h1", "copy.pdf") as again:
+        assert again.duplicate
+    version, ids, _ = stored(driver, email)
+    assert version == 1 and len(ids) == 2
+
+
+def test_concurrent_duplicate_is_rolled_back_at_commit(db):
+    driver, email = db
+    first = ChunkWriter(email, "h1", "a.pdf").__enter__()
+    second = ChunkWriter(email, "h1", "a-copy.pdf").__enter__()
+    assert not first.duplicate and not second.duplicate
+    first.write(*chunks(3))
+    second.write(*chunks(3))
+
+    first.__exit__(None, None, None)
+    second.__exit__(None, None, None)
+
+    assert second.duplicate and second.version is None
+    version, ids, pdf_ids = stored(driver, email)
+    assert version == 1 and len(ids) == 3
+    assert pdf_ids == [first.pdf_id]
@@ -0,0 +1,35 @@
+import pytest
+
+from app import jobs
+from app.jobs import IngestJob
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    """Every status written to Neo4j, as (status, stage, percent)."""
+    rows = []
+    monkeypatch.setattr(
+        jobs, "save_job", lambda d: rows.append((d["status"], d["stage"], d["percent"]))
+    )
+    return rows
+
+
+def test_stage_changes_are_always_saved(saved):
+    job = IngestJob("u@example.com", "a.pdf", "hash")
+    job.save(force=True)
+    job.status = "running"
+    job.update("chunking", 1)
+    job.update("embedding")
+    job.update("chunking", 2)
+    job.update("storing")
+    assert [stage for _, stage, _ in saved] == [
+        "queued", "chunking", "embedding", "chunking", "storing"
+    ]
+
+
+def test_progress_within_a_stage_is_saved_every_5_percent(saved):
+    job = IngestJob("u@example.com", "a.pdf", "hash")
+    job.update("chunking", 0)
+    for percent in range(1, 13):
+        job.update("chunking", percent)
+    assert [p for _, _, p in saved] == [0, 5, 10]
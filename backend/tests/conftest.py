@@ -0,0 +1,5 @@
+import os
+import sys
+
+# check_shared_modules.py lives in backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,6 @@
+from check_shared_modules import differing_modules
+
+
+def test_shared_modules_are_identical():
+    diffs = differing_modules()
+    assert not diffs, "".join(line for lines in diffs.values() for line in lines)
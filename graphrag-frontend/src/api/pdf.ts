@@ -2,9 +2,42 @@ export interface PdfUploadResponse {
     message: string;
     file_id?: string;
     hash?: string;
+    job_id?: string;
+    status_url?: string;
 }
 
-export async function uploadPdf(file: File, token: string): Promise<PdfUploadResponse> {
+export interface IngestJobStatus {
+    job_id: string;
+    status: "queued" | "running" | "done" | "failed";
+    stage: string;
+    percent: number;
+    file_name: string;
+    chunks: number;
+    error?: string | null;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+async function getIngestJob(jobId: string, token: string): Promise<IngestJobStatus> {
+    const response = await fetch(`${process.env.REACT_APP_PDF_UPLOAD_URL}/jobs/${jobId}`, {
+        headers: {
+            Authorization: `Bearer ${token}`,
+        },
+    });
+
+    if (!response.ok) {
+        const error = await response.text();
+        throw new Error(`Job status failed: ${error}`);
+    }
+
+    return await response.json();
+}
+
+export async function uploadPdf(
+    file: File,
+    token: string,
+    onProgress: (job: IngestJobStatus) => void = () => { },
+): Promise<PdfUploadResponse> {
     const formData = new FormData();
     formData.append("file", file);
 
@@ -21,5 +54,22 @@ export async function uploadPdf(file: File, token: string): Promise<PdfUploadRes
         throw new Error(`PDF upload failed: ${error}`);
     }
 
-    return await response.json();
+    const accepted: PdfUploadResponse = await response.json();
+    if (!accepted.job_id) {
+        // e.g. duplicate upload: nothing was queued
+        return accepted;
+    }
+
+    // Processing happens in the background; poll until it finishes
+    while (true) {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const job = await getIngestJob(accepted.job_id, token);
+        onProgress(job);
+        if (job.status === "done") {
+            return { ...accepted, message: "PDF processed and stored in Neo4j" };
+        }
+        if (job.status === "failed") {
+            throw new Error(`PDF processing failed: ${job.error ?? "unknown error"}`);
+        }
+    }
 }
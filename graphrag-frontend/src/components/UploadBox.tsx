@@ -1,10 +1,11 @@
 import React, { useState, useContext } from 'react';
 import { AuthContext } from '../context/AuthContext';
-import { uploadPdf, PdfUploadResponse } from "../api/pdf";
+import { uploadPdf, PdfUploadResponse, IngestJobStatus } from "../api/pdf";
 
 const UploadBox: React.FC = () => {
   const [file, setFile] = useState<File | null>(null);
   const [uploading, setUploading] = useState(false);
+  const [progress, setProgress] = useState<IngestJobStatus | null>(null);
   const [message, setMessage] = useState<{ text: string; type: 'success' | 'error' | 'warning' | null }>({ text: '', type: null });
   const { token } = useContext(AuthContext);
 
@@ -23,9 +24,10 @@ const UploadBox: React.FC = () => {
     formData.append('file', file);
 
     setUploading(true);
+    setProgress(null);
     setMessage({ text: '', type: null });
     try {
-      const response: PdfUploadResponse = await uploadPdf(file, token);
+      const response: PdfUploadResponse = await uploadPdf(file, token, setProgress);
 
       if (response.message?.includes("already been uploaded")) {
         setMessage({ text: "This PDF has already been uploaded by this user.", type: "warning" });
@@ -38,6 +40,7 @@ const UploadBox: React.FC = () => {
       setMessage({ text: 'Failed to upload PDF', type: 'error' });
     } finally {
       setUploading(false);
+      setProgress(null);
     }
   };
 
@@ -56,7 +59,11 @@ const UploadBox: React.FC = () => {
           cursor: uploading || !file ? "not-allowed" : "pointer",
         }}
       >
-        {uploading ? "Uploading..." : "Upload"}
+        {uploading
+          ? progress
+            ? `Processing: ${progress.stage} ${progress.percent}%`
+            : "Uploading..."
+          : "Upload"}
       </button>
 
 